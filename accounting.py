@@ -0,0 +1,220 @@
+import os
+import time
+import logging
+from contextlib import contextmanager
+
+try:
+    import resource
+except ImportError:  # Plataformas sem getrusage (ex: Windows)
+    resource = None
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Número máximo de valores distintos por dimensão (os demais são somados em "other")
+ACCOUNTING_MAX_KEYS = int(os.environ.get("ACCOUNTING_MAX_KEYS", 100))
+
+
+def compute_units(pixels, strategies):
+    """
+    Custo de um OCR em unidades de computação: megapixels × estratégias executadas
+
+    Cada estratégia é uma execução do Tesseract sobre a imagem inteira, então
+    o custo cresce com o produto dos dois.
+    """
+    return pixels / 1_000_000 * strategies
+
+
+def children_cpu_time():
+    """Tempo de CPU (s) dos processos filhos já encerrados (ex: Tesseract)"""
+    if resource is None:
+        return 0.0
+    usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+    return usage.ru_utime + usage.ru_stime
+
+
+def max_rss_kb():
+    """Pico de memória residente do processo, em KB (0 se indisponível)"""
+    if resource is None:
+        return 0
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+
+
+def current_rss_kb():
+    """
+    Memória residente atual do processo, em KB
+
+    Lida de /proc/self/statm (Linux); em outras plataformas, o pico
+    (max_rss_kb), que só cresce.
+    """
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") // 1024
+    except (OSError, ValueError, IndexError, AttributeError):
+        return max_rss_kb()
+
+
+class ResourceUsage:
+    """
+    Recursos consumidos pelo processamento OCR de uma requisição
+
+    Attributes:
+        cpu_ms: CPU da thread que executou o pipeline
+        child_cpu_ms: CPU dos processos do Tesseract (getrusage(RUSAGE_CHILDREN)
+            é do processo inteiro, então é aproximado com OCRs simultâneos)
+        pixels: Pixels da imagem decodificada
+        strategies: Execuções do Tesseract iniciadas (estratégias de OCR)
+        peak_rss_kb: Pico de memória residente do processo ao final do OCR
+        rss_growth_kb: Quanto o pico de memória do processo cresceu durante o OCR
+    """
+
+    __slots__ = ("cpu_ms", "child_cpu_ms", "pixels", "strategies", "peak_rss_kb", "rss_growth_kb")
+
+    def __init__(self):
+        self.cpu_ms = 0.0
+        self.child_cpu_ms = 0.0
+        self.pixels = 0
+        self.strategies = 0
+        self.peak_rss_kb = 0
+        self.rss_growth_kb = 0
+
+    @property
+    def compute_units(self):
+        """Custo do OCR em unidades de computação (ver compute_units)"""
+        return compute_units(self.pixels, self.strategies)
+
+    def to_dict(self):
+        return {
+            "cpu_ms": round(self.cpu_ms, 2),
+            "child_cpu_ms": round(self.child_cpu_ms, 2),
+            "pixels": self.pixels,
+            "strategies": self.strategies,
+            "compute_units": round(self.compute_units, 3),
+            "peak_rss_kb": self.peak_rss_kb,
+            "rss_growth_kb": self.rss_growth_kb
+        }
+
+
+@contextmanager
+def measure_resources(usage, image=None):
+    """
+    Mede os recursos consumidos pelo bloco e acumula em usage
+
+    Deve envolver todo o trabalho da requisição executado na thread atual.
+
+    Args:
+        usage: ResourceUsage a ser preenchido (None = não medir)
+        image: Imagem processada (para contar os pixels)
+    """
+    if usage is None:
+        yield
+        return
+
+    if image is not None and hasattr(image, "size"):
+        width, height = image.size
+        usage.pixels += width * height
+
+    thread_start = time.thread_time()
+    children_start = children_cpu_time()
+    rss_start = max_rss_kb()
+    try:
+        yield
+    finally:
+        usage.cpu_ms += (time.thread_time() - thread_start) * 1000
+        usage.child_cpu_ms += (children_cpu_time() - children_start) * 1000
+        usage.peak_rss_kb = max_rss_kb()
+        usage.rss_growth_kb += max(usage.peak_rss_kb - rss_start, 0)
+
+
+class ResourceTotals:
+    """Recursos acumulados de um grupo de requisições"""
+
+    __slots__ = ("requests", "cpu_ms", "child_cpu_ms", "pixels", "compute_units", "peak_rss_kb", "rss_growth_kb")
+
+    def __init__(self):
+        self.requests = 0
+        self.cpu_ms = 0.0
+        self.child_cpu_ms = 0.0
+        self.pixels = 0
+        self.compute_units = 0.0
+        self.peak_rss_kb = 0
+        self.rss_growth_kb = 0
+
+    def add(self, usage):
+        self.requests += 1
+        self.cpu_ms += usage.cpu_ms
+        self.child_cpu_ms += usage.child_cpu_ms
+        self.pixels += usage.pixels
+        self.compute_units += usage.compute_units
+        self.peak_rss_kb = max(self.peak_rss_kb, usage.peak_rss_kb)
+        self.rss_growth_kb += usage.rss_growth_kb
+
+    def summary(self):
+        """
+        Totais e custo médio do grupo
+
+        Returns:
+            dict: Totais, médias por requisição e CPU por megapixel
+        """
+        total_cpu_ms = self.cpu_ms + self.child_cpu_ms
+        megapixels = self.pixels / 1_000_000
+        return {
+            "requests": self.requests,
+            "cpu_ms": round(self.cpu_ms, 2),
+            "child_cpu_ms": round(self.child_cpu_ms, 2),
+            "megapixels": round(megapixels, 3),
+            "compute_units": round(self.compute_units, 3),
+            "avg_cpu_ms": round(total_cpu_ms / self.requests, 2) if self.requests else 0,
+            "cpu_ms_per_megapixel": round(total_cpu_ms / megapixels, 2) if megapixels else 0,
+            "peak_rss_kb": self.peak_rss_kb,
+            "rss_growth_kb": self.rss_growth_kb
+        }
+
+
+class ResourceAccounting:
+    """
+    Recursos de OCR agregados por dimensão (endpoint, tipo de documento, API key)
+
+    Cada dimensão guarda no máximo max_keys valores distintos, para que
+    valores enviados pelo cliente (ex: document_type) não cresçam sem limite.
+    """
+
+    DIMENSIONS = ("endpoint", "document_type", "api_key")
+
+    def __init__(self, max_keys=ACCOUNTING_MAX_KEYS):
+        self.max_keys = max_keys
+        self.totals = {dimension: {} for dimension in self.DIMENSIONS}
+        self.overall = ResourceTotals()
+
+    def record(self, usage, **dimensions):
+        """
+        Acumula o uso de uma requisição
+
+        Args:
+            usage: ResourceUsage da requisição
+            dimensions: Valores das dimensões (endpoint=..., document_type=..., api_key=...)
+        """
+        self.overall.add(usage)
+        for dimension, value in dimensions.items():
+            groups = self.totals[dimension]
+            key = str(value)
+            if key not in groups and len(groups) >= self.max_keys:
+                key = "other"
+            totals = groups.get(key)
+            if totals is None:
+                totals = groups[key] = ResourceTotals()
+            totals.add(usage)
+
+    def summary(self):
+        """
+        Resumo por dimensão, do grupo mais caro para o mais barato
+
+        Returns:
+            dict: {"total": {...}, "by_endpoint": [...], "by_document_type": [...], "by_api_key": [...]}
+        """
+        result = {"total": self.overall.summary()}
+        for dimension, groups in self.totals.items():
+            rows = [dict({dimension: key}, **totals.summary()) for key, totals in groups.items()]
+            rows.sort(key=lambda row: row["cpu_ms"] + row["child_cpu_ms"], reverse=True)
+            result[f"by_{dimension}"] = rows
+        return result
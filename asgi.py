@@ -1,4 +1,7 @@
-from app_fastapi import app
+from fastapi_server import create_app
 
 # Este arquivo serve como ponto de entrada ASGI para o Uvicorn
-# Usado por: uvicorn asgi:app ou gunicorn -k uvicorn.workers.UvicornWorker asgi:app
\ No newline at end of file
+# Usado por: uvicorn asgi:app ou gunicorn -k uvicorn.workers.UvicornWorker asgi:app
+# Poucos workers com event loop atendem muitas conexões; o OCR roda no pool de threads
+# do escalonador (OCR_WORKERS por processo). Só o app FastAPI é criado (o Flask não é importado).
+app = create_app()
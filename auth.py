@@ -1,49 +1,46 @@
 import os
 import time
-import uuid
-import hmac
 import hashlib
-import secrets
 import logging
 from functools import wraps
-from flask import request, jsonify, g
-from werkzeug.local import LocalProxy
+
+from rate_limiter import rate_limiter
+from key_store import api_key_store, new_api_key
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
 
-# Em ambiente de produção, esses dados estariam em um banco de dados
-# Por enquanto, usaremos uma estrutura em memória para simplificar
-API_KEYS = {
-    "test_key": {
-        "user_id": "test_user",
-        "name": "Test User",
-        "rate_limit": 100,
-        "created_at": time.time(),
-        "expires_at": time.time() + (30 * 24 * 60 * 60),  # 30 dias
-        "permissions": ["read", "write"],
-        "active": True
-    }
-}
+# Exigir API key nas rotas em que ela é opcional (apps Flask e FastAPI)
+API_KEY_REQUIRED = os.environ.get("API_KEY_REQUIRED", "false").lower() == "true"
 
-# Armazenamento de requisições para rate limiting
-REQUEST_COUNTS = {}
+# O Flask é importado só quando usado: o app FastAPI também importa este módulo
 
 def get_current_user():
     """Obtém o usuário atual da requisição"""
+    from flask import g
     return getattr(g, 'user', None)
 
-current_user = LocalProxy(get_current_user)
+def __getattr__(name):
+    # current_user (LocalProxy do werkzeug) é criado no primeiro acesso
+    if name == "current_user":
+        from werkzeug.local import LocalProxy
+        globals()["current_user"] = LocalProxy(get_current_user)
+        return globals()["current_user"]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 def generate_api_key():
-    """Gera uma nova API key"""
-    return secrets.token_hex(16)
+    """Gera uma nova API key (identificador aleatório seguido do segredo, ver key_store)"""
+    return new_api_key()
 
 def verify_api_key(api_key):
-    """Verifica se a API key é válida"""
-    if api_key in API_KEYS:
-        key_data = API_KEYS[api_key]
-        
+    """
+    Verifica se a API key é válida
+    
+    As chaves ficam no api_key_store (somente hashes salgados); a consulta
+    passa por um cache em memória, então não acessa o banco a cada requisição.
+    """
+    key_data = api_key_store.lookup(api_key)
+    if key_data is not None:
         # Verificar se a chave está ativa
         if not key_data.get("active", False):
             return False, "API key inativa"
@@ -57,45 +54,75 @@ def verify_api_key(api_key):
     
     return False, "API key inválida"
 
+def rate_limit_key(api_key):
+    """Identificador da chave no rate limiter (a API key não é armazenada em claro)"""
+    return hashlib.sha256(api_key.encode()).hexdigest()[:32]
+
 def check_rate_limit(api_key, limit=60, window=60):
     """
     Verifica se o usuário excedeu o limite de requisições
     
+    Usa o rate limiter GCRA global (compartilhado entre os workers quando
+    RATE_LIMIT_DB_PATH está definido).
+    
     Args:
         api_key: A chave de API do usuário
         limit: Número máximo de requisições permitidas
         window: Janela de tempo em segundos
     
     Returns:
-        (bool, int): (limite excedido, requisições restantes)
+        RateLimitResult: Decisão (allowed), requisições restantes, reset e Retry-After
     """
-    current_time = time.time()
-    
-    # Se a chave não estiver no dicionário, adiciona
-    if api_key not in REQUEST_COUNTS:
-        REQUEST_COUNTS[api_key] = []
-    
-    # Remove entradas antigas (fora da janela de tempo)
-    REQUEST_COUNTS[api_key] = [t for t in REQUEST_COUNTS[api_key] if t > current_time - window]
-    
-    # Verifica se excedeu o limite
-    if len(REQUEST_COUNTS[api_key]) >= limit:
-        # Consegue o número de requisições restantes (sempre 0 neste caso)
-        remaining = 0
-        return True, remaining
+    return rate_limiter.check(rate_limit_key(api_key), limit, window)
+
+def authenticate_api_key(api_key):
+    """
+    Verifica a API key e consome uma requisição do rate limit
     
-    # Adiciona o timestamp atual
-    REQUEST_COUNTS[api_key].append(current_time)
+    Lógica comum ao decorator do Flask e às dependências do FastAPI
+    (auth_fastapi). Pode acessar o banco de chaves e o do rate limiter.
     
-    # Calcula requisições restantes
-    remaining = limit - len(REQUEST_COUNTS[api_key])
+    Args:
+        api_key: A chave de API informada pelo cliente
     
-    return False, remaining
+    Returns:
+        tuple: (código HTTP, dados do usuário ou mensagem de erro, RateLimitResult ou None)
+    """
+    # Verificar API key
+    is_valid, result = verify_api_key(api_key)
+    if not is_valid:
+        logger.warning(f"Tentativa de acesso com API key inválida: {api_key[:8]}...")
+        return 401, result, None  # result contém a mensagem de erro
+    
+    # Neste ponto, result contém os dados da chave (key_data)
+    key_data = result
+    
+    # Verificar rate limit
+    user_limit = key_data.get("rate_limit", 60)
+    rate_limit = check_rate_limit(api_key, limit=user_limit)
+    
+    if not rate_limit.allowed:
+        logger.warning(f"Rate limit excedido para o usuário: {key_data.get('user_id')}")
+        return 429, "Limite de requisições excedido. Tente novamente mais tarde.", rate_limit
+    
+    # Dados do usuário para uso na view
+    user_info = {
+        "user_id": key_data.get("user_id", "unknown"),
+        "name": key_data.get("name", "Unknown User"),
+        "permissions": key_data.get("permissions", []),
+        "rate_limit": user_limit,
+        "rate_limit_remaining": rate_limit.remaining,
+        "weight": key_data.get("weight", 1.0),
+        "max_concurrency": key_data.get("max_concurrency")
+    }
+    return 200, user_info, rate_limit
 
 def require_api_key(f):
     """Decorator para rotas que exigem autenticação via API key"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        from flask import request, jsonify, g
+        
         # Obter API key do header ou query parameter
         api_key = request.headers.get('X-API-Key')
         if not api_key:
@@ -109,56 +136,26 @@ def require_api_key(f):
                 "error_code": 401
             }), 401
         
-        # Verificar API key
-        is_valid, result = verify_api_key(api_key)
-        if not is_valid:
-            logger.warning(f"Tentativa de acesso com API key inválida: {api_key}")
-            return jsonify({
-                "status": "error",
-                "message": result,  # result contém a mensagem de erro
-                "error_code": 401
-            }), 401
-        
-        # Neste ponto, result contém os dados da chave (key_data)
-        key_data = result
+        status_code, result, rate_limit = authenticate_api_key(api_key)
         
-        # Verificar rate limit
-        user_limit = key_data.get("rate_limit", 60)
-        exceeded, remaining = check_rate_limit(api_key, limit=user_limit)
+        # Headers de rate limit (e Retry-After se excedido)
+        response_headers = rate_limit.headers() if rate_limit is not None else {}
         
-        # Adicionar headers de rate limit
-        response_headers = {
-            "X-RateLimit-Limit": str(user_limit),
-            "X-RateLimit-Remaining": str(remaining),
-            "X-RateLimit-Reset": str(int(time.time() + 60))
-        }
-        
-        if exceeded:
-            logger.warning(f"Rate limit excedido para API key: {api_key}")
+        if status_code != 200:
             response = jsonify({
                 "status": "error",
-                "message": "Limite de requisições excedido. Tente novamente mais tarde.",
-                "error_code": 429
+                "message": result,  # result contém a mensagem de erro
+                "error_code": status_code
             })
             
             # Adicionar headers à resposta
             for key, value in response_headers.items():
                 response.headers[key] = value
                 
-            return response, 429
+            return response, status_code
         
         # Armazenar dados do usuário para uso na view
-        user_info = {}
-        if isinstance(key_data, dict):
-            user_info = {
-                "user_id": key_data.get("user_id", "unknown"),
-                "name": key_data.get("name", "Unknown User"),
-                "permissions": key_data.get("permissions", []),
-                "rate_limit": user_limit,
-                "rate_limit_remaining": remaining
-            }
-        
-        g.user = user_info
+        g.user = result
         
         # Chamar a view original
         response = f(*args, **kwargs)
@@ -185,6 +182,9 @@ def admin_required(f):
     """Decorator para rotas que exigem permissão de administrador"""
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        from flask import jsonify
+        
+        current_user = get_current_user()
         if not current_user or "admin" not in current_user.get("permissions", []):
             return jsonify({
                 "status": "error",
@@ -197,7 +197,8 @@ def admin_required(f):
 
 # Funções de gerenciamento de API keys (para uso administrativo)
 
-def create_api_key(user_id, name, rate_limit=60, expires_days=30, permissions=None):
+def create_api_key(user_id, name, rate_limit=60, expires_days=30, permissions=None,
+                   weight=1.0, max_concurrency=None):
     """
     Cria uma nova API key
     
@@ -207,6 +208,8 @@ def create_api_key(user_id, name, rate_limit=60, expires_days=30, permissions=No
         rate_limit: Limite de requisições por minuto
         expires_days: Dias até a expiração da chave
         permissions: Lista de permissões
+        weight: Peso do usuário na divisão dos workers de OCR
+        max_concurrency: Máximo de OCRs simultâneos (None = sem limite)
     
     Returns:
         dict: Dados da API key criada
@@ -214,30 +217,11 @@ def create_api_key(user_id, name, rate_limit=60, expires_days=30, permissions=No
     if permissions is None:
         permissions = ["read"]
     
-    api_key = generate_api_key()
-    
-    API_KEYS[api_key] = {
-        "user_id": user_id,
-        "name": name,
-        "rate_limit": rate_limit,
-        "created_at": time.time(),
-        "expires_at": time.time() + (expires_days * 24 * 60 * 60),
-        "permissions": permissions,
-        "active": True
-    }
-    
-    return {
-        "api_key": api_key,
-        "user_id": user_id,
-        "name": name,
-        "rate_limit": rate_limit,
-        "expires_at": time.time() + (expires_days * 24 * 60 * 60),
-        "permissions": permissions
-    }
+    # O valor da chave (gerado pelo api_key_store, que repete a geração se o
+    # identificador já existir) só é devolvido aqui; o banco guarda apenas o hash
+    return api_key_store.create(user_id, name, rate_limit, expires_days, permissions,
+                                weight=weight, max_concurrency=max_concurrency)
 
 def revoke_api_key(api_key):
-    """Revoga uma API key"""
-    if api_key in API_KEYS:
-        API_KEYS[api_key]["active"] = False
-        return True
-    return False
\ No newline at end of file
+    """Revoga uma API key (em todos os workers)"""
+    return api_key_store.revoke(api_key)
\ No newline at end of file
@@ -0,0 +1,126 @@
+import logging
+from typing import Optional
+
+from fastapi import Depends, HTTPException, Request
+from starlette.concurrency import run_in_threadpool
+
+from auth import API_KEY_REQUIRED, authenticate_api_key
+from quota import compute_quota, ComputeQuotaExceeded
+from scheduler import ocr_scheduler
+from ocr_service import process_image_ocr, strategies_for
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+
+def get_api_key(request: Request) -> Optional[str]:
+    """API key do header X-API-Key ou do parâmetro api_key"""
+    return request.headers.get("X-API-Key") or request.query_params.get("api_key")
+
+
+async def require_api_key(request: Request) -> dict:
+    """
+    Dependência para rotas que exigem autenticação via API key
+
+    Usa a mesma verificação e o mesmo rate limiter do Flask (auth.py). A
+    consulta ao banco de chaves e ao rate limiter roda no threadpool, para
+    não bloquear o event loop quando o cache não tem a chave.
+
+    Os headers de rate limit ficam em request.state.rate_limit_headers e são
+    adicionados pelo middleware rate_limit_headers, que também alcança as
+    rotas que devolvem o próprio Response (ex: /metrics).
+
+    Returns:
+        dict: Dados do usuário (também em request.state.user)
+
+    Raises:
+        HTTPException: 401 para chave ausente ou inválida, 429 para rate limit excedido
+    """
+    api_key = get_api_key(request)
+    if not api_key:
+        raise HTTPException(status_code=401, detail="API key não fornecida")
+
+    status_code, result, rate_limit = await run_in_threadpool(authenticate_api_key, api_key)
+    headers = rate_limit.headers() if rate_limit is not None else None
+    if status_code != 200:
+        raise HTTPException(status_code=status_code, detail=result, headers=headers)
+
+    request.state.rate_limit_headers = headers
+    request.state.user = result
+    return result
+
+
+async def optional_api_key(request: Request) -> Optional[dict]:
+    """
+    Dependência para rotas em que a API key é opcional
+
+    Com API_KEY_REQUIRED a chave é obrigatória. Sem ela, uma chave
+    informada ainda é verificada, para que o OCR use a fila, o peso e a cota
+    do cliente; sem chave, a requisição é anônima.
+
+    Returns:
+        dict: Dados do usuário ou None para requisições anônimas
+    """
+    if API_KEY_REQUIRED or get_api_key(request):
+        return await require_api_key(request)
+    request.state.user = None
+    return None
+
+
+async def rate_limit_headers(request: Request, call_next):
+    """Middleware que adiciona à resposta os headers de rate limit gravados por require_api_key"""
+    response = await call_next(request)
+    headers = getattr(request.state, "rate_limit_headers", None)
+    if headers:
+        response.headers.update(headers)
+    return response
+
+
+async def require_admin(user: dict = Depends(require_api_key)) -> dict:
+    """Dependência para rotas que exigem permissão de administrador"""
+    if "admin" not in user.get("permissions", []):
+        raise HTTPException(status_code=403, detail="Permissão negada. Acesso somente para administradores.")
+    return user
+
+
+async def run_ocr_job(request: Request, image, deadline=None, usage=None, document_type=None):
+    """
+    Executa o OCR no escalonador sem bloquear o event loop
+
+    Equivalente assíncrono de main.run_ocr_job: clientes autenticados usam a
+    fila do user_id, com peso, limite de concorrência e cota de unidades de
+    computação da chave; os demais, a fila do endereço IP. O tipo de
+    documento escolhe as estratégias de OCR (OCR_STRATEGY_CONFIG).
+
+    Raises:
+        HTTPException: 429 se a cota de unidades da chave estiver esgotada
+    """
+    user = getattr(request.state, "user", None)
+    units = compute_quota.estimate(image, len(strategies_for(document_type)))
+    if not user:
+        client = request.client.host if request.client else "anonymous"
+        return await ocr_scheduler.run_async(client, process_image_ocr, image, deadline=deadline,
+                                             usage=usage, document_type=document_type,
+                                             cost=compute_quota.job_cost(units))
+
+    try:
+        reservation = await run_in_threadpool(compute_quota.reserve, user["user_id"], user["rate_limit"], units)
+    except ComputeQuotaExceeded as e:
+        logger.warning(f"Cota de unidades de computação excedida para {user['user_id']}")
+        raise HTTPException(status_code=429, detail="Cota de processamento excedida. Tente novamente mais tarde.",
+                            headers=e.result.headers(prefix="X-ComputeQuota"))
+    request.state.compute_quota = reservation.result
+    try:
+        return await ocr_scheduler.run_async(
+            user["user_id"],
+            process_image_ocr,
+            image,
+            deadline=deadline,
+            usage=usage,
+            document_type=document_type,
+            weight=user.get("weight", 1.0),
+            max_concurrency=user.get("max_concurrency"),
+            cost=compute_quota.job_cost(units)
+        )
+    finally:
+        await run_in_threadpool(compute_quota.settle, reservation, usage)
@@ -0,0 +1,437 @@
+"""
+Gerador de carga para os endpoints de OCR (/ocr/upload e /ocr/camera)
+
+Reenvia um corpus de imagens (arquivos de um diretório ou o corpus
+sintético de synthetic_ids.py) contra um servidor local, em um de dois modos:
+
+- laço aberto (--rate): as requisições partem em instantes fixos,
+  independentemente das respostas; a latência corrigida é medida a partir
+  do instante previsto, então a espera por uma conexão livre (servidor
+  saturado) entra na medida;
+- laço fechado (--concurrency): N clientes enviam uma requisição após a
+  outra; a latência corrigida registra também as amostras que não foram
+  enviadas enquanto o cliente esperava (LatencyHistogram.record_corrected,
+  com o intervalo esperado de --expected-interval-ms ou, por padrão, o p50
+  medido).
+
+Relata vazão, percentis de latência (medida e corrigida para a omissão
+coordenada) e erros por tipo. Serve para dimensionar o número de workers do
+gunicorn/uvicorn e comparar configurações do servidor. Usa apenas asyncio
+(HTTP/1.1 com keep-alive), sem dependências. Uso:
+
+    python benchmarks/load_generator.py --url http://127.0.0.1:8000 --rate 20 --duration 60
+    python benchmarks/load_generator.py --url http://127.0.0.1:5000 --concurrency 8 --endpoint camera
+
+Para medir só a pilha HTTP, sem o Tesseract, o servidor pode usar o motor
+falso (ocr_engines.py) com as respostas do mesmo corpus sintético:
+
+    python benchmarks/load_generator.py --count 20 --write-fake-responses fake.json
+    OCR_ENGINE=fake OCR_FAKE_RESPONSES=fake.json OCR_FAKE_LATENCY_MS=lognormal:40:0.5 uvicorn ...
+"""
+import io
+import os
+import sys
+import json
+import time
+import uuid
+import base64
+import asyncio
+import argparse
+from urllib.parse import urlsplit, urlencode
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from latency import LatencyHistogram
+
+ENDPOINTS = ("upload", "camera")
+IMAGE_EXTENSIONS = (".png", ".jpg", ".jpeg", ".bmp", ".tif", ".tiff", ".webp")
+PERCENTILES = (50, 90, 95, 99, 99.9)
+
+
+class HTTPConnection:
+    """
+    Conexão HTTP/1.1 persistente sobre asyncio
+
+    Reabre a conexão na próxima requisição se o servidor a fechar ou se
+    ocorrer um erro no meio de uma resposta.
+    """
+
+    def __init__(self, host, port):
+        self.host = host
+        self.port = port
+        self._reader = None
+        self._writer = None
+
+    async def request(self, method, path, headers, body=b""):
+        """
+        Envia uma requisição e lê a resposta completa
+
+        Returns:
+            int: Código de status da resposta
+        """
+        if self._writer is None:
+            self._reader, self._writer = await asyncio.open_connection(self.host, self.port)
+        try:
+            head = [f"{method} {path} HTTP/1.1", f"Host: {self.host}:{self.port}",
+                    f"Content-Length: {len(body)}"]
+            head += [f"{name}: {value}" for name, value in headers.items()]
+            self._writer.write(("\r\n".join(head) + "\r\n\r\n").encode("latin-1") + body)
+            await self._writer.drain()
+            status, keep_alive = await self._read_response()
+        except BaseException:
+            self.close()
+            raise
+        if not keep_alive:
+            self.close()
+        return status
+
+    async def _read_response(self):
+        status_line = await self._reader.readline()
+        if not status_line:
+            raise ConnectionError("Conexão fechada pelo servidor")
+        version, status = status_line.split(None, 2)[:2]
+        headers = {}
+        while True:
+            line = await self._reader.readline()
+            if line in (b"\r\n", b"\n", b""):
+                break
+            name, _, value = line.decode("latin-1").partition(":")
+            headers[name.strip().lower()] = value.strip().lower()
+
+        keep_alive = headers.get("connection") != "close" and version != b"HTTP/1.0"
+        if headers.get("transfer-encoding") == "chunked":
+            while True:
+                size = int((await self._reader.readline()).split(b";")[0], 16)
+                await self._reader.readexactly(size + 2)
+                if size == 0:
+                    break
+        elif "content-length" in headers:
+            await self._reader.readexactly(int(headers["content-length"]))
+        else:
+            await self._reader.read()
+            keep_alive = False
+        return int(status), keep_alive
+
+    def close(self):
+        if self._writer is not None:
+            self._writer.close()
+            self._reader = self._writer = None
+
+
+def load_corpus(directory=None, count=20, seed=0, document_type=None, widths=None, degraded=True):
+    """
+    Imagens a enviar
+
+    Args:
+        directory: Diretório com imagens (padrão: corpus sintético)
+        count: Documentos do corpus sintético
+        seed: Semente do corpus sintético
+        document_type: Tipo enviado com cada imagem (padrão: o do documento
+            sintético, ou generic para arquivos)
+        widths: Larguras do corpus sintético (padrão: DEFAULT_WIDTHS)
+        degraded: Aplicar ruído, desfoque, rotação e JPEG ao corpus sintético
+
+    Returns:
+        List[tuple]: (nome, bytes PNG/JPEG, content type, tipo de documento)
+    """
+    if directory:
+        corpus = []
+        for name in sorted(os.listdir(directory)):
+            extension = os.path.splitext(name)[1].lower()
+            if extension in IMAGE_EXTENSIONS:
+                with open(os.path.join(directory, name), "rb") as f:
+                    content_type = "image/jpeg" if extension in (".jpg", ".jpeg") else f"image/{extension[1:]}"
+                    corpus.append((name, f.read(), content_type, document_type or "generic"))
+        if not corpus:
+            raise ValueError(f"Nenhuma imagem em {directory}")
+        return corpus
+
+    from synthetic_ids import DEFAULT_WIDTHS, generate_corpus
+    corpus = []
+    for document in generate_corpus(count, seed, widths=widths or DEFAULT_WIDTHS, degraded=degraded):
+        buffer = io.BytesIO()
+        document.image.save(buffer, format="PNG")
+        corpus.append((f"{document.doc_id}.png", buffer.getvalue(), "image/png",
+                       document_type or document.doc_type))
+    return corpus
+
+
+def build_request(endpoint, item, api_key=None):
+    """
+    Caminho, headers e corpo da requisição de um item do corpus
+
+    upload envia multipart/form-data (campo file) com document_type na query
+    string; camera envia JSON com a imagem em base64 (image_data).
+
+    Returns:
+        tuple: (path, headers, body)
+    """
+    name, data, content_type, document_type = item
+    headers = {"X-API-Key": api_key} if api_key else {}
+    if endpoint == "upload":
+        boundary = uuid.uuid4().hex
+        body = (f"--{boundary}\r\n"
+                f'Content-Disposition: form-data; name="file"; filename="{name}"\r\n'
+                f"Content-Type: {content_type}\r\n\r\n").encode() + data + f"\r\n--{boundary}--\r\n".encode()
+        headers["Content-Type"] = f"multipart/form-data; boundary={boundary}"
+        return "/ocr/upload?" + urlencode({"document_type": document_type}), headers, body
+    if endpoint == "camera":
+        image_data = f"data:{content_type};base64," + base64.b64encode(data).decode()
+        headers["Content-Type"] = "application/json"
+        return "/ocr/camera", headers, json.dumps({"image_data": image_data, "document_type": document_type}).encode()
+    raise ValueError(f"Endpoint desconhecido: {endpoint}")
+
+
+class LoadResults:
+    """Medidas de uma execução: latências por endpoint e erros por tipo"""
+
+    def __init__(self):
+        self.latency = {}
+        self.samples = []
+        self.requests = {}
+        self.errors = {}
+        self.intended = LatencyHistogram()
+
+    def record(self, endpoint, outcome, latency_ms, intended_ms=None):
+        """
+        Registra uma requisição concluída
+
+        Args:
+            endpoint: upload ou camera
+            outcome: Código de status ou tipo do erro (timeout, connection)
+            latency_ms: Do envio até o fim da resposta
+            intended_ms: Do instante previsto até o fim da resposta (laço aberto)
+        """
+        self.requests[endpoint] = self.requests.get(endpoint, 0) + 1
+        if not (isinstance(outcome, int) and outcome < 400):
+            kind = f"http_{outcome}" if isinstance(outcome, int) else outcome
+            errors = self.errors.setdefault(endpoint, {})
+            errors[kind] = errors.get(kind, 0) + 1
+        self.latency.setdefault(endpoint, LatencyHistogram()).record(latency_ms)
+        self.samples.append(latency_ms)
+        if intended_ms is not None:
+            self.intended.record(intended_ms)
+
+    def report(self, elapsed_s, expected_interval_ms=None):
+        """
+        Resumo da execução
+
+        Args:
+            elapsed_s: Duração da execução em segundos
+            expected_interval_ms: Intervalo esperado entre as requisições de
+                um cliente no laço fechado (padrão: p50 medido); ignorado no
+                laço aberto, em que a correção usa o instante previsto
+
+        Returns:
+            dict: Vazão, erros e percentis (medidos e corrigidos) em ms
+        """
+        overall = LatencyHistogram()
+        for histogram in self.latency.values():
+            overall.merge(histogram)
+        total = sum(self.requests.values())
+        errors = sum(sum(kinds.values()) for kinds in self.errors.values())
+
+        if self.intended.count:
+            corrected = self.intended
+        else:
+            corrected = LatencyHistogram()
+            if expected_interval_ms is None and overall.count:
+                expected_interval_ms = overall.percentiles((50,))[50]
+            for value in self.samples:
+                corrected.record_corrected(value, expected_interval_ms or 0)
+
+        return {
+            "requests": total,
+            "elapsed_s": round(elapsed_s, 3),
+            "throughput_rps": round(total / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+            "goodput_rps": round((total - errors) / elapsed_s, 2) if elapsed_s > 0 else 0.0,
+            "errors": errors,
+            "error_rate": round(errors / total, 4) if total else 0.0,
+            "latency_ms": _percentiles(overall),
+            "corrected_latency_ms": _percentiles(corrected),
+            "expected_interval_ms": None if self.intended.count else expected_interval_ms,
+            "endpoints": {
+                endpoint: {
+                    "requests": self.requests[endpoint],
+                    "errors": self.errors.get(endpoint, {}),
+                    "latency_ms": _percentiles(histogram)
+                }
+                for endpoint, histogram in sorted(self.latency.items())
+            }
+        }
+
+
+def _percentiles(histogram):
+    if not histogram.count:
+        return {"count": 0}
+    result = {"count": histogram.count}
+    for q, value in histogram.percentiles(PERCENTILES).items():
+        result[f"p{q:g}"] = round(value, 3)
+    result["max"] = round(histogram.max, 3)
+    return result
+
+
+async def _send(connection, endpoint, item, api_key, timeout):
+    path, headers, body = build_request(endpoint, item, api_key)
+    try:
+        return await asyncio.wait_for(connection.request("POST", path, headers, body), timeout)
+    except asyncio.TimeoutError:
+        connection.close()
+        return "timeout"
+    except (OSError, ConnectionError, asyncio.IncompleteReadError, ValueError):
+        return "connection"
+
+
+async def run_open_loop(url, corpus, endpoints, rate, duration, connections=64, api_key=None, timeout=60.0):
+    """
+    Laço aberto: rate requisições por segundo durante duration segundos
+
+    Até connections requisições simultâneas; as excedentes esperam uma
+    conexão livre, e essa espera aparece na latência corrigida (medida a
+    partir do instante previsto de envio).
+
+    Returns:
+        dict: Ver LoadResults.report
+    """
+    target = urlsplit(url)
+    pool = asyncio.Queue()
+    for _ in range(connections):
+        pool.put_nowait(HTTPConnection(target.hostname, target.port or 80))
+    results = LoadResults()
+    loop = asyncio.get_running_loop()
+
+    async def fire(index, intended):
+        endpoint = endpoints[index % len(endpoints)]
+        connection = await pool.get()
+        try:
+            sent = loop.time()
+            outcome = await _send(connection, endpoint, corpus[index % len(corpus)], api_key, timeout)
+            finished = loop.time()
+            results.record(endpoint, outcome, (finished - sent) * 1000, (finished - intended) * 1000)
+        finally:
+            pool.put_nowait(connection)
+
+    start = loop.time()
+    tasks = []
+    total = int(rate * duration)
+    for index in range(total):
+        intended = start + index / rate
+        delay = intended - loop.time()
+        if delay > 0:
+            await asyncio.sleep(delay)
+        tasks.append(asyncio.ensure_future(fire(index, intended)))
+    await asyncio.gather(*tasks)
+    elapsed = loop.time() - start
+
+    while not pool.empty():
+        pool.get_nowait().close()
+    return results.report(elapsed)
+
+
+async def run_closed_loop(url, corpus, endpoints, concurrency, duration, api_key=None, timeout=60.0,
+                          expected_interval_ms=None):
+    """
+    Laço fechado: concurrency clientes, cada um com uma requisição por vez
+
+    Returns:
+        dict: Ver LoadResults.report
+    """
+    target = urlsplit(url)
+    results = LoadResults()
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = start + duration
+
+    async def client(worker):
+        connection = HTTPConnection(target.hostname, target.port or 80)
+        index = worker
+        while loop.time() < deadline:
+            endpoint = endpoints[index % len(endpoints)]
+            sent = loop.time()
+            outcome = await _send(connection, endpoint, corpus[index % len(corpus)], api_key, timeout)
+            results.record(endpoint, outcome, (loop.time() - sent) * 1000)
+            index += concurrency
+        connection.close()
+
+    await asyncio.gather(*(client(worker) for worker in range(concurrency)))
+    return results.report(loop.time() - start, expected_interval_ms)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Gerador de carga para /ocr/upload e /ocr/camera")
+    parser.add_argument("--url", default="http://127.0.0.1:8000", help="URL base do servidor")
+    parser.add_argument("--endpoint", default="upload,camera", help="Endpoints alternados (upload, camera)")
+    mode = parser.add_mutually_exclusive_group()
+    mode.add_argument("--rate", type=float, help="Laço aberto: requisições por segundo")
+    mode.add_argument("--concurrency", type=int, help="Laço fechado: clientes simultâneos")
+    parser.add_argument("--duration", type=float, default=30, help="Duração em segundos")
+    parser.add_argument("--connections", type=int, default=64, help="Conexões no laço aberto")
+    parser.add_argument("--timeout", type=float, default=60, help="Timeout por requisição em segundos")
+    parser.add_argument("--expected-interval-ms", type=float,
+                        help="Laço fechado: intervalo esperado para a correção (padrão: p50 medido)")
+    parser.add_argument("--corpus", help="Diretório de imagens (padrão: corpus sintético)")
+    parser.add_argument("--count", type=int, default=20, help="Documentos do corpus sintético")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--document-type", help="Tipo de documento enviado (padrão: o de cada documento)")
+    parser.add_argument("--api-key", default=os.environ.get("OCR_API_KEY"))
+    parser.add_argument("--output", help="Arquivo JSON do resultado")
+    parser.add_argument("--write-fake-responses", metavar="PATH",
+                        help="Grava as respostas do corpus sintético para OCR_FAKE_RESPONSES e sai")
+    args = parser.parse_args()
+
+    if args.write_fake_responses:
+        from ocr_engines import canned_responses
+        from synthetic_ids import generate_corpus
+        with open(args.write_fake_responses, "w") as f:
+            json.dump(canned_responses(generate_corpus(args.count, args.seed)), f, ensure_ascii=False)
+        return 0
+
+    if not (args.rate or args.concurrency):
+        parser.error("Informe --rate (laço aberto) ou --concurrency (laço fechado)")
+    endpoints = [endpoint for endpoint in args.endpoint.split(",") if endpoint]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown or not endpoints:
+        parser.error(f"Endpoints inválidos: {', '.join(sorted(unknown)) or args.endpoint}")
+    try:
+        corpus = load_corpus(args.corpus, args.count, args.seed, args.document_type)
+    except (OSError, ValueError) as e:
+        print(f"Erro ao carregar o corpus: {e}", file=sys.stderr)
+        return 1
+
+    if args.rate:
+        report = asyncio.run(run_open_loop(args.url, corpus, endpoints, args.rate, args.duration,
+                                           args.connections, args.api_key, args.timeout))
+    else:
+        report = asyncio.run(run_closed_loop(args.url, corpus, endpoints, args.concurrency, args.duration,
+                                             args.api_key, args.timeout, args.expected_interval_ms))
+    report["meta"] = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "url": args.url,
+        "mode": "open" if args.rate else "closed",
+        "rate": args.rate,
+        "concurrency": args.concurrency,
+        "duration_s": args.duration,
+        "endpoints": endpoints,
+        "corpus": args.corpus or f"synthetic:{args.count}:{args.seed}"
+    }
+
+    print(f"{report['requests']} requisições em {report['elapsed_s']:.1f}s: {report['throughput_rps']:.2f}/s "
+          f"({report['goodput_rps']:.2f}/s sem erro), erros {report['error_rate']:.2%}")
+    for label, key in (("medida", "latency_ms"), ("corrigida", "corrected_latency_ms")):
+        latency = report[key]
+        if latency["count"]:
+            print(f"latência {label:10} " + "  ".join(
+                f"p{q:g} {latency[f'p{q:g}']:.1f}ms" for q in PERCENTILES) + f"  max {latency['max']:.1f}ms")
+    for endpoint, stats in report["endpoints"].items():
+        if stats["errors"]:
+            print(f"erros em /ocr/{endpoint}: " + ", ".join(f"{kind}={n}" for kind, n in sorted(stats["errors"].items())))
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
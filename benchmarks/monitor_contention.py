@@ -0,0 +1,94 @@
+"""
+Benchmark de contenção do APIMonitor
+
+Dispara várias threads chamando record_request ao mesmo tempo e mede a vazão
+total (requisições registradas por segundo). Uso:
+
+    python benchmarks/monitor_contention.py --threads 32 --requests 20000
+"""
+import os
+import sys
+import time
+import argparse
+import threading
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from monitoring import APIMonitor
+
+ENDPOINTS = ["ocr_upload", "ocr_camera", "get_api_stats", "health"]
+STATUS_CODES = [200, 200, 200, 200, 200, 200, 400, 500]
+
+
+def run_benchmark(threads, requests_per_thread, stats_readers=0):
+    """
+    Executa o benchmark
+
+    Args:
+        threads: Número de threads registrando requisições
+        requests_per_thread: Requisições registradas por thread
+        stats_readers: Threads lendo get_stats em laço durante o teste
+
+    Returns:
+        dict: Resultado do benchmark
+    """
+    monitor = APIMonitor()
+    barrier = threading.Barrier(threads + 1)
+    done = threading.Event()
+
+    def writer(worker_id):
+        ip = f"10.0.0.{worker_id}"
+        barrier.wait()
+        for i in range(requests_per_thread):
+            monitor.record_request(
+                ENDPOINTS[i % len(ENDPOINTS)],
+                STATUS_CODES[i % len(STATUS_CODES)],
+                float(i % 500),
+                ip
+            )
+
+    def reader():
+        while not done.is_set():
+            monitor.get_stats()
+
+    workers = [threading.Thread(target=writer, args=(i,)) for i in range(threads)]
+    readers = [threading.Thread(target=reader) for _ in range(stats_readers)]
+    for thread in workers + readers:
+        thread.start()
+
+    barrier.wait()
+    start = time.perf_counter()
+    for thread in workers:
+        thread.join()
+    elapsed = time.perf_counter() - start
+
+    done.set()
+    for thread in readers:
+        thread.join()
+
+    total = threads * requests_per_thread
+    return {
+        "threads": threads,
+        "requests": total,
+        "elapsed_s": round(elapsed, 3),
+        "throughput_rps": round(total / elapsed, 1),
+        "per_request_us": round(elapsed / total * 1e6, 2)
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark de contenção do APIMonitor")
+    parser.add_argument("--threads", type=int, default=32)
+    parser.add_argument("--requests", type=int, default=20000, help="Requisições por thread")
+    parser.add_argument("--readers", type=int, default=1, help="Threads lendo get_stats em paralelo")
+    args = parser.parse_args()
+
+    result = run_benchmark(args.threads, args.requests, args.readers)
+    print(f"Threads: {result['threads']}")
+    print(f"Requisições registradas: {result['requests']}")
+    print(f"Tempo total: {result['elapsed_s']} s")
+    print(f"Vazão: {result['throughput_rps']} req/s ({result['per_request_us']} µs por requisição)")
+
+
+if __name__ == "__main__":
+    main()
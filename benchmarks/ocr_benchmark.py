@@ -0,0 +1,228 @@
+"""
+Benchmark do pipeline de OCR sobre o corpus sintético de documentos
+
+Mede latência (média, p50, p95, máximo), vazão e acerto por campo de cada
+etapa: preprocess_image, cada estratégia do Tesseract (STRATEGIES),
+process_document_data (sobre o texto impresso, sem OCR) e o pipeline
+completo (process_image_ocr). O resultado vai para um JSON que pode ser
+comparado com um baseline; regressões fazem o script sair com código 1. Uso:
+
+    python benchmarks/ocr_benchmark.py --count 30 --output bench.json
+    python benchmarks/ocr_benchmark.py --count 30 --baseline bench.json
+"""
+import os
+import sys
+import json
+import time
+import argparse
+import platform
+from datetime import datetime, timezone
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from ocr_service import (STRATEGIES, get_engine_version, preprocess_image, process_document_data,
+                         process_image_ocr, run_strategy)
+from synthetic_ids import DOC_TYPES, DEFAULT_WIDTHS, generate_corpus, score_fields
+
+STAGES = ["preprocess"] + [f"strategy:{name}" for name, _, _ in STRATEGIES] + ["process_document_data", "pipeline"]
+
+
+def _percentile(values, fraction):
+    values = sorted(values)
+    return values[int(fraction * (len(values) - 1))]
+
+
+def summarize(latencies_s, scores, errors):
+    """
+    Resume as medidas de uma etapa
+
+    Args:
+        latencies_s: Durações em segundos
+        scores: Acertos por campo de cada documento (lista de dicts)
+        errors: Erros ocorridos (o primeiro é guardado no resultado)
+
+    Returns:
+        dict: Latência em ms, vazão, acerto por campo e erros
+    """
+    result = {"count": len(latencies_s), "errors": len(errors)}
+    if errors:
+        result["error"] = errors[0]
+    if latencies_s:
+        total = sum(latencies_s)
+        result["latency_ms"] = {
+            "mean": round(total / len(latencies_s) * 1000, 3),
+            "p50": round(_percentile(latencies_s, 0.5) * 1000, 3),
+            "p95": round(_percentile(latencies_s, 0.95) * 1000, 3),
+            "max": round(max(latencies_s) * 1000, 3)
+        }
+        result["throughput_per_s"] = round(len(latencies_s) / total, 2) if total > 0 else None
+    if scores:
+        fields = {}
+        for score in scores:
+            for field, hit in score.items():
+                fields.setdefault(field, []).append(hit)
+        hits = sum(sum(values) for values in fields.values())
+        total_fields = sum(len(values) for values in fields.values())
+        result["accuracy"] = {
+            "overall": round(hits / total_fields, 4),
+            "documents": round(sum(all(score.values()) for score in scores) / len(scores), 4),
+            "fields": {field: round(sum(values) / len(values), 4) for field, values in sorted(fields.items())}
+        }
+    return result
+
+
+def run_benchmark(documents, stages=STAGES):
+    """
+    Executa as etapas selecionadas sobre os documentos
+
+    Uma etapa que falha (ex: Tesseract ausente) é interrompida no primeiro
+    erro e registrada com a mensagem, sem afetar as demais.
+
+    Args:
+        documents: Lista de SyntheticDocument
+        stages: Etapas a medir (ver STAGES)
+
+    Returns:
+        dict: Resultado por etapa (ver summarize)
+    """
+    preprocessed = [preprocess_image(document.image) for document in documents]
+    strategies = {f"strategy:{name}": (name, config, enhance) for name, config, enhance in STRATEGIES}
+    results = {}
+
+    for stage in stages:
+        latencies, scores, errors = [], [], []
+        for document, image in zip(documents, preprocessed):
+            try:
+                start = time.perf_counter()
+                if stage == "preprocess":
+                    preprocess_image(document.image)
+                    latencies.append(time.perf_counter() - start)
+                elif stage == "process_document_data":
+                    output = process_document_data(list(document.lines))
+                    latencies.append(time.perf_counter() - start)
+                    scores.append(score_fields(document, output))
+                elif stage == "pipeline":
+                    output = process_image_ocr(document.image)
+                    latencies.append(time.perf_counter() - start)
+                    # process_image_ocr devolve os erros do Tesseract como texto
+                    if output and output[0].startswith("Erro ao processar a imagem"):
+                        latencies.pop()
+                        raise RuntimeError(output[0])
+                    scores.append(score_fields(document, output))
+                elif stage in strategies:
+                    lines = run_strategy(image, *strategies[stage])
+                    latencies.append(time.perf_counter() - start)
+                    scores.append(score_fields(document, process_document_data(lines)))
+                else:
+                    raise ValueError(f"Etapa desconhecida: {stage}")
+            except Exception as e:
+                errors.append(f"{type(e).__name__}: {e}")
+                break
+        results[stage] = summarize(latencies, scores, errors)
+    return results
+
+
+def compare_to_baseline(results, baseline, latency_tolerance=0.25, accuracy_tolerance=0.02):
+    """
+    Compara um resultado com o baseline
+
+    Uma etapa que funcionava no baseline e agora tem erro (ex: Tesseract
+    ausente) ou não aparece no resultado é uma regressão; etapas que já
+    tinham erro no baseline não são comparadas.
+
+    Args:
+        results: Resultado atual (JSON de run)
+        baseline: Resultado de referência
+        latency_tolerance: Aumento relativo máximo do p50 (0.25 = +25%)
+        accuracy_tolerance: Queda absoluta máxima do acerto (geral e por campo)
+
+    Returns:
+        List[str]: Regressões encontradas (vazia se nenhuma)
+    """
+    regressions = []
+    for stage, reference in baseline.get("stages", {}).items():
+        if reference.get("errors"):
+            continue
+        current = results["stages"].get(stage)
+        if current is None:
+            regressions.append(f"{stage}: etapa ausente no resultado")
+            continue
+        if current.get("errors"):
+            regressions.append(f"{stage}: {current['errors']} erro(s), ex: {current.get('error')}")
+            continue
+
+        if "latency_ms" in current and "latency_ms" in reference:
+            before, after = reference["latency_ms"]["p50"], current["latency_ms"]["p50"]
+            if after > before * (1 + latency_tolerance):
+                regressions.append(f"{stage}: p50 {before:.3f}ms -> {after:.3f}ms")
+
+        if "accuracy" in current and "accuracy" in reference:
+            before, after = reference["accuracy"]["overall"], current["accuracy"]["overall"]
+            if after < before - accuracy_tolerance:
+                regressions.append(f"{stage}: acerto geral {before:.2%} -> {after:.2%}")
+            for field, before in reference["accuracy"]["fields"].items():
+                after = current["accuracy"]["fields"].get(field)
+                if after is not None and after < before - accuracy_tolerance:
+                    regressions.append(f"{stage}: acerto de {field} {before:.2%} -> {after:.2%}")
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark do pipeline de OCR com documentos sintéticos")
+    parser.add_argument("--count", type=int, default=30, help="Documentos no corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--doc-types", default=",".join(DOC_TYPES))
+    parser.add_argument("--widths", default=",".join(map(str, DEFAULT_WIDTHS)))
+    parser.add_argument("--clean", action="store_true", help="Sem ruído, desfoque, rotação e JPEG")
+    parser.add_argument("--stages", default=",".join(STAGES))
+    parser.add_argument("--output", help="Arquivo JSON do resultado")
+    parser.add_argument("--baseline", help="Resultado de referência para detectar regressões")
+    parser.add_argument("--latency-tolerance", type=float, default=0.25)
+    parser.add_argument("--accuracy-tolerance", type=float, default=0.02)
+    args = parser.parse_args()
+
+    doc_types = tuple(args.doc_types.split(","))
+    widths = tuple(int(width) for width in args.widths.split(","))
+    documents = generate_corpus(args.count, args.seed, doc_types, widths, degraded=not args.clean)
+    stages = [stage for stage in args.stages.split(",") if stage]
+
+    results = {
+        "meta": {
+            "created_at": datetime.now(timezone.utc).isoformat(),
+            "count": args.count,
+            "seed": args.seed,
+            "doc_types": list(doc_types),
+            "widths": list(widths),
+            "degraded": not args.clean,
+            "engine": get_engine_version(),
+            "python": platform.python_version()
+        },
+        "stages": run_benchmark(documents, stages)
+    }
+
+    for stage, result in results["stages"].items():
+        line = f"{stage:28}"
+        if "latency_ms" in result:
+            line += f" p50 {result['latency_ms']['p50']:9.2f}ms  p95 {result['latency_ms']['p95']:9.2f}ms" \
+                    f"  {result['throughput_per_s']:8.2f}/s"
+        if "accuracy" in result:
+            line += f"  acerto {result['accuracy']['overall']:.1%}"
+        if result.get("error"):
+            line += f"  ERRO: {result['error']}"
+        print(line)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=2, ensure_ascii=False)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            regressions = compare_to_baseline(results, json.load(f), args.latency_tolerance, args.accuracy_tolerance)
+        for regression in regressions:
+            print(f"REGRESSÃO: {regression}")
+        return 1 if regressions else 0
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,320 @@
+"""
+Teste de resistência (soak) que detecta crescimento de memória por requisição
+
+Executa centenas de milhares de requisições contra o app Flask ou FastAPI
+no próprio processo (pelo test client de cada framework), com o motor de
+OCR falso ou o Tesseract (ocr_engines.py). Varia o IP do cliente e mistura
+imagens corrompidas e API keys inválidas, para exercitar também os caminhos
+de erro. Depois do aquecimento, inicia o tracemalloc e, a cada
+--sample-every requisições, registra o RSS, a memória rastreada e as linhas
+que mais alocaram desde o início da medida.
+
+O crescimento por requisição é a inclinação (mínimos quadrados) da memória
+em função do número de requisições, a partir da primeira amostra: no
+primeiro intervalo, as estruturas limitadas (buffers de traces, cache de
+regex) trocam entradas alocadas antes do tracemalloc por entradas
+rastreadas, um degrau que não é vazamento. Acima de --max-traced-growth ou
+--max-rss-growth (bytes por requisição), o script sai com código 1 e lista
+as alocações que mais cresceram. Uso:
+
+    python benchmarks/soak_test.py --requests 200000 --engine fake --output soak.json
+    python benchmarks/soak_test.py --app fastapi --engine tesseract --requests 20000
+"""
+import os
+import gc
+import sys
+import json
+import logging
+import time
+import random
+import argparse
+import tracemalloc
+from datetime import datetime, timezone
+
+BENCHMARKS = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCHMARKS))
+sys.path.insert(0, BENCHMARKS)
+
+from accounting import current_rss_kb
+from load_generator import ENDPOINTS, build_request, load_corpus
+
+APPS = ("flask", "fastapi")
+
+
+class ClientIPApp:
+    """App ASGI que troca o endereço do cliente (fixo no TestClient) pelo IP da próxima requisição"""
+
+    def __init__(self, app):
+        self.app = app
+        self.client_ip = None
+
+    async def __call__(self, scope, receive, send):
+        if self.client_ip and scope["type"] == "http":
+            scope = dict(scope, client=(self.client_ip, 50000))
+        await self.app(scope, receive, send)
+
+
+def make_client(app_name):
+    """
+    Cliente de teste do app, no próprio processo
+
+    Args:
+        app_name: flask ou fastapi (o TestClient do FastAPI requer httpx)
+
+    Returns:
+        Callable[[str, dict, bytes, str], int]: send(path, headers, body, ip) -> status
+    """
+    if app_name == "flask":
+        from main import create_app
+        client = create_app().test_client()
+
+        def send(path, headers, body, client_ip):
+            response = client.post(path, data=body, headers=headers, environ_base={"REMOTE_ADDR": client_ip})
+            response.close()
+            return response.status_code
+        return send
+
+    if app_name == "fastapi":
+        try:
+            from fastapi.testclient import TestClient
+        except ImportError as e:
+            raise RuntimeError(f"O TestClient do FastAPI requer httpx: {e}") from e
+        from fastapi_server import create_app
+        app = ClientIPApp(create_app())
+        client = TestClient(app)
+        # Executa o lifespan (aquecimento e monitor do event loop)
+        client.__enter__()
+
+        def send(path, headers, body, client_ip):
+            # As requisições são sequenciais: o IP vale para a próxima
+            app.client_ip = client_ip
+            return client.post(path, content=body, headers=headers).status_code
+        return send
+
+    raise ValueError(f"App desconhecido: {app_name}")
+
+
+def use_engine(name, latency="0", failure_rate=0.0, seed=0):
+    """Troca o motor de OCR global (ver ocr_engines.py)"""
+    import ocr_engines
+    if name == "fake":
+        ocr_engines.ocr_engine = ocr_engines.FakeEngine(latency=latency, failure_rate=failure_rate, seed=seed)
+    else:
+        ocr_engines.ocr_engine = ocr_engines.create_engine(name)
+    return ocr_engines.ocr_engine
+
+
+def growth_per_request(samples, key):
+    """
+    Crescimento de memória por requisição
+
+    Args:
+        samples: Amostras com "requests" e o valor em KB em key
+        key: rss_kb ou traced_kb
+
+    Returns:
+        float: Inclinação de mínimos quadrados em bytes por requisição (0 com menos de 2 amostras)
+    """
+    points = [(sample["requests"], sample[key] * 1024) for sample in samples if key in sample]
+    if len(points) < 2:
+        return 0.0
+    mean_x = sum(x for x, _ in points) / len(points)
+    mean_y = sum(y for _, y in points) / len(points)
+    variance = sum((x - mean_x) ** 2 for x, _ in points)
+    if not variance:
+        return 0.0
+    return sum((x - mean_x) * (y - mean_y) for x, y in points) / variance
+
+
+def take_sample(requests, start, baseline=None, top=10):
+    """
+    RSS, memória rastreada e maiores crescimentos de alocação desde baseline
+
+    Returns:
+        tuple: (amostra, snapshot do tracemalloc ou None)
+    """
+    gc.collect()
+    sample = {"requests": requests, "elapsed_s": round(time.perf_counter() - start, 2), "rss_kb": current_rss_kb()}
+    if not tracemalloc.is_tracing():
+        return sample, None
+
+    sample["traced_kb"] = tracemalloc.get_traced_memory()[0] // 1024
+    snapshot = tracemalloc.take_snapshot().filter_traces((
+        tracemalloc.Filter(False, tracemalloc.__file__),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap>"),
+        tracemalloc.Filter(False, "<frozen importlib._bootstrap_external>"),
+        tracemalloc.Filter(False, "<unknown>"),
+    ))
+    if baseline is not None:
+        sample["top"] = [{
+            "location": f"{stat.traceback[0].filename}:{stat.traceback[0].lineno}",
+            "size_kb": round(stat.size / 1024, 1),
+            "size_diff_kb": round(stat.size_diff / 1024, 1),
+            "count_diff": stat.count_diff
+        } for stat in snapshot.compare_to(baseline, "lineno")[:top] if stat.size_diff > 0]
+    return sample, snapshot
+
+
+def run_soak(send, corpus, requests, warmup=2000, sample_every=10000, endpoints=ENDPOINTS, clients=1000,
+             invalid_fraction=0.02, bad_key_fraction=0.02, trace=True, top=10, seed=0, progress=None):
+    """
+    Executa o soak e amostra a memória
+
+    Args:
+        send: Cliente de make_client
+        corpus: Itens de load_corpus
+        requests: Requisições medidas (após o aquecimento)
+        warmup: Requisições antes da medida (enchem caches e estruturas limitadas)
+        sample_every: Requisições entre as amostras
+        endpoints: Endpoints alternados (upload, camera)
+        clients: IPs de cliente distintos
+        invalid_fraction: Fração de imagens corrompidas
+        bad_key_fraction: Fração de API keys inválidas
+        trace: Usar o tracemalloc (mais lento)
+        top: Alocações listadas por amostra
+        seed: Semente da mistura de requisições
+        progress: Chamado com cada amostra
+
+    Returns:
+        dict: Amostras, códigos de status, vazão e crescimento por requisição
+    """
+    rng = random.Random(seed)
+    statuses = {}
+    samples = []
+    baseline = None
+    start = time.perf_counter()
+
+    def one(index):
+        name, data, content_type, document_type = corpus[index % len(corpus)]
+        if rng.random() < invalid_fraction:
+            data = data[:len(data) // 8]
+        path, headers, body = build_request(endpoints[index % len(endpoints)], (name, data, content_type, document_type))
+        if rng.random() < bad_key_fraction:
+            headers["X-API-Key"] = "%040x" % rng.getrandbits(160)
+        client = rng.randrange(clients)
+        status = send(path, headers, body, f"10.{client >> 16 & 255}.{client >> 8 & 255}.{client & 255}")
+        statuses[status] = statuses.get(status, 0) + 1
+
+    for index in range(warmup):
+        one(index)
+
+    if trace:
+        tracemalloc.start()
+    measured_start = time.perf_counter()
+    sample, baseline = take_sample(0, start, top=top)
+    samples.append(sample)
+    for done in range(1, requests + 1):
+        one(warmup + done)
+        if done % sample_every == 0 or done == requests:
+            sample, _ = take_sample(done, start, baseline, top)
+            samples.append(sample)
+            if progress:
+                progress(sample)
+    elapsed = time.perf_counter() - measured_start
+    if trace:
+        tracemalloc.stop()
+    # A referência (requisição 0) fica de fora do ajuste; ver a descrição do módulo
+    fitted = samples[1:] if len(samples) > 2 else samples
+
+    return {
+        "requests": requests,
+        "warmup": warmup,
+        "statuses": {str(status): count for status, count in sorted(statuses.items())},
+        "throughput_rps": round(requests / elapsed, 1) if elapsed > 0 else 0.0,
+        "rss_growth_bytes_per_request": round(growth_per_request(fitted, "rss_kb"), 2),
+        "traced_growth_bytes_per_request": round(growth_per_request(fitted, "traced_kb"), 2) if trace else None,
+        "samples": samples
+    }
+
+
+def check_growth(report, max_traced_growth, max_rss_growth):
+    """
+    Returns:
+        List[str]: Limites ultrapassados (vazia se nenhum)
+    """
+    failures = []
+    traced = report["traced_growth_bytes_per_request"]
+    if traced is not None and traced > max_traced_growth:
+        failures.append(f"memória rastreada cresce {traced:.1f} bytes/requisição (limite {max_traced_growth:g})")
+    rss = report["rss_growth_bytes_per_request"]
+    if rss > max_rss_growth:
+        failures.append(f"RSS cresce {rss:.1f} bytes/requisição (limite {max_rss_growth:g})")
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Soak test com detecção de crescimento de memória")
+    parser.add_argument("--app", choices=APPS, default="flask")
+    parser.add_argument("--engine", choices=("fake", "tesseract"), default="fake")
+    parser.add_argument("--fake-latency", default="0", help="Latência do motor falso (ver ocr_engines.parse_latency)")
+    parser.add_argument("--fake-failure-rate", type=float, default=0.01)
+    parser.add_argument("--requests", type=int, default=200000, help="Requisições medidas")
+    parser.add_argument("--warmup", type=int, default=2000, help="Requisições antes da medida")
+    parser.add_argument("--sample-every", type=int, default=10000)
+    parser.add_argument("--endpoint", default="upload,camera", help="Endpoints alternados (upload, camera)")
+    parser.add_argument("--clients", type=int, default=1000, help="IPs de cliente distintos")
+    parser.add_argument("--invalid-fraction", type=float, default=0.02, help="Fração de imagens corrompidas")
+    parser.add_argument("--bad-key-fraction", type=float, default=0.02, help="Fração de API keys inválidas")
+    parser.add_argument("--no-tracemalloc", action="store_true", help="Apenas RSS (mais rápido)")
+    parser.add_argument("--top", type=int, default=10, help="Alocações listadas por amostra")
+    parser.add_argument("--max-traced-growth", type=float, default=64, help="Bytes por requisição (tracemalloc)")
+    parser.add_argument("--max-rss-growth", type=float, default=512, help="Bytes por requisição (RSS)")
+    parser.add_argument("--corpus", help="Diretório de imagens (padrão: corpus sintético)")
+    parser.add_argument("--count", type=int, default=20, help="Documentos do corpus sintético")
+    parser.add_argument("--widths", default="640", help="Larguras do corpus sintético")
+    parser.add_argument("--clean", action="store_true", help="Corpus sintético sem ruído, desfoque, rotação e JPEG")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--log-level", default="WARNING", help="Nível de log do app durante o soak")
+    parser.add_argument("--output", help="Arquivo JSON do resultado")
+    args = parser.parse_args()
+
+    endpoints = [endpoint for endpoint in args.endpoint.split(",") if endpoint]
+    unknown = set(endpoints) - set(ENDPOINTS)
+    if unknown or not endpoints:
+        parser.error(f"Endpoints inválidos: {', '.join(sorted(unknown)) or args.endpoint}")
+    widths = tuple(int(width) for width in args.widths.split(","))
+    corpus = load_corpus(args.corpus, args.count, args.seed, widths=widths, degraded=not args.clean)
+
+    engine = use_engine(args.engine, args.fake_latency, args.fake_failure_rate, args.seed)
+    send = make_client(args.app)
+    # Os apps configuram o log em DEBUG/INFO ao serem importados; uma linha por requisição dominaria o soak
+    logging.getLogger().setLevel(args.log_level.upper())
+
+    def progress(sample):
+        line = f"{sample['requests']:>9} requisições  {sample['elapsed_s']:8.1f}s  RSS {sample['rss_kb'] / 1024:8.1f}MB"
+        if "traced_kb" in sample:
+            line += f"  rastreada {sample['traced_kb'] / 1024:8.2f}MB"
+        print(line, flush=True)
+
+    report = run_soak(send, corpus, args.requests, args.warmup, args.sample_every, endpoints, args.clients,
+                      args.invalid_fraction, args.bad_key_fraction, not args.no_tracemalloc, args.top,
+                      args.seed, progress)
+    failures = check_growth(report, args.max_traced_growth, args.max_rss_growth)
+    report["meta"] = {
+        "created_at": datetime.now(timezone.utc).isoformat(),
+        "app": args.app,
+        "engine": engine.version(),
+        "corpus": args.corpus or f"synthetic:{args.count}:{args.seed}",
+        "max_traced_growth": args.max_traced_growth,
+        "max_rss_growth": args.max_rss_growth
+    }
+    report["failures"] = failures
+
+    print(f"{report['throughput_rps']:.1f} requisições/s, status {report['statuses']}")
+    print(f"crescimento por requisição: RSS {report['rss_growth_bytes_per_request']:.1f} bytes"
+          + (f", rastreada {report['traced_growth_bytes_per_request']:.1f} bytes"
+             if report["traced_growth_bytes_per_request"] is not None else ""))
+    if failures:
+        for failure in failures:
+            print(f"FALHA: {failure}")
+        for allocation in report["samples"][-1].get("top", []):
+            print(f"  +{allocation['size_diff_kb']:10.1f}KB {allocation['count_diff']:+8d}  {allocation['location']}")
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(report, f, indent=2, ensure_ascii=False)
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
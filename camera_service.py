@@ -2,13 +2,12 @@ import base64
 import logging
 from PIL import Image
 from io import BytesIO
-import numpy as np
 from typing import Optional
 
 # Configure logging
 logger = logging.getLogger(__name__)
 
-def process_camera_image(image_data: str) -> Optional[np.ndarray]:
+def process_camera_image(image_data: str) -> Optional[Image.Image]:
     """
     Process a base64 encoded image from camera
     
@@ -16,7 +15,7 @@ def process_camera_image(image_data: str) -> Optional[np.ndarray]:
         image_data: Base64-encoded image string
     
     Returns:
-        numpy.ndarray: Image array or None if processing fails
+        PIL.Image.Image: Decoded RGB image or None if processing fails
     """
     try:
         # Remove data URL prefix if present
@@ -32,16 +31,16 @@ def process_camera_image(image_data: str) -> Optional[np.ndarray]:
         # Convert to RGB if needed
         if image.mode != 'RGB':
             image = image.convert('RGB')
+        else:
+            # Decode now so corrupt data fails here rather than in the OCR pipeline
+            image.load()
         
-        # Convert to numpy array
-        image_array = np.array(image)
-        
-        if image_array is None or image_array.size == 0:
+        if image.width == 0 or image.height == 0:
             logger.error("Failed to decode camera image")
             return None
         
-        logger.debug(f"Successfully processed camera image with shape {image_array.shape}")
-        return image_array
+        logger.debug(f"Successfully processed camera image with size {image.size}")
+        return image
     
     except Exception as e:
         logger.error(f"Error processing camera image: {str(e)}")
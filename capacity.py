@@ -0,0 +1,125 @@
+import os
+import asyncio
+import logging
+from collections import deque
+
+from scheduler import ocr_scheduler
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Intervalo (segundos) entre as medidas de atraso do event loop
+EVENT_LOOP_LAG_INTERVAL = float(os.environ.get("EVENT_LOOP_LAG_INTERVAL", 0.5))
+# Atraso do event loop (ms) considerado saturação (utilização 1.0)
+EVENT_LOOP_LAG_THRESHOLD_MS = float(os.environ.get("EVENT_LOOP_LAG_THRESHOLD_MS", 100))
+# Utilização a partir da qual o worker é informado como saturado
+CAPACITY_SATURATION_UTILIZATION = float(os.environ.get("CAPACITY_SATURATION_UTILIZATION", 1.0))
+
+
+class EventLoopLagMonitor:
+    """
+    Mede o atraso do event loop do ASGI
+
+    Uma tarefa dorme EVENT_LOOP_LAG_INTERVAL segundos e mede quanto acordou
+    depois do previsto: código bloqueante no event loop aparece como atraso,
+    mesmo com as threads de OCR ociosas.
+    """
+
+    def __init__(self, interval=EVENT_LOOP_LAG_INTERVAL, samples=120):
+        """
+        Args:
+            interval: Intervalo entre as medidas em segundos
+            samples: Medidas mantidas (padrão: 1 minuto com intervalo de 0.5s)
+        """
+        self.interval = interval
+        self.samples = deque(maxlen=samples)
+        self._task = None
+
+    def start(self):
+        """Inicia a medição no event loop atual"""
+        if self._task is None or self._task.done():
+            self.samples.clear()
+            self._task = asyncio.get_running_loop().create_task(self._run())
+        return self._task
+
+    async def stop(self):
+        """Encerra a medição"""
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            start = loop.time()
+            await asyncio.sleep(self.interval)
+            self.samples.append(max(loop.time() - start - self.interval, 0.0))
+
+    def get_stats(self):
+        """
+        Returns:
+            dict: Atraso do event loop em ms (última medida, média e máximo recentes)
+        """
+        samples = list(self.samples)
+        return {
+            "samples": len(samples),
+            "last": round(samples[-1] * 1000, 1) if samples else 0.0,
+            "avg": round(sum(samples) / len(samples) * 1000, 1) if samples else 0.0,
+            "max": round(max(samples) * 1000, 1) if samples else 0.0
+        }
+
+
+def capacity_report(scheduler=None, loop_monitor=None):
+    """
+    Capacidade atual do worker, para health checks e autoscaling
+
+    A utilização é a do escalonador de OCR ((em execução + na fila) /
+    workers); no ASGI, um event loop atrasado também satura o worker, e a
+    utilização passa a ser o maior dos dois (atraso recente /
+    EVENT_LOOP_LAG_THRESHOLD_MS).
+
+    Args:
+        scheduler: FairShareScheduler (padrão: o global)
+        loop_monitor: EventLoopLagMonitor (apenas no ASGI)
+
+    Returns:
+        dict: Fila, workers ocupados/ociosos, espera recente na fila, atraso
+            do event loop, utilização e se o worker está saturado
+    """
+    stats = (scheduler or ocr_scheduler).get_stats()
+    report = {
+        "workers": stats["workers"],
+        "busy_workers": stats["running"],
+        "idle_workers": stats["idle"],
+        "queue_depth": stats["queued"],
+        "oldest_queued_ms": stats["oldest_queued_ms"],
+        "queue_delay_ms": stats["queue_delay_ms"],
+    }
+    utilization = stats["utilization"]
+    if loop_monitor is not None:
+        lag = loop_monitor.get_stats()
+        report["event_loop_lag_ms"] = lag
+        utilization = max(utilization, lag["avg"] / EVENT_LOOP_LAG_THRESHOLD_MS)
+    report["utilization"] = round(utilization, 4)
+    report["saturated"] = utilization >= CAPACITY_SATURATION_UTILIZATION
+    return report
+
+
+def health_status(capacity, ready=True):
+    """
+    Status do worker para os health checks
+
+    Returns:
+        str: warming_up (aquecimento em andamento), saturated ou healthy
+    """
+    if not ready:
+        return "warming_up"
+    return "saturated" if capacity["saturated"] else "healthy"
+
+
+# Instância global para uso em toda a aplicação
+event_loop_lag = EventLoopLagMonitor()
@@ -0,0 +1,133 @@
+import os
+import time
+import asyncio
+import logging
+
+try:
+    import resource
+except ImportError:  # Plataformas sem getrusage (ex: Windows)
+    resource = None
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Tempo máximo padrão de uma requisição de OCR, em segundos
+DEFAULT_REQUEST_TIMEOUT = float(os.environ.get("OCR_REQUEST_TIMEOUT", 30))
+# Limite superior aceito no header X-Request-Timeout
+MAX_REQUEST_TIMEOUT = float(os.environ.get("OCR_MAX_REQUEST_TIMEOUT", 120))
+# Header usado pelo cliente para informar o seu próprio timeout
+TIMEOUT_HEADER = "X-Request-Timeout"
+
+
+class DeadlineExceeded(Exception):
+    """
+    Levantada quando o prazo de uma requisição expira ou ela é cancelada
+
+    Attributes:
+        reason: Motivo do cancelamento ("timeout" ou "client_disconnected")
+        stage: Etapa do pipeline em que o cancelamento foi detectado
+        cpu_ms: Tempo de CPU gasto até o cancelamento (preenchido pelo pipeline)
+    """
+
+    def __init__(self, reason="timeout", stage=None):
+        super().__init__(f"Requisição cancelada ({reason}) na etapa {stage or 'desconhecida'}")
+        self.reason = reason
+        self.stage = stage
+        self.cpu_ms = 0.0
+
+
+class Deadline:
+    """
+    Prazo de uma requisição, propagado por todo o pipeline de OCR
+
+    O prazo expira quando o tempo acaba ou quando é cancelado explicitamente
+    (por exemplo, quando o cliente se desconecta).
+    """
+
+    def __init__(self, timeout=DEFAULT_REQUEST_TIMEOUT):
+        """
+        Args:
+            timeout: Tempo disponível em segundos a partir de agora
+        """
+        self.timeout = timeout
+        self.expires_at = time.monotonic() + timeout
+        self.cancel_reason = None
+
+    @classmethod
+    def from_headers(cls, headers, default=None):
+        """
+        Cria o prazo a partir do header X-Request-Timeout (em segundos)
+
+        Args:
+            headers: Headers da requisição (Flask ou Starlette)
+            default: Timeout padrão quando o header está ausente ou inválido
+
+        Returns:
+            Deadline: Prazo da requisição
+        """
+        timeout = DEFAULT_REQUEST_TIMEOUT if default is None else default
+        value = headers.get(TIMEOUT_HEADER)
+        if value:
+            try:
+                timeout = float(value)
+            except ValueError:
+                logger.warning(f"Valor inválido para {TIMEOUT_HEADER}: {value}")
+        return cls(min(max(timeout, 0.0), MAX_REQUEST_TIMEOUT))
+
+    def remaining(self):
+        """Segundos restantes até o fim do prazo (0 se expirado ou cancelado)"""
+        if self.cancel_reason:
+            return 0.0
+        return max(self.expires_at - time.monotonic(), 0.0)
+
+    def expired(self):
+        """Indica se o prazo acabou ou se a requisição foi cancelada"""
+        return self.cancel_reason is not None or time.monotonic() >= self.expires_at
+
+    def cancel(self, reason="client_disconnected"):
+        """Cancela a requisição; as etapas seguintes do pipeline não serão executadas"""
+        if self.cancel_reason is None:
+            self.cancel_reason = reason
+
+    def check(self, stage=None):
+        """
+        Levanta DeadlineExceeded se o prazo tiver acabado
+
+        Args:
+            stage: Nome da etapa que está para começar (para logs e métricas)
+        """
+        if self.expired():
+            raise DeadlineExceeded(self.cancel_reason or "timeout", stage)
+
+
+def cpu_time():
+    """
+    Tempo de CPU em segundos da thread atual somado ao dos processos filhos
+
+    O tempo dos filhos (Tesseract) vem de getrusage(RUSAGE_CHILDREN) e é do
+    processo inteiro, então é aproximado quando há requisições simultâneas.
+    """
+    total = time.thread_time()
+    if resource is not None:
+        usage = resource.getrusage(resource.RUSAGE_CHILDREN)
+        total += usage.ru_utime + usage.ru_stime
+    return total
+
+
+async def watch_disconnect(request, deadline, interval=0.25):
+    """
+    Cancela o prazo quando o cliente de uma requisição ASGI se desconecta
+
+    Deve ser executada como task enquanto o OCR estiver em andamento.
+
+    Args:
+        request: Requisição Starlette/FastAPI
+        deadline: Prazo da requisição
+        interval: Intervalo entre verificações, em segundos
+    """
+    while not deadline.expired():
+        if await request.is_disconnected():
+            logger.info("Cliente desconectado; cancelando o processamento OCR")
+            deadline.cancel("client_disconnected")
+            return
+        await asyncio.sleep(interval)
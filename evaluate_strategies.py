@@ -0,0 +1,178 @@
+"""
+Avaliação de acerto x custo das estratégias de OCR
+
+Executa cada estratégia (STRATEGIES em ocr_service.py) uma vez por
+documento de um corpus rotulado (synthetic_ids.py), mede a CPU gasta
+(pipeline e Tesseract) e avalia todas as combinações de estratégias
+juntando as linhas como extract_text_from_image. Para cada tipo de
+documento (e para o corpus inteiro, "default") calcula a fronteira de
+Pareto acerto x CPU e escolhe o conjunto mais barato que atinge o acerto
+alvo. O resultado é o arquivo lido pelo serviço em OCR_STRATEGY_CONFIG. Uso:
+
+    python evaluate_strategies.py --count 60 --target-accuracy 0.9 --output strategy_config.json
+    OCR_STRATEGY_CONFIG=strategy_config.json gunicorn ...
+"""
+import sys
+import json
+import time
+import argparse
+import logging
+from itertools import combinations
+from datetime import datetime, timezone
+
+from deadline import cpu_time
+from ocr_service import STRATEGIES, get_engine_version, merge_lines, preprocess_image, process_document_data, run_strategy
+from synthetic_ids import DOC_TYPES, DEFAULT_WIDTHS, generate_corpus, score_fields
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+
+def measure_strategies(documents, strategies=STRATEGIES):
+    """
+    Executa cada estratégia em cada documento
+
+    Args:
+        documents: Lista de SyntheticDocument
+        strategies: Entradas de STRATEGIES a executar
+
+    Returns:
+        list: Por documento, {estratégia: (linhas, CPU em ms)}
+    """
+    runs = []
+    for document in documents:
+        image = preprocess_image(document.image)
+        results = {}
+        for name, config, enhance in strategies:
+            # cpu_time() já soma a CPU dos processos filhos (Tesseract)
+            cpu_start = cpu_time()
+            lines = run_strategy(image, name, config, enhance)
+            cpu_ms = (cpu_time() - cpu_start) * 1000
+            results[name] = (lines, cpu_ms)
+        runs.append(results)
+    return runs
+
+
+def evaluate_subsets(documents, runs, names=None):
+    """
+    Acerto e custo de cada combinação de estratégias
+
+    As linhas das estratégias de uma combinação são juntadas na ordem de
+    STRATEGIES (como em extract_text_from_image) e processadas por
+    process_document_data; o custo é a soma da CPU medida de cada uma.
+
+    Args:
+        documents: Lista de SyntheticDocument
+        runs: Resultado de measure_strategies para os mesmos documentos
+        names: Estratégias avaliadas (padrão: as de STRATEGIES)
+
+    Returns:
+        List[dict]: Por combinação: strategies, accuracy (acertos/campos) e cpu_ms (média por documento)
+    """
+    names = names or [name for name, _, _ in STRATEGIES]
+    results = []
+    for size in range(1, len(names) + 1):
+        for subset in combinations(names, size):
+            hits = fields = 0
+            cpu_ms = 0.0
+            for document, run in zip(documents, runs):
+                lines = merge_lines(run[name][0] for name in subset)
+                scores = score_fields(document, process_document_data(lines))
+                hits += sum(scores.values())
+                fields += len(scores)
+                cpu_ms += sum(run[name][1] for name in subset)
+            results.append({
+                "strategies": list(subset),
+                "accuracy": round(hits / fields, 4) if fields else 0.0,
+                "cpu_ms": round(cpu_ms / len(documents), 3) if documents else 0.0
+            })
+    return results
+
+
+def pareto_frontier(results):
+    """
+    Combinações não dominadas (nenhuma outra é mais barata e tão precisa)
+
+    Returns:
+        List[dict]: Fronteira em ordem crescente de custo (e de acerto)
+    """
+    frontier = []
+    for result in sorted(results, key=lambda r: (r["cpu_ms"], -r["accuracy"])):
+        if not frontier or result["accuracy"] > frontier[-1]["accuracy"]:
+            frontier.append(result)
+    return frontier
+
+
+def choose_strategies(frontier, target_accuracy):
+    """
+    Combinação mais barata da fronteira com acerto >= alvo
+
+    Se nenhuma atinge o alvo, a de maior acerto.
+    """
+    for result in frontier:
+        if result["accuracy"] >= target_accuracy:
+            return result
+    return frontier[-1]
+
+
+def build_config(documents, runs, target_accuracy):
+    """
+    Fronteiras por tipo de documento e a configuração para OCR_STRATEGY_CONFIG
+
+    Returns:
+        dict: strategies (tipo -> nomes), chosen (acerto e custo escolhidos) e frontier
+    """
+    groups = {"default": list(range(len(documents)))}
+    for i, document in enumerate(documents):
+        groups.setdefault(document.doc_type, []).append(i)
+
+    config = {"target_accuracy": target_accuracy, "strategies": {}, "chosen": {}, "frontier": {}}
+    for doc_type, indexes in groups.items():
+        results = evaluate_subsets([documents[i] for i in indexes], [runs[i] for i in indexes])
+        frontier = pareto_frontier(results)
+        chosen = choose_strategies(frontier, target_accuracy)
+        config["strategies"][doc_type] = chosen["strategies"]
+        config["chosen"][doc_type] = chosen
+        config["frontier"][doc_type] = frontier
+    return config
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Escolha das estratégias de OCR por acerto x custo")
+    parser.add_argument("--count", type=int, default=60, help="Documentos no corpus")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--doc-types", default=",".join(DOC_TYPES))
+    parser.add_argument("--widths", default=",".join(map(str, DEFAULT_WIDTHS)))
+    parser.add_argument("--clean", action="store_true", help="Sem ruído, desfoque, rotação e JPEG")
+    parser.add_argument("--target-accuracy", type=float, default=0.9, help="Acerto por campo mínimo (0-1)")
+    parser.add_argument("--output", default="strategy_config.json")
+    args = parser.parse_args()
+
+    doc_types = tuple(args.doc_types.split(","))
+    widths = tuple(int(width) for width in args.widths.split(","))
+    documents = generate_corpus(args.count, args.seed, doc_types, widths, degraded=not args.clean)
+
+    start = time.perf_counter()
+    try:
+        runs = measure_strategies(documents)
+    except Exception as e:
+        print(f"Erro ao executar o Tesseract: {e}", file=sys.stderr)
+        return 1
+    config = build_config(documents, runs, args.target_accuracy)
+    config["corpus"] = {"count": args.count, "seed": args.seed, "doc_types": list(doc_types),
+                        "widths": list(widths), "degraded": not args.clean}
+    config["engine"] = get_engine_version()
+    config["generated_at"] = datetime.now(timezone.utc).isoformat()
+
+    for doc_type, chosen in config["chosen"].items():
+        print(f"{doc_type:8} {'+'.join(chosen['strategies']):40} acerto {chosen['accuracy']:.1%}  "
+              f"CPU {chosen['cpu_ms']:.1f}ms  (fronteira: {len(config['frontier'][doc_type])} combinações)")
+    print(f"Avaliado em {time.perf_counter() - start:.1f}s")
+
+    with open(args.output, "w") as f:
+        json.dump(config, f, indent=2, ensure_ascii=False)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,673 @@
+import os
+import time
+import asyncio
+import logging
+from io import BytesIO
+from contextlib import asynccontextmanager
+from typing import List, Optional as OptionalType
+from enum import Enum
+from PIL import Image
+
+from fastapi import FastAPI, APIRouter, UploadFile, File, HTTPException, Request, Form, Query, Depends
+from fastapi.responses import HTMLResponse, JSONResponse, PlainTextResponse, Response, StreamingResponse
+from fastapi.staticfiles import StaticFiles
+from fastapi.templating import Jinja2Templates
+from fastapi.middleware.cors import CORSMiddleware
+from pydantic import BaseModel, Field
+from starlette.concurrency import run_in_threadpool
+
+from camera_service import process_camera_image
+from auth import create_api_key
+from auth_fastapi import optional_api_key, require_admin, rate_limit_headers, run_ocr_job as run_ocr_job_async
+from security import compress_image
+from security_fastapi import SecurityHeadersMiddleware, RequestMonitoringMiddleware, validate_file_upload
+from monitoring import api_monitor
+from metrics_exporter import generate_metrics, OPENMETRICS_CONTENT_TYPE
+from scheduler import ocr_scheduler
+from deadline import Deadline, DeadlineExceeded, watch_disconnect
+from accounting import ResourceUsage
+from flight_recorder import flight_recorder
+from tracing import start_trace, end_trace, span, recent_traces, sanitize_request_id
+from profiler import sampling_profiler, ProfilerBusy, PROFILER_MAX_SECONDS, PROFILE_FORMATS, load_profile
+from warmup import warmup
+from capacity import capacity_report, health_status, event_loop_lag
+
+##########################
+# IMPLEMENTAÇÃO FASTAPI
+##########################
+# Servida em produção pelo asgi.py (gunicorn -k uvicorn.workers.UvicornWorker asgi:app),
+# com os mesmos controles do Flask: API key, rate limit, cota, validação de upload,
+# cabeçalhos de segurança e monitoramento. O OCR roda no pool do escalonador.
+# Este módulo não importa o Flask app (main.py), e o main.py não importa este módulo.
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Modelos Pydantic para FastAPI
+class OCRLanguage(str, Enum):
+    PORTUGUESE = "por"
+    ENGLISH = "eng"
+    SPANISH = "spa"
+    AUTO = "auto"
+
+class DocumentType(str, Enum):
+    RG = "rg"
+    CPF = "cpf"
+    CNH = "cnh"
+    GENERIC = "generic"
+
+class FastAPIResponse(BaseModel):
+    text: List[str] = []
+    status: str = ""
+    processing_time_ms: OptionalType[float] = None
+    language_detected: OptionalType[str] = None
+    document_type: OptionalType[str] = None
+
+class FastAPIErrorResponse(BaseModel):
+    status: str = "error"
+    message: str
+    error_code: OptionalType[int] = None
+
+class FastAPICameraRequest(BaseModel):
+    image_data: str
+    language: OptionalType[OCRLanguage] = OCRLanguage.PORTUGUESE
+    document_type: OptionalType[DocumentType] = DocumentType.GENERIC
+    enhanced_processing: bool = True
+
+class OCRSettings(BaseModel):
+    language: OCRLanguage = OCRLanguage.PORTUGUESE
+    document_type: DocumentType = DocumentType.GENERIC
+    enhanced_processing: bool = True
+    confidence_threshold: float = Field(0.0, ge=0.0, le=100.0)
+
+class FastAPICreateAPIKeyRequest(BaseModel):
+    user_id: str
+    name: str
+    rate_limit: int = 60
+    expires_days: int = 30
+    permissions: List[str] = ["read"]
+    weight: float = 1.0
+    max_concurrency: OptionalType[int] = None
+
+class OCRStatistics(BaseModel):
+    total_requests: int = 0
+    successful_requests: int = 0
+    failed_requests: int = 0
+    average_processing_time_ms: float = 0.0
+
+# Armazenar estatísticas em memória
+ocr_stats = OCRStatistics()
+
+# Rotas registradas no app por create_app()
+router = APIRouter()
+
+# Templates
+templates = Jinja2Templates(directory="templates")
+# Os templates usam url_for('static', filename=...) do Flask
+templates.env.globals["url_for"] = lambda endpoint, filename: f"/static/{filename}"
+
+# Tracing por requisição: header Server-Timing e export no formato Chrome Trace
+async def trace_requests(request: Request, call_next):
+    """Cria o trace da requisição e devolve os tempos por etapa no header Server-Timing"""
+    start_time = time.time()
+    # O id do trace é sempre gerado aqui; o X-Request-ID do cliente é só devolvido em X-Client-Request-ID
+    trace, token = start_trace(name=request.url.path,
+                               client_request_id=sanitize_request_id(request.headers.get("X-Request-ID")))
+    try:
+        response = await call_next(request)
+    finally:
+        end_trace(token)
+    duration_ms = (time.time() - start_time) * 1000
+    response.headers["Server-Timing"] = trace.server_timing_header(duration_ms)
+    response.headers["X-Request-ID"] = trace.request_id
+    if trace.client_request_id:
+        response.headers["X-Client-Request-ID"] = trace.client_request_id
+    api_monitor.record_stage_times(trace.stage_timings())
+    recent_traces.add(trace)
+    
+    # Cota em unidades de computação consumida pelo OCR da requisição
+    quota_result = getattr(request.state, "compute_quota", None)
+    if quota_result is not None:
+        response.headers.update(quota_result.headers(prefix="X-ComputeQuota"))
+    
+    # Capturar a requisição de OCR se ela passou do limite do flight recorder (hash,
+    # criptografia e gravação da captura rodam no threadpool, fora do event loop)
+    flight_input = getattr(request.state, "flight_input", None)
+    if flight_input is not None:
+        image, settings = flight_input
+        await run_in_threadpool(flight_recorder.observe, duration_ms, request.url.path, image, settings,
+                                trace=trace, status=response.status_code)
+    return response
+
+# Função para obter configurações de OCR
+def get_ocr_settings(
+    language: OCRLanguage = Query(OCRLanguage.PORTUGUESE, description="Idioma para OCR"),
+    document_type: DocumentType = Query(DocumentType.GENERIC, description="Tipo de documento"),
+    enhanced_processing: bool = Query(True, description="Usar processamento avançado"),
+    confidence_threshold: float = Query(0.0, ge=0.0, le=100.0, description="Limite de confiança (0-100)")
+) -> OCRSettings:
+    return OCRSettings(
+        language=language,
+        document_type=document_type,
+        enhanced_processing=enhanced_processing,
+        confidence_threshold=confidence_threshold
+    )
+
+def deadline_exceeded_error(error: DeadlineExceeded, endpoint: str) -> HTTPException:
+    """Registra a requisição abandonada e cria o erro HTTP correspondente"""
+    api_monitor.record_abandoned_request(endpoint, error.reason, error.cpu_ms)
+    ocr_stats.total_requests += 1
+    ocr_stats.failed_requests += 1
+    
+    if error.reason == "client_disconnected":
+        # 499: cliente fechou a conexão (convenção do nginx)
+        return HTTPException(status_code=499, detail="Client closed request")
+    return HTTPException(status_code=504, detail="Request deadline exceeded")
+
+# Rota raiz - servir a interface web
+@router.get("/", response_class=HTMLResponse)
+async def fastapi_read_root(request: Request):
+    """Serve a interface web para o serviço OCR"""
+    return templates.TemplateResponse(request, "index.html")
+
+def decode_image(file_bytes):
+    """
+    Decodifica a imagem enviada (chamada no pool de threads, fora do event loop)
+
+    Args:
+        file_bytes: Conteúdo do arquivo
+
+    Returns:
+        PIL.Image: Imagem RGB já decodificada
+    """
+    image = Image.open(BytesIO(file_bytes))
+    # Converter para RGB se necessário; load() decodifica os pixels aqui, e não no escalonador
+    if image.mode != 'RGB':
+        return image.convert('RGB')
+    image.load()
+    return image
+
+# Endpoint de upload de imagem OCR
+@router.post("/ocr/upload", response_model=FastAPIResponse, 
+                 responses={400: {"model": FastAPIErrorResponse}, 500: {"model": FastAPIErrorResponse}})
+async def fastapi_ocr_upload(
+    http_request: Request,
+    file: UploadFile = Depends(validate_file_upload),
+    settings: OCRSettings = Depends(get_ocr_settings),
+    user: OptionalType[dict] = Depends(optional_api_key)
+):
+    """
+    Processa OCR em uma imagem de documento enviada
+    
+    Args:
+        http_request: Requisição HTTP (identifica o cliente no escalonador)
+        file: Arquivo de imagem enviado (validado por validate_file_upload)
+        settings: Configurações para o processamento OCR
+        user: Dados da API key (None para requisições anônimas)
+    
+    Returns:
+        FastAPIResponse: Texto extraído e status
+    """
+    start_time = time.time()
+    
+    # Prazo da requisição; também é cancelado se o cliente se desconectar
+    deadline = Deadline.from_headers(http_request.headers)
+    disconnect_watcher = asyncio.create_task(watch_disconnect(http_request, deadline))
+    # Recursos consumidos pelo OCR (CPU, Tesseract, pixels, memória)
+    usage = ResourceUsage()
+    client = user["user_id"] if user else "anonymous"
+    
+    logger.info(f"FastAPI: Recebeu upload de arquivo: {file.filename}")
+    logger.info(f"FastAPI: Configurações: idioma={settings.language}, tipo={settings.document_type}, avançado={settings.enhanced_processing}")
+    
+    try:
+        # Ler o conteúdo do arquivo
+        file_bytes = await file.read()
+        file_size = len(file_bytes)
+        
+        # Entrada guardada pelo flight recorder se a requisição for lenta
+        http_request.state.flight_input = (file_bytes, {
+            "source": "upload",
+            "language": settings.language.value,
+            "document_type": settings.document_type.value,
+            "enhanced_processing": settings.enhanced_processing,
+            "compress": file_size > 1024 * 1024
+        })
+        
+        # Converter para Image usando PIL (decodificação fora do event loop)
+        with span('decode'):
+            image_pil = await run_in_threadpool(decode_image, file_bytes)
+        
+        # Comprimir imagem se for grande (fora do event loop)
+        if file_size > 1024 * 1024:
+            with span('compress'):
+                image_pil = await run_in_threadpool(compress_image, image_pil, 1800, 85)
+            
+        # Processar a imagem com OCR no escalonador, sem bloquear o event loop
+        extracted_text = await run_ocr_job_async(http_request, image_pil, deadline, usage,
+                                                settings.document_type.value)
+        api_monitor.record_resource_usage(usage, "/ocr/upload", settings.document_type.value, client)
+        
+        # Calcular tempo de processamento
+        processing_time = (time.time() - start_time) * 1000  # em milissegundos
+        
+        # Atualizar estatísticas
+        ocr_stats.total_requests += 1
+        ocr_stats.successful_requests += 1
+        ocr_stats.average_processing_time_ms = (
+            (ocr_stats.average_processing_time_ms * (ocr_stats.successful_requests - 1) + processing_time) / 
+            ocr_stats.successful_requests
+        )
+        api_monitor.record_ocr_processing(
+            duration_ms=processing_time,
+            success=True,
+            language=settings.language.value,
+            document_type=settings.document_type.value,
+            file_size=file_size
+        )
+        
+        return FastAPIResponse(
+            text=extracted_text,
+            status="success",
+            processing_time_ms=processing_time,
+            language_detected=str(settings.language),
+            document_type=str(settings.document_type)
+        )
+    
+    except DeadlineExceeded as e:
+        api_monitor.record_resource_usage(usage, "/ocr/upload", settings.document_type.value, client)
+        raise deadline_exceeded_error(e, "/ocr/upload")
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        logger.error(f"FastAPI: Erro ao processar upload: {str(e)}")
+        
+        # Atualizar estatísticas
+        ocr_stats.total_requests += 1
+        ocr_stats.failed_requests += 1
+        api_monitor.record_ocr_processing(
+            duration_ms=0,
+            success=False,
+            language=settings.language.value,
+            document_type=settings.document_type.value
+        )
+        
+        raise HTTPException(status_code=500, detail=f"OCR processing error: {str(e)}")
+    
+    finally:
+        disconnect_watcher.cancel()
+
+# Endpoint de imagem de câmera OCR
+@router.post("/ocr/camera", response_model=FastAPIResponse, 
+                 responses={400: {"model": FastAPIErrorResponse}, 500: {"model": FastAPIErrorResponse}})
+async def fastapi_ocr_camera(request: FastAPICameraRequest, http_request: Request,
+                             user: OptionalType[dict] = Depends(optional_api_key)):
+    """
+    Processa OCR em uma imagem capturada da câmera
+    
+    Args:
+        request: Solicitação de captura de câmera contendo dados de imagem base64
+        http_request: Requisição HTTP (identifica o cliente no escalonador)
+        user: Dados da API key (None para requisições anônimas)
+    
+    Returns:
+        FastAPIResponse: Texto extraído e status
+    """
+    start_time = time.time()
+    
+    # Prazo da requisição; também é cancelado se o cliente se desconectar
+    deadline = Deadline.from_headers(http_request.headers)
+    disconnect_watcher = asyncio.create_task(watch_disconnect(http_request, deadline))
+    # Recursos consumidos pelo OCR (CPU, Tesseract, pixels, memória)
+    usage = ResourceUsage()
+    client = user["user_id"] if user else "anonymous"
+    document_type = request.document_type.value if request.document_type else DocumentType.GENERIC.value
+    language = request.language.value if request.language else OCRLanguage.PORTUGUESE.value
+    # Tamanho aproximado da imagem decodificada do base64
+    file_size = len(request.image_data) * 3 // 4
+    
+    logger.info("FastAPI: Recebeu solicitação de captura de câmera")
+    logger.info(f"FastAPI: Configurações: idioma={request.language}, tipo={request.document_type}, avançado={request.enhanced_processing}")
+    
+    try:
+        # Processar a imagem da câmera
+        # Entrada guardada pelo flight recorder se a requisição for lenta
+        http_request.state.flight_input = (request.image_data, {
+            "source": "camera",
+            "language": language,
+            "document_type": document_type,
+            "enhanced_processing": request.enhanced_processing,
+            "compress": file_size > 1024 * 1024
+        })
+        
+        # Decodificação do base64 e da imagem fora do event loop
+        with span('decode'):
+            image = await run_in_threadpool(process_camera_image, request.image_data)
+        
+        if image is None:
+            raise HTTPException(status_code=400, detail="Invalid camera image")
+        
+        # Comprimir imagem se for grande (fora do event loop)
+        if file_size > 1024 * 1024:
+            with span('compress'):
+                image = await run_in_threadpool(compress_image, image, 1800, 85)
+        
+        # Processar a imagem com OCR no escalonador, sem bloquear o event loop
+        extracted_text = await run_ocr_job_async(http_request, image, deadline, usage, document_type)
+        api_monitor.record_resource_usage(usage, "/ocr/camera", document_type, client)
+        
+        # Calcular tempo de processamento
+        processing_time = (time.time() - start_time) * 1000  # em milissegundos
+        
+        # Atualizar estatísticas
+        ocr_stats.total_requests += 1
+        ocr_stats.successful_requests += 1
+        ocr_stats.average_processing_time_ms = (
+            (ocr_stats.average_processing_time_ms * (ocr_stats.successful_requests - 1) + processing_time) / 
+            ocr_stats.successful_requests
+        )
+        api_monitor.record_ocr_processing(
+            duration_ms=processing_time,
+            success=True,
+            language=language,
+            document_type=document_type,
+            file_size=file_size
+        )
+        
+        return FastAPIResponse(
+            text=extracted_text,
+            status="success",
+            processing_time_ms=processing_time,
+            language_detected=str(request.language),
+            document_type=str(request.document_type)
+        )
+    
+    except DeadlineExceeded as e:
+        api_monitor.record_resource_usage(usage, "/ocr/camera", document_type, client)
+        raise deadline_exceeded_error(e, "/ocr/camera")
+    
+    except HTTPException:
+        raise
+    
+    except Exception as e:
+        logger.error(f"FastAPI: Erro ao processar imagem da câmera: {str(e)}")
+        
+        # Atualizar estatísticas
+        ocr_stats.total_requests += 1
+        ocr_stats.failed_requests += 1
+        api_monitor.record_ocr_processing(
+            duration_ms=0,
+            success=False,
+            language=language,
+            document_type=document_type
+        )
+        
+        raise HTTPException(status_code=500, detail=f"OCR processing error: {str(e)}")
+    
+    finally:
+        disconnect_watcher.cancel()
+
+# Manipulador de exceções
+async def fastapi_global_exception_handler(request: Request, exc: Exception):
+    """Manipulador global de exceções"""
+    return JSONResponse(
+        status_code=500,
+        content={"status": "error", "message": str(exc), "error_code": 500}
+    )
+
+# Endpoint para obter estatísticas
+@router.get("/api/stats", response_model=OCRStatistics, dependencies=[Depends(optional_api_key)])
+async def get_stats():
+    """
+    Retorna estatísticas sobre o uso da API OCR
+    
+    Returns:
+        OCRStatistics: Estatísticas de uso da API
+    """
+    return ocr_stats
+
+# Endpoint de métricas para o Prometheus
+@router.get("/metrics", dependencies=[Depends(optional_api_key)])
+async def get_metrics():
+    """
+    Retorna as métricas no formato OpenMetrics
+    
+    Returns:
+        StreamingResponse: Exposição em texto gerada incrementalmente
+    """
+    return StreamingResponse(
+        generate_metrics(api_monitor, ocr_scheduler, ocr_stats, event_loop_lag),
+        media_type=OPENMETRICS_CONTENT_TYPE
+    )
+
+# Endpoint de export de traces
+@router.get("/api/traces/{request_id}", dependencies=[Depends(optional_api_key)])
+async def get_trace(request_id: str):
+    """
+    Retorna o trace de uma requisição recente
+    
+    Args:
+        request_id: Valor do header X-Request-ID da resposta
+    
+    Returns:
+        dict: Trace no formato Chrome Trace (chrome://tracing, Perfetto)
+    """
+    trace = recent_traces.get(request_id)
+    if trace is None:
+        raise HTTPException(status_code=404, detail="Trace not found")
+    return trace.to_chrome_trace()
+
+# Documentação da API (mesma página do Flask)
+@router.get("/api-docs", response_class=HTMLResponse)
+async def fastapi_api_docs(request: Request):
+    """Página de documentação da API"""
+    return templates.TemplateResponse(request, "api_docs.html")
+
+# Estatísticas detalhadas
+@router.get("/api/detailed-stats", dependencies=[Depends(optional_api_key)])
+async def fastapi_detailed_stats(days: int = Query(7, description="Dias de histórico")):
+    """
+    Retorna estatísticas detalhadas (lê o banco de métricas no threadpool)
+    
+    Returns:
+        dict: Estatísticas detalhadas
+    """
+    stats = await run_in_threadpool(api_monitor.get_detailed_stats, days)
+    return {"status": "success", "stats": stats}
+
+# Criar nova API key (apenas para admins)
+@router.post("/admin/api-keys", dependencies=[Depends(require_admin)])
+async def fastapi_admin_create_api_key(data: FastAPICreateAPIKeyRequest):
+    """
+    Cria uma nova API key
+    
+    Returns:
+        dict: Nova API key (o valor só é exibido nesta resposta)
+    """
+    api_key_data = await run_in_threadpool(
+        create_api_key, data.user_id, data.name, data.rate_limit, data.expires_days, data.permissions,
+        weight=data.weight, max_concurrency=data.max_concurrency
+    )
+    return {"status": "success", "data": api_key_data}
+
+# Profiler por amostragem (apenas para admins)
+@router.post("/admin/profile", status_code=202, dependencies=[Depends(require_admin)])
+async def fastapi_admin_profile(
+    seconds: float = Query(10.0, description="Duração da sessão (máximo PROFILER_MAX_SECONDS)"),
+    interval_ms: float = Query(5.0, description="Intervalo entre amostras")
+):
+    """
+    Inicia o profiler por amostragem neste worker, em segundo plano
+    
+    O resultado é gravado em PROFILER_DIR ao fim da sessão e lido com
+    GET /admin/profile/{profile_id} (por qualquer worker).
+    
+    Returns:
+        dict: profile_id e a URL do resultado
+    """
+    try:
+        profile_id = sampling_profiler.start_background(seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        raise HTTPException(status_code=409, detail=str(e))
+    return {
+        "status": "started",
+        "profile_id": profile_id,
+        "seconds": min(max(seconds, 0.0), PROFILER_MAX_SECONDS),
+        "result": f"/admin/profile/{profile_id}"
+    }
+
+@router.get("/admin/profile/{profile_id}", dependencies=[Depends(require_admin)])
+async def fastapi_admin_profile_result(
+    profile_id: str,
+    output_format: str = Query("collapsed", alias="format", pattern="^(collapsed|speedscope)$",
+                               description="collapsed ou speedscope")
+):
+    """
+    Resultado de uma sessão do profiler (404 enquanto a sessão não terminar)
+    
+    Returns:
+        Response: Pilhas amostradas no formato solicitado
+    """
+    content = await run_in_threadpool(load_profile, profile_id, output_format)
+    if content is None:
+        raise HTTPException(status_code=404, detail="Profile not found (still running or expired)")
+    media_type = "application/json" if output_format == "speedscope" else "text/plain; charset=utf-8"
+    headers = {"Content-Disposition": f'attachment; filename="{profile_id}{PROFILE_FORMATS[output_format]}"'}
+    return Response(content, media_type=media_type, headers=headers)
+
+# Requisições lentas capturadas (apenas para admins)
+@router.get("/admin/flight-recorder", dependencies=[Depends(require_admin)])
+async def fastapi_admin_flight_recorder():
+    """
+    Lista as requisições lentas capturadas neste worker
+    
+    Returns:
+        dict: Metadados das capturas (sem as imagens)
+    """
+    return {
+        "status": "success",
+        "threshold_ms": flight_recorder.threshold_ms,
+        "captures": flight_recorder.list_captures()
+    }
+
+@router.get("/admin/flight-recorder/{capture_id}", dependencies=[Depends(require_admin)])
+async def fastapi_admin_flight_recorder_capture(capture_id: str):
+    """
+    Baixa uma captura completa para o replay
+    
+    Returns:
+        JSONResponse: Captura (a imagem, se houver, está criptografada)
+    """
+    capture = flight_recorder.get(capture_id)
+    if capture is None:
+        raise HTTPException(status_code=404, detail="Capture not found")
+    return JSONResponse(capture, headers={"Content-Disposition": f'attachment; filename="{capture_id}.json"'})
+
+# Endpoint de saúde da API
+@router.get("/api/health")
+async def health_check():
+    """
+    Endpoint de verificação de saúde e capacidade atual do worker (sinais para o autoscaling)
+    
+    Returns:
+        dict: Status (healthy, saturated ou warming_up), capacidade e endpoints
+    """
+    capacity = capacity_report(ocr_scheduler, event_loop_lag)
+    return {
+        "status": health_status(capacity, warmup.ready),
+        "version": "1.0.0",
+        "api_type": "FastAPI",
+        "ready": warmup.ready,
+        "capacity": capacity,
+        "endpoints": [
+            {"path": "/", "methods": ["GET"], "description": "Interface web"},
+            {"path": "/ocr/upload", "methods": ["POST"], "description": "OCR por upload de arquivo"},
+            {"path": "/ocr/camera", "methods": ["POST"], "description": "OCR por captura de câmera"},
+            {"path": "/api/stats", "methods": ["GET"], "description": "Estatísticas da API"},
+            {"path": "/metrics", "methods": ["GET"], "description": "Métricas OpenMetrics (Prometheus)"},
+            {"path": "/api/traces/{request_id}", "methods": ["GET"], "description": "Trace de uma requisição (Chrome Trace)"},
+            {"path": "/api/detailed-stats", "methods": ["GET"], "description": "Estatísticas detalhadas"},
+            {"path": "/api/health", "methods": ["GET"], "description": "Verificação de saúde"},
+            {"path": "/api/health/live", "methods": ["GET"], "description": "Liveness (processo respondendo)"},
+            {"path": "/api/health/ready", "methods": ["GET"], "description": "Readiness (worker aquecido)"},
+            {"path": "/api-docs", "methods": ["GET"], "description": "Documentação da API"},
+            {"path": "/docs", "methods": ["GET"], "description": "Documentação Swagger"},
+            {"path": "/redoc", "methods": ["GET"], "description": "Documentação ReDoc"}
+        ]
+    }
+
+# Liveness: o processo está respondendo (reiniciar o worker se falhar)
+@router.get("/api/health/live")
+async def health_live():
+    """
+    Endpoint de liveness
+    
+    Returns:
+        dict: Status do processo
+    """
+    return {"status": "alive"}
+
+# Readiness: o load balancer só envia tráfego para workers aquecidos
+@router.get("/api/health/ready")
+async def health_ready():
+    """
+    Endpoint de readiness (503 até o fim do aquecimento do worker)
+    
+    Returns:
+        JSONResponse: Estado do aquecimento
+    """
+    state = warmup.status()
+    return JSONResponse({
+        "status": "ready" if state["ready"] else "warming_up",
+        "warmup": state,
+        "capacity": capacity_report(ocr_scheduler, event_loop_lag)
+    }, status_code=200 if state["ready"] else 503)
+
+@asynccontextmanager
+async def lifespan(app):
+    """Aquece o worker em segundo plano e mede o atraso do event loop (após o fork do gunicorn)"""
+    warmup.start()
+    event_loop_lag.start()
+    yield
+    await event_loop_lag.stop()
+
+def create_app():
+    """
+    Cria o app FastAPI (servidor ASGI de produção)
+    
+    Returns:
+        FastAPI: App com middlewares, rotas e arquivos estáticos
+    """
+    app = FastAPI(
+        title="OCR Document API",
+        description="API para extração de texto de documentos usando OCR",
+        version="1.0.0",
+        lifespan=lifespan
+    )
+    
+    # Configurar CORS
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=["*"],
+        allow_credentials=True,
+        allow_methods=["*"],
+        allow_headers=["*"],
+    )
+    
+    # Cabeçalhos de segurança, limite de tamanho do corpo e monitoramento (equivalentes aos hooks do Flask)
+    app.add_middleware(SecurityHeadersMiddleware)
+    app.add_middleware(RequestMonitoringMiddleware)
+    
+    # Tracing por requisição: header Server-Timing e export no formato Chrome Trace
+    app.middleware("http")(trace_requests)
+    # Headers de rate limit da API key, também nas rotas que devolvem o próprio Response
+    app.middleware("http")(rate_limit_headers)
+    
+    app.add_exception_handler(Exception, fastapi_global_exception_handler)
+    app.include_router(router)
+    
+    # Montar arquivos estáticos
+    app.mount("/static", StaticFiles(directory="static"), name="static")
+    return app
@@ -0,0 +1,216 @@
+import os
+import json
+import time
+import base64
+import hashlib
+import logging
+import threading
+from collections import deque
+
+try:
+    from cryptography.fernet import Fernet, InvalidToken
+except ImportError:  # cryptography é opcional: sem ela, apenas o hash da imagem é guardado
+    Fernet = None
+    InvalidToken = Exception
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Requisições acima deste tempo total (ms) são capturadas
+FLIGHT_RECORDER_THRESHOLD_MS = float(os.environ.get("FLIGHT_RECORDER_THRESHOLD_MS", 5000))
+# Número de capturas mantidas (em memória e no diretório)
+FLIGHT_RECORDER_SIZE = int(os.environ.get("FLIGHT_RECORDER_SIZE", 50))
+# Diretório onde as capturas são gravadas para o replay (vazio = apenas em memória)
+FLIGHT_RECORDER_DIR = os.environ.get("FLIGHT_RECORDER_DIR", "")
+# Chave Fernet para guardar uma cópia criptografada da imagem (vazio = apenas o hash)
+FLIGHT_RECORDER_KEY = os.environ.get("FLIGHT_RECORDER_KEY", "")
+
+
+def image_bytes(image):
+    """
+    Bytes da imagem enviada pelo cliente
+
+    Args:
+        image: Bytes do arquivo ou imagem base64 da câmera (aceita data URL)
+    """
+    if isinstance(image, str):
+        if image.startswith("data:image"):
+            image = image.split(",", 1)[1]
+        return base64.b64decode(image)
+    return bytes(image)
+
+
+class FlightRecorder:
+    """
+    Gravador das requisições lentas, para reproduzir os outliers de latência
+
+    Guarda em um buffer circular o hash (e opcionalmente uma cópia
+    criptografada) da imagem, as configurações, os tempos por etapa e a
+    versão do motor de OCR das requisições acima do limite. Requisições
+    rápidas custam apenas uma comparação.
+    """
+
+    def __init__(self, threshold_ms=FLIGHT_RECORDER_THRESHOLD_MS, capacity=FLIGHT_RECORDER_SIZE,
+                 directory=None, key=None):
+        """
+        Args:
+            threshold_ms: Tempo mínimo (ms) para capturar uma requisição
+            capacity: Número máximo de capturas mantidas
+            directory: Diretório para gravar as capturas (opcional)
+            key: Chave Fernet para criptografar as imagens (opcional)
+        """
+        self.threshold_ms = threshold_ms
+        self.capacity = capacity
+        self.directory = directory
+        self.captures = deque(maxlen=capacity)
+        self.lock = threading.Lock()
+        self.fernet = None
+        if key:
+            if Fernet is None:
+                logger.warning("FLIGHT_RECORDER_KEY definida, mas o pacote cryptography não está "
+                               "instalado; apenas o hash das imagens será guardado")
+            else:
+                self.fernet = Fernet(key)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+
+    @classmethod
+    def from_env(cls):
+        """Cria o gravador a partir das variáveis FLIGHT_RECORDER_*"""
+        return cls(directory=FLIGHT_RECORDER_DIR or None, key=FLIGHT_RECORDER_KEY or None)
+
+    def observe(self, duration_ms, endpoint, image, settings, trace=None, status=None):
+        """
+        Captura a requisição se ela for mais lenta que o limite
+
+        Args:
+            duration_ms: Tempo total da requisição
+            endpoint: Endpoint da API
+            image: Bytes do arquivo ou imagem base64 da câmera
+            settings: Configurações do OCR (idioma, tipo de documento, origem...)
+            trace: Trace da requisição (tempos por etapa)
+            status: Código HTTP da resposta
+
+        Returns:
+            dict: Captura gravada ou None se a requisição foi rápida
+        """
+        if duration_ms < self.threshold_ms:
+            return None
+
+        try:
+            capture = self._capture(duration_ms, endpoint, image, settings, trace, status)
+        except Exception as e:
+            logger.error(f"Erro ao capturar requisição lenta: {str(e)}")
+            return None
+
+        with self.lock:
+            self.captures.append(capture)
+        if self.directory:
+            self._persist(capture)
+        logger.info(f"Requisição lenta capturada: {capture['id']} ({duration_ms:.0f} ms em {endpoint})")
+        return capture
+
+    def _capture(self, duration_ms, endpoint, image, settings, trace, status):
+        """Monta o registro da requisição"""
+        # Importado aqui para não carregar o pipeline de OCR junto com o gravador
+        from ocr_service import get_engine_version
+
+        data = image_bytes(image)
+        digest = hashlib.sha256(data).hexdigest()
+        encrypted = None
+        if self.fernet is not None:
+            encrypted = self.fernet.encrypt(data).decode("ascii")
+
+        return {
+            "id": trace.request_id if trace is not None else digest[:16],
+            "client_request_id": trace.client_request_id if trace is not None else None,
+            "recorded_at": time.time(),
+            "endpoint": endpoint,
+            "status": status,
+            "duration_ms": round(duration_ms, 2),
+            "settings": dict(settings),
+            "stage_timings": {
+                stage: round(ms, 2) for stage, ms in (trace.stage_timings() if trace is not None else {}).items()
+            },
+            "engine_version": get_engine_version(),
+            "image": {
+                "sha256": digest,
+                "bytes": len(data),
+                "encrypted": encrypted
+            }
+        }
+
+    def _persist(self, capture):
+        """Grava a captura no diretório, descartando as mais antigas"""
+        path = os.path.join(self.directory, f"{capture['id']}.json")
+        try:
+            with open(path, "w") as f:
+                json.dump(capture, f)
+            files = sorted(
+                (entry for entry in os.scandir(self.directory) if entry.name.endswith(".json")),
+                key=lambda entry: entry.stat().st_mtime
+            )
+            for entry in files[:-self.capacity]:
+                os.remove(entry.path)
+        except OSError as e:
+            logger.error(f"Erro ao gravar captura em {path}: {str(e)}")
+
+    def list_captures(self):
+        """
+        Capturas em memória, da mais recente para a mais antiga (sem a imagem)
+
+        Returns:
+            list: Metadados das capturas
+        """
+        with self.lock:
+            captures = list(self.captures)
+        return [
+            dict(capture, image=dict(capture["image"], encrypted=capture["image"]["encrypted"] is not None))
+            for capture in reversed(captures)
+        ]
+
+    def get(self, capture_id):
+        """Captura completa (incluindo a imagem criptografada) ou None"""
+        with self.lock:
+            for capture in self.captures:
+                if capture["id"] == capture_id:
+                    return capture
+        return None
+
+
+def load_capture(path):
+    """Lê uma captura gravada em disco ou baixada de /admin/flight-recorder/<id>"""
+    with open(path) as f:
+        return json.load(f)
+
+
+def decrypt_image(capture, key):
+    """
+    Recupera os bytes da imagem de uma captura
+
+    Args:
+        capture: Captura com a imagem criptografada
+        key: Chave Fernet usada na gravação
+
+    Returns:
+        bytes: Imagem original ou None se a captura tem apenas o hash
+
+    Raises:
+        ValueError: Se a chave estiver errada ou o pacote cryptography ausente
+    """
+    encrypted = capture["image"].get("encrypted")
+    if not encrypted:
+        return None
+    if Fernet is None:
+        raise ValueError("O pacote cryptography é necessário para ler imagens criptografadas")
+    try:
+        data = Fernet(key).decrypt(encrypted.encode("ascii"))
+    except InvalidToken:
+        raise ValueError("Chave inválida para a imagem da captura")
+    if hashlib.sha256(data).hexdigest() != capture["image"]["sha256"]:
+        raise ValueError("Imagem da captura corrompida (hash diferente)")
+    return data
+
+
+# Instância global para uso em toda a aplicação
+flight_recorder = FlightRecorder.from_env()
@@ -0,0 +1,354 @@
+import os
+import hmac
+import json
+import time
+import uuid
+import sqlite3
+import hashlib
+import secrets
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import contextmanager
+
+try:
+    import psycopg2
+except ImportError:  # Postgres é opcional (API_KEY_DB_URL)
+    psycopg2 = None
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Banco das API keys: URL do Postgres (postgresql://...) ou arquivo SQLite.
+# Vazio = banco SQLite em memória, apenas para desenvolvimento e testes.
+API_KEY_DB_URL = os.environ.get("API_KEY_DB_URL", "")
+# Segredo do servidor combinado ao salt de cada chave (opcional)
+API_KEY_PEPPER = os.environ.get("API_KEY_PEPPER", "")
+# Tempo de cache das chaves válidas e das inválidas (segundos)
+API_KEY_CACHE_TTL = float(os.environ.get("API_KEY_CACHE_TTL", 60))
+API_KEY_NEGATIVE_CACHE_TTL = float(os.environ.get("API_KEY_NEGATIVE_CACHE_TTL", 10))
+# Número máximo de chaves no cache
+API_KEY_CACHE_SIZE = int(os.environ.get("API_KEY_CACHE_SIZE", 10000))
+# Intervalo entre verificações da geração do banco (invalidação entre workers)
+API_KEY_GENERATION_CHECK = float(os.environ.get("API_KEY_GENERATION_CHECK", 1))
+
+# Caracteres iniciais da chave usados como identificador (chave primária) no banco:
+# 16 bytes aleatórios em hexadecimal, seguidos de 16 bytes secretos
+KEY_ID_LENGTH = 32
+# Tentativas de gerar uma chave cujo identificador ainda não exista
+KEY_ID_ATTEMPTS = 5
+
+_SCHEMA = (
+    """
+    CREATE TABLE IF NOT EXISTS api_keys (
+        key_id TEXT PRIMARY KEY,
+        salt TEXT NOT NULL,
+        key_hash TEXT NOT NULL,
+        user_id TEXT NOT NULL,
+        name TEXT NOT NULL,
+        rate_limit INTEGER NOT NULL,
+        weight REAL NOT NULL,
+        max_concurrency INTEGER,
+        permissions TEXT NOT NULL,
+        created_at REAL NOT NULL,
+        expires_at REAL NOT NULL,
+        active INTEGER NOT NULL
+    )
+    """,
+    "CREATE TABLE IF NOT EXISTS api_key_generation (id INTEGER PRIMARY KEY, generation INTEGER NOT NULL)",
+)
+
+_COLUMNS = ("key_id", "salt", "key_hash", "user_id", "name", "rate_limit", "weight", "max_concurrency",
+            "permissions", "created_at", "expires_at", "active")
+
+
+def hash_api_key(api_key, salt, pepper=API_KEY_PEPPER):
+    """
+    Hash salgado de uma API key (HMAC-SHA256)
+
+    As chaves são aleatórias e longas, então um hash rápido basta; o salt
+    impede comparar hashes entre chaves e o pepper fica fora do banco.
+    """
+    return hmac.new((pepper + salt).encode(), api_key.encode(), hashlib.sha256).hexdigest()
+
+
+class APIKeyStore:
+    """
+    API keys persistentes (apenas hashes salgados) em SQLite
+
+    lookup() consulta primeiro um cache com TTL, que também guarda as chaves
+    inválidas (cache negativo). Toda alteração incrementa um contador de
+    geração no banco; cada worker confere esse contador no máximo a cada
+    API_KEY_GENERATION_CHECK segundos e esvazia o cache quando ele muda.
+    """
+
+    placeholder = "?"
+
+    def __init__(self, path, cache_ttl=API_KEY_CACHE_TTL, negative_ttl=API_KEY_NEGATIVE_CACHE_TTL,
+                 cache_size=API_KEY_CACHE_SIZE, generation_check=API_KEY_GENERATION_CHECK):
+        """
+        Args:
+            path: Arquivo SQLite (ou URI file:...?mode=memory)
+            cache_ttl: Tempo de cache de uma chave válida (segundos)
+            negative_ttl: Tempo de cache de uma chave inválida (segundos)
+            cache_size: Número máximo de entradas no cache
+            generation_check: Intervalo entre verificações da geração (segundos)
+        """
+        self.path = path
+        self.cache_ttl = cache_ttl
+        self.negative_ttl = negative_ttl
+        self.cache_size = cache_size
+        self.generation_check = generation_check
+        self.cache = OrderedDict()
+        self.lock = threading.Lock()
+        self.local = threading.local()
+        self.generation = None
+        self.next_generation_check = 0.0
+        self._create_schema()
+
+    def _open(self):
+        return sqlite3.connect(self.path, timeout=5, uri=self.path.startswith("file:"),
+                               check_same_thread=False)
+
+    def _connection(self):
+        """Conexão da thread atual (reaberta após o fork do worker)"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = self._open()
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    @contextmanager
+    def _transaction(self):
+        conn = self._connection()
+        try:
+            cursor = conn.cursor()
+            yield cursor
+            conn.commit()
+        except Exception:
+            conn.rollback()
+            raise
+
+    def _sql(self, statement):
+        return statement.replace("?", self.placeholder)
+
+    def _create_schema(self):
+        if not self.path.startswith("file:"):
+            self._connection().execute("PRAGMA journal_mode=WAL")
+        with self._transaction() as cursor:
+            for statement in _SCHEMA:
+                cursor.execute(statement)
+            cursor.execute(self._sql("SELECT generation FROM api_key_generation WHERE id = ?"), (1,))
+            if cursor.fetchone() is None:
+                cursor.execute(self._sql("INSERT INTO api_key_generation (id, generation) VALUES (?, ?)"), (1, 0))
+
+    def _bump_generation(self, cursor):
+        """Sinaliza aos outros workers que o cache deve ser descartado"""
+        cursor.execute(self._sql("UPDATE api_key_generation SET generation = generation + 1 WHERE id = ?"), (1,))
+
+    def _check_generation(self, now):
+        """Esvazia o cache se outro processo alterou as chaves"""
+        if now < self.next_generation_check:
+            return
+        with self._transaction() as cursor:
+            cursor.execute(self._sql("SELECT generation FROM api_key_generation WHERE id = ?"), (1,))
+            generation = cursor.fetchone()[0]
+        with self.lock:
+            if generation != self.generation:
+                self.cache.clear()
+                self.generation = generation
+            self.next_generation_check = now + self.generation_check
+
+    def invalidate(self):
+        """Descarta o cache deste processo"""
+        with self.lock:
+            self.cache.clear()
+
+    def create(self, user_id, name, rate_limit=60, expires_days=30, permissions=None,
+               weight=1.0, max_concurrency=None, api_key=None):
+        """
+        Cria e grava uma nova API key (apenas o hash é armazenado)
+
+        Args:
+            api_key: Valor da chave (gerado com new_api_key se omitido)
+
+        Returns:
+            dict: Dados da chave, incluindo o valor em claro (exibido uma única vez)
+
+        Raises:
+            ValueError: Se já existe uma chave com o mesmo identificador (api_key informada)
+        """
+        if permissions is None:
+            permissions = ["read"]
+
+        now = time.time()
+        record = {
+            "user_id": user_id,
+            "name": name,
+            "rate_limit": rate_limit,
+            "weight": weight,
+            "max_concurrency": max_concurrency,
+            "permissions": json.dumps(permissions),
+            "created_at": now,
+            "expires_at": now + (expires_days * 24 * 60 * 60),
+            "active": 1
+        }
+        generated = api_key is None
+        with self._transaction() as cursor:
+            for _ in range(KEY_ID_ATTEMPTS):
+                if generated:
+                    api_key = new_api_key()
+                cursor.execute(self._sql("SELECT 1 FROM api_keys WHERE key_id = ?"), (api_key[:KEY_ID_LENGTH],))
+                if cursor.fetchone() is None:
+                    break
+                if not generated:
+                    raise ValueError("Já existe uma API key com este identificador")
+            else:
+                raise RuntimeError("Não foi possível gerar um identificador de API key único")
+            record["key_id"] = api_key[:KEY_ID_LENGTH]
+            record["salt"] = secrets.token_hex(16)
+            record["key_hash"] = hash_api_key(api_key, record["salt"])
+            cursor.execute(
+                self._sql(f"INSERT INTO api_keys ({', '.join(_COLUMNS)}) VALUES ({', '.join('?' * len(_COLUMNS))})"),
+                tuple(record[column] for column in _COLUMNS)
+            )
+            self._bump_generation(cursor)
+        # Remove uma possível entrada negativa desta chave
+        self.invalidate()
+
+        return {
+            "api_key": api_key,
+            "user_id": user_id,
+            "name": name,
+            "rate_limit": rate_limit,
+            "weight": weight,
+            "max_concurrency": max_concurrency,
+            "expires_at": record["expires_at"],
+            "permissions": permissions
+        }
+
+    def revoke(self, api_key):
+        """
+        Desativa uma API key em todos os workers
+
+        Returns:
+            bool: True se a chave existia
+        """
+        key_data = self._load(api_key)
+        if key_data is None:
+            return False
+        with self._transaction() as cursor:
+            cursor.execute(self._sql("UPDATE api_keys SET active = 0 WHERE key_id = ?"), (api_key[:KEY_ID_LENGTH],))
+            self._bump_generation(cursor)
+        self.invalidate()
+        return True
+
+    def _load(self, api_key):
+        """Lê a chave do banco e confere o hash (None se não existir)"""
+        with self._transaction() as cursor:
+            cursor.execute(
+                self._sql(f"SELECT {', '.join(_COLUMNS)} FROM api_keys WHERE key_id = ?"),
+                (api_key[:KEY_ID_LENGTH],)
+            )
+            row = cursor.fetchone()
+        if row is None:
+            return None
+        record = dict(zip(_COLUMNS, row))
+        if not hmac.compare_digest(record["key_hash"], hash_api_key(api_key, record["salt"])):
+            return None
+        return {
+            "user_id": record["user_id"],
+            "name": record["name"],
+            "rate_limit": record["rate_limit"],
+            "weight": record["weight"],
+            "max_concurrency": record["max_concurrency"],
+            "created_at": record["created_at"],
+            "expires_at": record["expires_at"],
+            "permissions": json.loads(record["permissions"]),
+            "active": bool(record["active"])
+        }
+
+    def lookup(self, api_key):
+        """
+        Dados da chave, do cache ou do banco
+
+        Returns:
+            dict: Dados da chave ou None se ela não existir
+        """
+        now = time.monotonic()
+        self._check_generation(now)
+        # O cache é indexado pelo hash da chave, não pelo valor em claro
+        cache_key = hashlib.sha256(api_key.encode()).digest()
+
+        with self.lock:
+            entry = self.cache.get(cache_key)
+            if entry is not None and entry[0] > now:
+                self.cache.move_to_end(cache_key)
+                return entry[1]
+
+        key_data = self._load(api_key)
+        ttl = self.cache_ttl if key_data is not None else self.negative_ttl
+        with self.lock:
+            self.cache[cache_key] = (now + ttl, key_data)
+            self.cache.move_to_end(cache_key)
+            while len(self.cache) > self.cache_size:
+                self.cache.popitem(last=False)
+        return key_data
+
+
+class PostgresAPIKeyStore(APIKeyStore):
+    """APIKeyStore em um banco Postgres (psycopg2), compartilhado entre nós"""
+
+    placeholder = "%s"
+
+    def _open(self):
+        if psycopg2 is None:
+            raise RuntimeError("psycopg2 é necessário para API_KEY_DB_URL com Postgres")
+        return psycopg2.connect(self.path)
+
+    def _create_schema(self):
+        with self._transaction() as cursor:
+            for statement in _SCHEMA:
+                cursor.execute(statement)
+            cursor.execute(
+                "INSERT INTO api_key_generation (id, generation) VALUES (1, 0) ON CONFLICT (id) DO NOTHING"
+            )
+
+
+def new_api_key():
+    """
+    Gera o valor de uma nova API key
+
+    Returns:
+        str: Identificador aleatório (KEY_ID_LENGTH caracteres) seguido do segredo
+    """
+    return secrets.token_hex(KEY_ID_LENGTH // 2) + secrets.token_hex(16)
+
+
+def create_key_store(url=API_KEY_DB_URL):
+    """
+    Cria o armazenamento de API keys a partir da URL configurada
+
+    Args:
+        url: postgresql://..., caminho de um arquivo SQLite ou vazio (memória)
+
+    Returns:
+        APIKeyStore: Armazenamento das chaves
+    """
+    if url.startswith(("postgres://", "postgresql://")):
+        return PostgresAPIKeyStore(url)
+    if url:
+        return APIKeyStore(url)
+
+    # Banco em memória compartilhado pelas threads deste processo (desenvolvimento e testes)
+    store = APIKeyStore(f"file:api_keys_{uuid.uuid4().hex}?mode=memory&cache=shared")
+    # Mantém o banco em memória vivo enquanto o processo existir
+    store.keeper = store._open()
+    # Chave de desenvolvimento (não existe quando API_KEY_DB_URL está definida)
+    store.create("test_user", "Test User", rate_limit=100, permissions=["read", "write"], api_key="test_key")
+    return store
+
+
+# Instância global para uso em toda a aplicação
+api_key_store = create_key_store()
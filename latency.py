@@ -0,0 +1,234 @@
+import math
+
+# Layout fixo dos buckets logarítmicos (estilo HDR): cada bucket cobre um
+# intervalo [v, v * GAMMA), o que dá erro relativo máximo de ~2% nos percentis.
+# O layout é o mesmo em todos os processos, então histogramas podem ser
+# somados bucket a bucket (entre workers ou entre janelas de tempo).
+MIN_VALUE_MS = 0.1
+MAX_VALUE_MS = 1_000_000.0
+GAMMA = 1.04
+_LOG_GAMMA = math.log(GAMMA)
+NUM_BUCKETS = int(math.ceil(math.log(MAX_VALUE_MS / MIN_VALUE_MS) / _LOG_GAMMA)) + 1
+
+
+def bucket_index(value):
+    """Índice do bucket que contém o valor (em milissegundos)"""
+    if value <= MIN_VALUE_MS:
+        return 0
+    index = int(math.ceil(math.log(value / MIN_VALUE_MS) / _LOG_GAMMA))
+    return min(index, NUM_BUCKETS - 1)
+
+
+def bucket_upper_bound(index):
+    """Limite superior (inclusivo) do bucket, em milissegundos"""
+    return MIN_VALUE_MS * GAMMA ** index
+
+
+class LatencyHistogram:
+    """
+    Histograma de latências com buckets logarítmicos
+
+    O registro é O(1) e a memória é limitada pelo número de buckets
+    (NUM_BUCKETS), independente do número de amostras. Percentis são
+    calculados em O(buckets) e dois histogramas podem ser combinados com merge.
+    """
+
+    __slots__ = ("counts", "count", "total", "min", "max")
+
+    def __init__(self):
+        self.counts = {}
+        self.count = 0
+        self.total = 0.0
+        self.min = None
+        self.max = 0.0
+
+    def record(self, value, count=1):
+        """
+        Registra uma amostra
+
+        Args:
+            value: Latência em milissegundos
+            count: Número de ocorrências da amostra
+        """
+        index = bucket_index(value)
+        self.counts[index] = self.counts.get(index, 0) + count
+        self.count += count
+        self.total += value * count
+        if self.min is None or value < self.min:
+            self.min = value
+        if value > self.max:
+            self.max = value
+
+    def record_corrected(self, value, expected_interval):
+        """
+        Registra uma amostra corrigindo a omissão coordenada
+
+        Em um teste de carga em laço fechado, uma resposta lenta atrasa as
+        requisições seguintes, que não chegam a ser medidas. Como no
+        HdrHistogram, são registradas também as amostras que teriam sido
+        observadas a cada expected_interval durante a espera: value -
+        expected_interval, value - 2 * expected_interval, ... (acima de
+        expected_interval).
+
+        Args:
+            value: Latência em milissegundos
+            expected_interval: Intervalo esperado entre requisições em milissegundos
+        """
+        self.record(value)
+        if expected_interval <= 0:
+            return
+        missing = value - expected_interval
+        while missing >= expected_interval:
+            self.record(missing)
+            missing -= expected_interval
+
+    def merge(self, other):
+        """
+        Soma outro histograma a este
+
+        Args:
+            other: LatencyHistogram a ser incorporado
+
+        Returns:
+            LatencyHistogram: O próprio histograma (para encadeamento)
+        """
+        for index, count in other.counts.items():
+            self.counts[index] = self.counts.get(index, 0) + count
+        self.count += other.count
+        self.total += other.total
+        if other.min is not None and (self.min is None or other.min < self.min):
+            self.min = other.min
+        self.max = max(self.max, other.max)
+        return self
+
+    def copy(self):
+        """Retorna uma cópia independente do histograma"""
+        return LatencyHistogram().merge(self)
+
+    def mean(self):
+        """Média das amostras (0 se vazio)"""
+        return self.total / self.count if self.count else 0.0
+
+    def percentiles(self, quantiles=(50, 95, 99)):
+        """
+        Calcula vários percentis em uma única passada pelos buckets
+
+        Args:
+            quantiles: Percentis desejados (0-100)
+
+        Returns:
+            dict: {percentil: valor em ms}
+        """
+        result = {q: 0.0 for q in quantiles}
+        if not self.count:
+            return result
+
+        targets = sorted((max(1, math.ceil(q / 100 * self.count)), q) for q in quantiles)
+        position = 0
+        cumulative = 0
+        for index in sorted(self.counts):
+            cumulative += self.counts[index]
+            while position < len(targets) and targets[position][0] <= cumulative:
+                # Ponto médio geométrico do bucket, limitado ao mínimo/máximo observados
+                upper = bucket_upper_bound(index)
+                value = upper * 2 / (1 + GAMMA) if index else upper
+                result[targets[position][1]] = min(max(value, self.min), self.max)
+                position += 1
+            if position == len(targets):
+                break
+        return result
+
+    def percentile(self, quantile):
+        """Calcula um único percentil (0-100)"""
+        return self.percentiles((quantile,))[quantile]
+
+    def summary(self):
+        """
+        Resumo do histograma para as respostas JSON da API
+
+        Returns:
+            dict: Contagem, média, mínimo, máximo e p50/p95/p99 em ms
+        """
+        p = self.percentiles((50, 95, 99))
+        return {
+            "count": self.count,
+            "avg_ms": round(self.mean(), 2),
+            "min_ms": round(self.min or 0.0, 2),
+            "max_ms": round(self.max, 2),
+            "p50_ms": round(p[50], 2),
+            "p95_ms": round(p[95], 2),
+            "p99_ms": round(p[99], 2)
+        }
+
+    def to_dict(self):
+        """Serializa o histograma (para agregação entre workers)"""
+        return {
+            "counts": {str(index): count for index, count in self.counts.items()},
+            "count": self.count,
+            "total": self.total,
+            "min": self.min,
+            "max": self.max
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        """Reconstrói um histograma serializado com to_dict"""
+        histogram = cls()
+        histogram.counts = {int(index): count for index, count in data.get("counts", {}).items()}
+        histogram.count = data.get("count", 0)
+        histogram.total = data.get("total", 0.0)
+        histogram.min = data.get("min")
+        histogram.max = data.get("max", 0.0)
+        return histogram
+
+
+class HistogramRing:
+    """
+    Histogramas por intervalo de tempo em um anel de tamanho fixo
+
+    Permite consultar percentis de uma janela recente (ex: última hora)
+    combinando os histogramas dos intervalos dentro da janela.
+    """
+
+    def __init__(self, bucket_seconds, num_buckets):
+        """
+        Args:
+            bucket_seconds: Duração de cada intervalo em segundos
+            num_buckets: Número de intervalos mantidos
+        """
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.epochs = [-1] * num_buckets
+        self.histograms = [LatencyHistogram() for _ in range(num_buckets)]
+
+    def record(self, timestamp, value):
+        """Registra uma amostra no intervalo correspondente ao instante informado"""
+        epoch = int(timestamp // self.bucket_seconds)
+        index = epoch % self.num_buckets
+        if self.epochs[index] != epoch:
+            self.epochs[index] = epoch
+            self.histograms[index] = LatencyHistogram()
+        self.histograms[index].record(value)
+
+    def merged(self, timestamp, window_seconds=None):
+        """
+        Combina os histogramas da janela que termina no instante informado
+
+        Args:
+            timestamp: Fim da janela (time.time())
+            window_seconds: Tamanho da janela (padrão: anel inteiro)
+
+        Returns:
+            LatencyHistogram: Histograma combinado
+        """
+        current_epoch = int(timestamp // self.bucket_seconds)
+        span = self.num_buckets
+        if window_seconds is not None:
+            span = min(span, max(1, int(window_seconds // self.bucket_seconds)))
+        oldest_epoch = current_epoch - span + 1
+
+        result = LatencyHistogram()
+        for index, epoch in enumerate(self.epochs):
+            if oldest_epoch <= epoch <= current_epoch:
+                result.merge(self.histograms[index])
+        return result
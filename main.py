@@ -2,7 +2,6 @@ import os
 import time
 import logging
 import base64
-from typing import List
 from io import BytesIO
 from PIL import Image
 from functools import wraps
@@ -11,74 +10,169 @@ from functools import wraps
 logging.basicConfig(level=logging.DEBUG)
 logger = logging.getLogger(__name__)
 
-# Importar modelos e serviços
-from models import OCRResponse, CameraRequest
-from ocr_service import process_image_ocr
+# Importar serviços
+from ocr_service import process_image_ocr, strategies_for
 from camera_service import process_camera_image
 
 # Importar módulos de segurança e monitoramento
-from auth import require_api_key, verify_api_key, create_api_key
+from auth import require_api_key, admin_required, create_api_key, current_user, API_KEY_REQUIRED
 from security import validate_file_upload, add_security_headers, compress_image, log_request_info
 from monitoring import api_monitor
+from metrics_exporter import generate_metrics, OPENMETRICS_CONTENT_TYPE
+from scheduler import ocr_scheduler
+from deadline import Deadline, DeadlineExceeded
+from accounting import ResourceUsage
+from quota import compute_quota, ComputeQuotaExceeded
+from flight_recorder import flight_recorder
+from tracing import start_trace, end_trace, span, recent_traces, sanitize_request_id
+from profiler import sampling_profiler, ProfilerBusy, PROFILER_MAX_SECONDS, PROFILE_FORMATS, load_profile
+from warmup import warmup
+from capacity import capacity_report, health_status
 
 ##########################
 # IMPLEMENTAÇÃO FLASK
 ##########################
-from flask import Flask, request, jsonify, render_template, url_for, redirect, g
-from werkzeug.utils import secure_filename
-
-# Inicializar Flask app
-app = Flask(__name__,
-    static_folder='static',
-    template_folder='templates'
-)
-app.secret_key = os.environ.get("SESSION_SECRET", "dev_secret_key")
-app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max upload size
-app.config['API_KEY_REQUIRED'] = False  # Definir como True em produção
+# O app é criado por create_app() (gunicorn 'main:create_app()'); main.app e
+# main.fastapi_app continuam disponíveis, criados no primeiro acesso. Este
+# módulo não importa o FastAPI: o app FastAPI fica em fastapi_server.py.
+from flask import Flask, request, jsonify, render_template, g, Response, current_app
 
 # Middleware para adicionar cabeçalhos de segurança
-@app.after_request
 def after_request(response):
     return add_security_headers(response)
 
 # Middleware para logging de requisições
-@app.before_request
 def before_request():
     log_request_info()
     g.start_time = time.time()
+    # O id do trace é sempre gerado aqui; o X-Request-ID do cliente é só devolvido em X-Client-Request-ID
+    g.trace, g.trace_token = start_trace(name=request.endpoint,
+                                         client_request_id=sanitize_request_id(request.headers.get('X-Request-ID')))
 
 # Middleware para monitoramento
-@app.after_request
 def after_request_monitoring(response):
+    duration_ms = None
     if hasattr(g, 'start_time'):
         duration_ms = (time.time() - g.start_time) * 1000
         endpoint = request.endpoint or 'unknown'
         status_code = response.status_code
         ip = request.remote_addr
         api_monitor.record_request(endpoint, status_code, duration_ms, ip)
+    
+    trace = g.get('trace')
+    if trace is not None:
+        # Tempos por etapa para o cliente (Server-Timing) e para as métricas
+        response.headers['Server-Timing'] = trace.server_timing_header(duration_ms)
+        response.headers['X-Request-ID'] = trace.request_id
+        if trace.client_request_id:
+            response.headers['X-Client-Request-ID'] = trace.client_request_id
+        api_monitor.record_stage_times(trace.stage_timings())
+        recent_traces.add(trace)
+    
+    # Cota em unidades de computação consumida pelo OCR da requisição
+    quota_result = g.get('compute_quota')
+    if quota_result is not None:
+        response.headers.update(quota_result.headers(prefix='X-ComputeQuota'))
+    
+    # Capturar a requisição de OCR se ela passou do limite do flight recorder
+    flight_input = g.get('flight_input')
+    if flight_input is not None and duration_ms is not None:
+        image, settings = flight_input
+        flight_recorder.observe(duration_ms, request.endpoint, image, settings,
+                                trace=trace, status=response.status_code)
     return response
 
+# Encerrar o trace da requisição
+def teardown_trace(exc):
+    token = g.pop('trace_token', None)
+    if token is not None:
+        end_trace(token)
+
 # Decorador para API key opcional
 def optional_api_key(f):
+    """
+    Com API_KEY_REQUIRED a chave é obrigatória. Sem ela, uma chave informada
+    ainda é verificada (401 se inválida), para que o OCR use a fila, o peso
+    e a cota do cliente; sem chave, a requisição é anônima.
+    """
     @wraps(f)
     def decorated_function(*args, **kwargs):
-        if app.config['API_KEY_REQUIRED']:
+        api_key = request.headers.get('X-API-Key') or request.args.get('api_key')
+        if current_app.config['API_KEY_REQUIRED'] or api_key:
             return require_api_key(f)(*args, **kwargs)
         return f(*args, **kwargs)
     return decorated_function
 
+def run_ocr_job(image, deadline=None, usage=None, document_type=None):
+    """
+    Executa o OCR no escalonador, na fila do cliente da requisição atual
+
+    Clientes autenticados são identificados pelo user_id da API key (com peso
+    e limite de concorrência da chave); os demais, pelo endereço IP. O custo
+    do trabalho no escalonador é a estimativa em unidades de computação e,
+    para clientes autenticados, essas unidades são reservadas da cota da
+    chave e acertadas com o custo medido ao final. O tipo de documento
+    escolhe as estratégias de OCR (OCR_STRATEGY_CONFIG) e entra na estimativa.
+    
+    Raises:
+        ComputeQuotaExceeded: Se a cota de unidades da chave estiver esgotada
+    """
+    units = compute_quota.estimate(image, len(strategies_for(document_type)))
+    if current_user:
+        reservation = compute_quota.reserve(current_user.get("user_id"), current_user.get("rate_limit", 60), units)
+        g.compute_quota = reservation.result
+        try:
+            return ocr_scheduler.run(
+                current_user.get("user_id"),
+                process_image_ocr,
+                image,
+                deadline=deadline,
+                usage=usage,
+                document_type=document_type,
+                weight=current_user.get("weight", 1.0),
+                max_concurrency=current_user.get("max_concurrency"),
+                cost=compute_quota.job_cost(units)
+            )
+        finally:
+            compute_quota.settle(reservation, usage)
+    return ocr_scheduler.run(request.remote_addr or "anonymous", process_image_ocr, image,
+                             deadline=deadline, usage=usage, document_type=document_type,
+                             cost=compute_quota.job_cost(units))
+
+def record_ocr_resources(usage, document_type):
+    """Registra os recursos do OCR da requisição atual por endpoint, tipo de documento e cliente"""
+    api_key = current_user.get("user_id", "unknown") if current_user else "anonymous"
+    api_monitor.record_resource_usage(usage, request.endpoint or 'unknown', document_type, api_key)
+
+def compute_quota_exceeded_response(error):
+    """Retorna o erro de cota de unidades de computação esgotada"""
+    logger.warning(f"Cota de unidades de computação excedida para {current_user.get('user_id')}")
+    response = jsonify({
+        "status": "error",
+        "message": "Cota de processamento excedida. Tente novamente mais tarde.",
+        "error_code": 429
+    })
+    response.headers.update(error.result.headers(prefix='X-ComputeQuota'))
+    return response, 429
+
+def deadline_exceeded_response(error):
+    """Registra a requisição abandonada e retorna o erro de timeout"""
+    api_monitor.record_abandoned_request(request.endpoint or 'unknown', error.reason, error.cpu_ms)
+    return jsonify({
+        "status": "error",
+        "message": "Tempo limite da requisição excedido",
+        "error_code": 504
+    }), 504
+
 # Adicionar endpoint para redirecionar para a documentação da API
-@app.route('/api-docs')
 def api_docs():
     """Redirecionamento para documentação da API"""
     return render_template('api_docs.html')
 
-@app.route('/')
 def read_root():
     """Serve the web interface for the OCR service"""
     return render_template("index.html")
 
-@app.route('/ocr/upload', methods=['POST'])
 @optional_api_key
 @validate_file_upload
 def ocr_upload():
@@ -90,6 +184,9 @@ def ocr_upload():
     """
     start_time = time.time()
     
+    # Prazo da requisição (header X-Request-Timeout ou padrão do servidor)
+    deadline = Deadline.from_headers(request.headers)
+    
     # A validação do arquivo já foi feita pelo decorator validate_file_upload
     file = request.files['file']
     
@@ -106,19 +203,32 @@ def ocr_upload():
         file_bytes = file.read()
         file_size = len(file_bytes)
         
-        # Convert to Image using PIL
-        image_pil = Image.open(BytesIO(file_bytes))
+        # Entrada guardada pelo flight recorder se a requisição for lenta
+        g.flight_input = (file_bytes, {
+            "source": "upload",
+            "language": language,
+            "document_type": document_type,
+            "enhanced_processing": enhanced_processing,
+            "compress": file_size > 1024 * 1024
+        })
         
-        # Convert to RGB if needed
-        if image_pil.mode != 'RGB':
-            image_pil = image_pil.convert('RGB')
+        # Convert to Image using PIL
+        with span('decode'):
+            image_pil = Image.open(BytesIO(file_bytes))
+            
+            # Convert to RGB if needed
+            if image_pil.mode != 'RGB':
+                image_pil = image_pil.convert('RGB')
             
         # Comprimir imagem se for grande
         if file_size > 1024 * 1024:  # Se maior que 1MB
-            image_pil = compress_image(image_pil, max_size=1800, quality=85)
+            with span('compress'):
+                image_pil = compress_image(image_pil, max_size=1800, quality=85)
         
         # Process the image with OCR
-        extracted_text = process_image_ocr(image_pil)
+        usage = ResourceUsage()
+        extracted_text = run_ocr_job(image_pil, deadline, usage, document_type)
+        record_ocr_resources(usage, document_type)
         
         # Calcular tempo de processamento
         processing_time = (time.time() - start_time) * 1000  # em milissegundos
@@ -140,6 +250,13 @@ def ocr_upload():
             "document_type": document_type
         })
     
+    except ComputeQuotaExceeded as e:
+        return compute_quota_exceeded_response(e)
+    
+    except DeadlineExceeded as e:
+        record_ocr_resources(usage, document_type)
+        return deadline_exceeded_response(e)
+    
     except Exception as e:
         logger.error(f"Error processing upload: {str(e)}")
         
@@ -157,7 +274,6 @@ def ocr_upload():
             "error_code": 500
         }), 500
 
-@app.route('/ocr/camera', methods=['POST'])
 @optional_api_key
 def ocr_camera():
     """
@@ -168,6 +284,9 @@ def ocr_camera():
     """
     start_time = time.time()
     
+    # Prazo da requisição (header X-Request-Timeout ou padrão do servidor)
+    deadline = Deadline.from_headers(request.headers)
+    
     logger.info("Received camera capture request")
     
     try:
@@ -188,7 +307,8 @@ def ocr_camera():
         logger.info(f"Parameters: language={language}, document_type={document_type}, enhanced={enhanced_processing}")
         
         # Process the camera image
-        image = process_camera_image(data['image_data'])
+        with span('decode'):
+            image = process_camera_image(data['image_data'])
         
         if image is None:
             return jsonify({
@@ -205,12 +325,24 @@ def ocr_camera():
         image_bytes = base64.b64decode(image_data)
         file_size = len(image_bytes)
         
+        # Entrada guardada pelo flight recorder se a requisição for lenta
+        g.flight_input = (image_bytes, {
+            "source": "camera",
+            "language": language,
+            "document_type": document_type,
+            "enhanced_processing": enhanced_processing,
+            "compress": file_size > 1024 * 1024
+        })
+        
         # Comprimir imagem se for grande
         if file_size > 1024 * 1024:  # Se maior que 1MB
-            image = compress_image(image, max_size=1800, quality=85)
+            with span('compress'):
+                image = compress_image(image, max_size=1800, quality=85)
         
         # Process the image with OCR
-        extracted_text = process_image_ocr(image)
+        usage = ResourceUsage()
+        extracted_text = run_ocr_job(image, deadline, usage, document_type)
+        record_ocr_resources(usage, document_type)
         
         # Calcular tempo de processamento
         processing_time = (time.time() - start_time) * 1000  # em milissegundos
@@ -232,6 +364,13 @@ def ocr_camera():
             "document_type": document_type
         })
     
+    except ComputeQuotaExceeded as e:
+        return compute_quota_exceeded_response(e)
+    
+    except DeadlineExceeded as e:
+        record_ocr_resources(usage, document_type)
+        return deadline_exceeded_response(e)
+    
     except Exception as e:
         logger.error(f"Error processing camera image: {str(e)}")
         
@@ -263,7 +402,6 @@ def ocr_camera():
             "error_code": 500
         }), 500
 
-@app.route('/api/stats', methods=['GET'])
 @optional_api_key
 def get_api_stats():
     """
@@ -286,7 +424,6 @@ def get_api_stats():
             "error_code": 500
         }), 500
 
-@app.route('/api/detailed-stats', methods=['GET'])
 @optional_api_key
 def get_detailed_stats():
     """
@@ -311,30 +448,87 @@ def get_detailed_stats():
             "error_code": 500
         }), 500
 
-@app.route('/api/health', methods=['GET'])
+@optional_api_key
+def metrics():
+    """
+    Métricas no formato OpenMetrics (Prometheus)
+    
+    Returns:
+        Response: Exposição em texto gerada incrementalmente
+    """
+    return Response(generate_metrics(api_monitor, ocr_scheduler), content_type=OPENMETRICS_CONTENT_TYPE)
+
+@optional_api_key
+def get_trace(request_id):
+    """
+    Exportar o trace de uma requisição recente
+    
+    Returns:
+        JSON: Trace no formato Chrome Trace (chrome://tracing, Perfetto)
+    """
+    trace = recent_traces.get(request_id)
+    if trace is None:
+        return jsonify({
+            "status": "error",
+            "message": "Trace not found",
+            "error_code": 404
+        }), 404
+    return jsonify(trace.to_chrome_trace())
+
 def health():
     """
-    Verificar saúde da API
+    Verificar saúde e capacidade atual do worker (sinais para o autoscaling)
     
     Returns:
-        JSON: Status da API
+        JSON: Status (healthy, saturated ou warming_up), capacidade e endpoints
     """
+    capacity = capacity_report(ocr_scheduler)
     return jsonify({
-        "status": "healthy",
+        "status": health_status(capacity, warmup.ready),
         "version": "1.0.0",
         "uptime": "OK",
+        "ready": warmup.ready,
+        "capacity": capacity,
         "endpoints": [
             {"path": "/", "methods": ["GET"], "description": "Interface web"},
             {"path": "/ocr/upload", "methods": ["POST"], "description": "OCR por upload de arquivo"},
             {"path": "/ocr/camera", "methods": ["POST"], "description": "OCR por captura de câmera"},
             {"path": "/api/stats", "methods": ["GET"], "description": "Estatísticas da API"},
+            {"path": "/metrics", "methods": ["GET"], "description": "Métricas OpenMetrics (Prometheus)"},
+            {"path": "/api/traces/<request_id>", "methods": ["GET"], "description": "Trace de uma requisição (Chrome Trace)"},
             {"path": "/api/health", "methods": ["GET"], "description": "Verificação de saúde"},
+            {"path": "/api/health/live", "methods": ["GET"], "description": "Liveness (processo respondendo)"},
+            {"path": "/api/health/ready", "methods": ["GET"], "description": "Readiness (worker aquecido)"},
             {"path": "/api-docs", "methods": ["GET"], "description": "Documentação da API"}
         ]
     })
 
-@app.route('/admin/api-keys', methods=['POST'])
+def health_live():
+    """
+    Liveness: o processo está respondendo (reiniciar o worker se falhar)
+    
+    Returns:
+        JSON: Status do processo
+    """
+    return jsonify({"status": "alive"})
+
+def health_ready():
+    """
+    Readiness: 503 até o fim do aquecimento do worker, para o load balancer
+    só enviar tráfego para workers aquecidos
+    
+    Returns:
+        JSON: Estado do aquecimento
+    """
+    state = warmup.status()
+    return jsonify({
+        "status": "ready" if state["ready"] else "warming_up",
+        "warmup": state,
+        "capacity": capacity_report(ocr_scheduler)
+    }), 200 if state["ready"] else 503
+
 @require_api_key
+@admin_required
 def admin_create_api_key():
     """
     Criar nova API key (apenas para admins)
@@ -357,6 +551,8 @@ def admin_create_api_key():
         rate_limit = data.get('rate_limit', 60)
         expires_days = data.get('expires_days', 30)
         permissions = data.get('permissions', ['read'])
+        weight = data.get('weight', 1.0)
+        max_concurrency = data.get('max_concurrency')
         
         if not user_id or not name:
             return jsonify({
@@ -365,7 +561,8 @@ def admin_create_api_key():
                 "error_code": 400
             }), 400
         
-        api_key_data = create_api_key(user_id, name, rate_limit, expires_days, permissions)
+        api_key_data = create_api_key(user_id, name, rate_limit, expires_days, permissions,
+                                      weight=weight, max_concurrency=max_concurrency)
         
         return jsonify({
             "status": "success",
@@ -379,284 +576,183 @@ def admin_create_api_key():
             "error_code": 500
         }), 500
 
-@app.errorhandler(Exception)
-def handle_exception(e):
-    """Global exception handler"""
-    logger.error(f"Unhandled exception: {str(e)}")
-    return jsonify({
-        "status": "error",
-        "message": f"Server error: {str(e)}",
-        "error_code": 500
-    }), 500
-
-##########################
-# IMPLEMENTAÇÃO FASTAPI
-##########################
-# Note: Esta implementação FastAPI está disponível mas não está sendo servida pelo Gunicorn
-# Para utilizar, use o script workflow_fastapi.sh ou run_fastapi.py
-from fastapi import FastAPI, UploadFile, File, HTTPException, Request, Form, Query, Depends
-from fastapi.responses import HTMLResponse, JSONResponse
-from fastapi.staticfiles import StaticFiles
-from fastapi.templating import Jinja2Templates
-from fastapi.middleware.cors import CORSMiddleware
-from pydantic import BaseModel, Field
-from enum import Enum
-from typing import Optional as OptionalType
-
-# Modelos Pydantic para FastAPI
-class OCRLanguage(str, Enum):
-    PORTUGUESE = "por"
-    ENGLISH = "eng"
-    SPANISH = "spa"
-    AUTO = "auto"
-
-class DocumentType(str, Enum):
-    RG = "rg"
-    CPF = "cpf"
-    CNH = "cnh"
-    GENERIC = "generic"
-
-class FastAPIResponse(BaseModel):
-    text: List[str] = []
-    status: str = ""
-    processing_time_ms: OptionalType[float] = None
-    language_detected: OptionalType[str] = None
-    document_type: OptionalType[str] = None
-
-class FastAPIErrorResponse(BaseModel):
-    status: str = "error"
-    message: str
-    error_code: OptionalType[int] = None
-
-class FastAPICameraRequest(BaseModel):
-    image_data: str
-    language: OptionalType[OCRLanguage] = OCRLanguage.PORTUGUESE
-    document_type: OptionalType[DocumentType] = DocumentType.GENERIC
-    enhanced_processing: bool = True
-
-class OCRSettings(BaseModel):
-    language: OCRLanguage = OCRLanguage.PORTUGUESE
-    document_type: DocumentType = DocumentType.GENERIC
-    enhanced_processing: bool = True
-    confidence_threshold: float = Field(0.0, ge=0.0, le=100.0)
-
-class OCRStatistics(BaseModel):
-    total_requests: int = 0
-    successful_requests: int = 0
-    failed_requests: int = 0
-    average_processing_time_ms: float = 0.0
-
-# Armazenar estatísticas em memória
-ocr_stats = OCRStatistics()
-
-# Inicializar FastAPI app 
-fastapi_app = FastAPI(
-    title="OCR Document API",
-    description="API para extração de texto de documentos usando OCR",
-    version="1.0.0"
-)
-
-# Configurar CORS
-fastapi_app.add_middleware(
-    CORSMiddleware,
-    allow_origins=["*"],
-    allow_credentials=True,
-    allow_methods=["*"],
-    allow_headers=["*"],
-)
-
-# Montar arquivos estáticos
-fastapi_app.mount("/static", StaticFiles(directory="static"), name="static")
-
-# Templates
-templates = Jinja2Templates(directory="templates")
-
-# Função para obter configurações de OCR
-def get_ocr_settings(
-    language: OCRLanguage = Query(OCRLanguage.PORTUGUESE, description="Idioma para OCR"),
-    document_type: DocumentType = Query(DocumentType.GENERIC, description="Tipo de documento"),
-    enhanced_processing: bool = Query(True, description="Usar processamento avançado"),
-    confidence_threshold: float = Query(0.0, ge=0.0, le=100.0, description="Limite de confiança (0-100)")
-) -> OCRSettings:
-    return OCRSettings(
-        language=language,
-        document_type=document_type,
-        enhanced_processing=enhanced_processing,
-        confidence_threshold=confidence_threshold
-    )
-
-# Rota raiz - servir a interface web
-@fastapi_app.get("/", response_class=HTMLResponse)
-async def fastapi_read_root(request: Request):
-    """Serve a interface web para o serviço OCR"""
-    return templates.TemplateResponse("index.html", {"request": request})
-
-# Endpoint de upload de imagem OCR
-@fastapi_app.post("/ocr/upload", response_model=FastAPIResponse, 
-                 responses={400: {"model": FastAPIErrorResponse}, 500: {"model": FastAPIErrorResponse}})
-async def fastapi_ocr_upload(
-    file: UploadFile = File(...),
-    settings: OCRSettings = Depends(get_ocr_settings)
-):
+@require_api_key
+@admin_required
+def admin_profile():
     """
-    Processa OCR em uma imagem de documento enviada
+    Iniciar o profiler por amostragem neste worker (apenas para admins)
     
-    Args:
-        file: Arquivo de imagem enviado
-        settings: Configurações para o processamento OCR
+    A sessão roda em segundo plano e a resposta volta imediatamente: com
+    workers síncronos, o worker continua atendendo requisições durante o
+    profiling. O resultado é gravado em PROFILER_DIR ao fim da sessão e
+    lido com GET /admin/profile/<profile_id> (por qualquer worker).
+    
+    Query params:
+        seconds: Duração da sessão (padrão 10, máximo PROFILER_MAX_SECONDS)
+        interval_ms: Intervalo entre amostras (padrão 5)
     
     Returns:
-        FastAPIResponse: Texto extraído e status
+        JSON: profile_id e a URL do resultado (202)
     """
-    import time
-    start_time = time.time()
-    
-    logger.info(f"FastAPI: Recebeu upload de arquivo: {file.filename}")
-    logger.info(f"FastAPI: Configurações: idioma={settings.language}, tipo={settings.document_type}, avançado={settings.enhanced_processing}")
+    seconds = request.args.get('seconds', 10.0, type=float)
+    interval_ms = request.args.get('interval_ms', 5.0, type=float)
     
     try:
-        # Ler o conteúdo do arquivo
-        file_bytes = await file.read()
-        
-        # Converter para Image usando PIL
-        image_pil = Image.open(BytesIO(file_bytes))
-        
-        # Converter para RGB se necessário
-        if image_pil.mode != 'RGB':
-            image_pil = image_pil.convert('RGB')
-            
-        # Processar a imagem com OCR
-        extracted_text = process_image_ocr(image_pil)
-        
-        # Calcular tempo de processamento
-        processing_time = (time.time() - start_time) * 1000  # em milissegundos
-        
-        # Atualizar estatísticas
-        ocr_stats.total_requests += 1
-        ocr_stats.successful_requests += 1
-        ocr_stats.average_processing_time_ms = (
-            (ocr_stats.average_processing_time_ms * (ocr_stats.successful_requests - 1) + processing_time) / 
-            ocr_stats.successful_requests
-        )
-        
-        return FastAPIResponse(
-            text=extracted_text,
-            status="success",
-            processing_time_ms=processing_time,
-            language_detected=str(settings.language),
-            document_type=str(settings.document_type)
-        )
+        profile_id = sampling_profiler.start_background(seconds, interval_ms / 1000)
+    except ProfilerBusy as e:
+        return jsonify({
+            "status": "error",
+            "message": str(e),
+            "error_code": 409
+        }), 409
     
-    except Exception as e:
-        logger.error(f"FastAPI: Erro ao processar upload: {str(e)}")
-        
-        # Atualizar estatísticas
-        ocr_stats.total_requests += 1
-        ocr_stats.failed_requests += 1
-        
-        raise HTTPException(status_code=500, detail=f"OCR processing error: {str(e)}")
+    return jsonify({
+        "status": "started",
+        "profile_id": profile_id,
+        "seconds": min(max(seconds, 0.0), PROFILER_MAX_SECONDS),
+        "result": f"/admin/profile/{profile_id}"
+    }), 202
 
-# Endpoint de imagem de câmera OCR
-@fastapi_app.post("/ocr/camera", response_model=FastAPIResponse, 
-                 responses={400: {"model": FastAPIErrorResponse}, 500: {"model": FastAPIErrorResponse}})
-async def fastapi_ocr_camera(request: FastAPICameraRequest):
+@require_api_key
+@admin_required
+def admin_profile_result(profile_id):
     """
-    Processa OCR em uma imagem capturada da câmera
+    Baixar o resultado de uma sessão do profiler (apenas para admins)
     
-    Args:
-        request: Solicitação de captura de câmera contendo dados de imagem base64
+    Query params:
+        format: collapsed (padrão) ou speedscope
     
     Returns:
-        FastAPIResponse: Texto extraído e status
+        Response: Pilhas amostradas no formato solicitado (404 enquanto a sessão não terminar)
     """
-    import time
-    start_time = time.time()
+    output_format = request.args.get('format', 'collapsed')
+    if output_format not in PROFILE_FORMATS:
+        return jsonify({
+            "status": "error",
+            "message": "format must be 'collapsed' or 'speedscope'",
+            "error_code": 400
+        }), 400
     
-    logger.info("FastAPI: Recebeu solicitação de captura de câmera")
-    logger.info(f"FastAPI: Configurações: idioma={request.language}, tipo={request.document_type}, avançado={request.enhanced_processing}")
+    content = load_profile(profile_id, output_format)
+    if content is None:
+        return jsonify({
+            "status": "error",
+            "message": "Profile not found (still running or expired)",
+            "error_code": 404
+        }), 404
     
-    try:
-        # Processar a imagem da câmera
-        image = process_camera_image(request.image_data)
-        
-        if image is None:
-            raise HTTPException(status_code=400, detail="Invalid camera image")
-        
-        # Processar a imagem com OCR
-        extracted_text = process_image_ocr(image)
-        
-        # Calcular tempo de processamento
-        processing_time = (time.time() - start_time) * 1000  # em milissegundos
-        
-        # Atualizar estatísticas
-        ocr_stats.total_requests += 1
-        ocr_stats.successful_requests += 1
-        ocr_stats.average_processing_time_ms = (
-            (ocr_stats.average_processing_time_ms * (ocr_stats.successful_requests - 1) + processing_time) / 
-            ocr_stats.successful_requests
-        )
-        
-        return FastAPIResponse(
-            text=extracted_text,
-            status="success",
-            processing_time_ms=processing_time,
-            language_detected=str(request.language),
-            document_type=str(request.document_type)
-        )
+    content_type = 'application/json' if output_format == 'speedscope' else 'text/plain; charset=utf-8'
+    response = Response(content, content_type=content_type)
+    response.headers['Content-Disposition'] = f'attachment; filename="{profile_id}{PROFILE_FORMATS[output_format]}"'
+    return response
+
+@require_api_key
+@admin_required
+def admin_flight_recorder():
+    """
+    Listar as requisições lentas capturadas neste worker (apenas para admins)
     
-    except Exception as e:
-        logger.error(f"FastAPI: Erro ao processar imagem da câmera: {str(e)}")
-        
-        # Atualizar estatísticas
-        ocr_stats.total_requests += 1
-        ocr_stats.failed_requests += 1
-        
-        raise HTTPException(status_code=500, detail=f"OCR processing error: {str(e)}")
-
-# Manipulador de exceções
-@fastapi_app.exception_handler(Exception)
-async def fastapi_global_exception_handler(request: Request, exc: Exception):
-    """Manipulador global de exceções"""
-    return JSONResponse(
-        status_code=500,
-        content={"status": "error", "message": str(exc), "error_code": 500}
-    )
+    Returns:
+        JSON: Metadados das capturas (sem as imagens)
+    """
+    return jsonify({
+        "status": "success",
+        "threshold_ms": flight_recorder.threshold_ms,
+        "captures": flight_recorder.list_captures()
+    })
 
-# Endpoint para obter estatísticas
-@fastapi_app.get("/api/stats", response_model=OCRStatistics)
-async def get_stats():
+@require_api_key
+@admin_required
+def admin_flight_recorder_capture(capture_id):
     """
-    Retorna estatísticas sobre o uso da API OCR
+    Baixar uma captura completa para o replay (apenas para admins)
     
     Returns:
-        OCRStatistics: Estatísticas de uso da API
+        JSON: Captura (a imagem, se houver, está criptografada)
     """
-    return ocr_stats
+    capture = flight_recorder.get(capture_id)
+    if capture is None:
+        return jsonify({
+            "status": "error",
+            "message": "Capture not found",
+            "error_code": 404
+        }), 404
+    response = jsonify(capture)
+    response.headers['Content-Disposition'] = f'attachment; filename="{capture_id}.json"'
+    return response
 
-# Endpoint de saúde da API
-@fastapi_app.get("/api/health")
-async def health_check():
+def handle_exception(e):
+    """Global exception handler"""
+    logger.error(f"Unhandled exception: {str(e)}")
+    return jsonify({
+        "status": "error",
+        "message": f"Server error: {str(e)}",
+        "error_code": 500
+    }), 500
+
+# Rotas do app Flask: (regra, função, métodos); o endpoint é o nome da função
+ROUTES = [
+    ('/api-docs', api_docs, ['GET']),
+    ('/', read_root, ['GET']),
+    ('/ocr/upload', ocr_upload, ['POST']),
+    ('/ocr/camera', ocr_camera, ['POST']),
+    ('/api/stats', get_api_stats, ['GET']),
+    ('/api/detailed-stats', get_detailed_stats, ['GET']),
+    ('/metrics', metrics, ['GET']),
+    ('/api/traces/<request_id>', get_trace, ['GET']),
+    ('/api/health', health, ['GET']),
+    ('/api/health/live', health_live, ['GET']),
+    ('/api/health/ready', health_ready, ['GET']),
+    ('/admin/api-keys', admin_create_api_key, ['POST']),
+    ('/admin/profile', admin_profile, ['POST']),
+    ('/admin/profile/<profile_id>', admin_profile_result, ['GET']),
+    ('/admin/flight-recorder', admin_flight_recorder, ['GET']),
+    ('/admin/flight-recorder/<capture_id>', admin_flight_recorder_capture, ['GET']),
+]
+
+def create_app():
     """
-    Endpoint de verificação de saúde da API
+    Cria o app Flask
     
     Returns:
-        dict: Status da API
+        Flask: App com configuração, hooks de segurança/monitoramento e rotas
     """
-    return {
-        "status": "healthy",
-        "version": "1.0.0",
-        "api_type": "FastAPI",
-        "endpoints": [
-            {"path": "/", "methods": ["GET"], "description": "Interface web"},
-            {"path": "/ocr/upload", "methods": ["POST"], "description": "OCR por upload de arquivo"},
-            {"path": "/ocr/camera", "methods": ["POST"], "description": "OCR por captura de câmera"},
-            {"path": "/api/stats", "methods": ["GET"], "description": "Estatísticas da API"},
-            {"path": "/api/health", "methods": ["GET"], "description": "Verificação de saúde"},
-            {"path": "/docs", "methods": ["GET"], "description": "Documentação Swagger"},
-            {"path": "/redoc", "methods": ["GET"], "description": "Documentação ReDoc"}
-        ]
-    }
+    app = Flask(__name__,
+        static_folder='static',
+        template_folder='templates'
+    )
+    app.secret_key = os.environ.get("SESSION_SECRET", "dev_secret_key")
+    app.config['MAX_CONTENT_LENGTH'] = 10 * 1024 * 1024  # 10MB max upload size
+    app.config['API_KEY_REQUIRED'] = API_KEY_REQUIRED  # API_KEY_REQUIRED=true em produção
+    
+    app.before_request(before_request)
+    app.after_request(after_request)
+    app.after_request(after_request_monitoring)
+    app.teardown_request(teardown_trace)
+    app.register_error_handler(Exception, handle_exception)
+    
+    for rule, view_func, methods in ROUTES:
+        app.add_url_rule(rule, view_func=view_func, methods=methods)
+    
+    # Aquecer o worker em segundo plano (o gunicorn cria o app em cada worker)
+    warmup.start()
+    return app
+
+# Apps criados sob demanda para 'main:app' e 'main:fastapi_app'
+_apps = {}
+
+def __getattr__(name):
+    if name == "app":
+        if name not in _apps:
+            _apps[name] = create_app()
+        return _apps[name]
+    if name == "fastapi_app":
+        if name not in _apps:
+            import fastapi_server
+            _apps[name] = fastapi_server.create_app()
+        return _apps[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
 
 if __name__ == "__main__":
     # Executar o aplicativo Flask
-    app.run(host="0.0.0.0", port=5000, debug=True)
\ No newline at end of file
+    create_app().run(host="0.0.0.0", port=5000, debug=True)
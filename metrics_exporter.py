@@ -0,0 +1,208 @@
+import time
+import logging
+
+from latency import bucket_upper_bound
+from capacity import capacity_report
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Content-Type do formato de exposição OpenMetrics
+OPENMETRICS_CONTENT_TYPE = "application/openmetrics-text; version=1.0.0; charset=utf-8"
+
+# Limites (em segundos) dos buckets exportados para os histogramas de latência
+HISTOGRAM_BOUNDS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 30.0, 60.0)
+
+# Instante em que o processo começou a exportar métricas
+PROCESS_START_TIME = time.time()
+
+
+def _escape(value):
+    """Escapa o valor de um label segundo o formato OpenMetrics"""
+    return str(value).replace("\\", "\\\\").replace("\"", "\\\"").replace("\n", "\\n")
+
+
+def _labels(**labels):
+    """Formata um conjunto de labels ({a="1",b="2"})"""
+    if not labels:
+        return ""
+    return "{" + ",".join(f'{name}="{_escape(value)}"' for name, value in labels.items()) + "}"
+
+
+def _family(name, metric_type, help_text, samples):
+    """
+    Formata uma família de métricas
+
+    Args:
+        name: Nome da família (sem sufixo _total)
+        metric_type: counter, gauge ou histogram
+        help_text: Descrição da métrica
+        samples: Lista de (sufixo, labels, valor)
+
+    Returns:
+        str: Bloco de texto da família
+    """
+    lines = [f"# TYPE {name} {metric_type}", f"# HELP {name} {help_text}"]
+    for suffix, labels, value in samples:
+        lines.append(f"{name}{suffix}{_labels(**labels)} {value}")
+    return "\n".join(lines) + "\n"
+
+
+def _histogram_samples(histogram, **labels):
+    """
+    Converte um LatencyHistogram (ms) em amostras de histograma OpenMetrics (s)
+
+    Cada bucket logarítmico é contado no primeiro limite exportado maior ou
+    igual ao seu limite superior.
+    """
+    bounds = [bound * 1000 for bound in HISTOGRAM_BOUNDS]
+    cumulative = [0] * len(bounds)
+    for index, count in histogram.counts.items():
+        upper = bucket_upper_bound(index)
+        for position, bound in enumerate(bounds):
+            if upper <= bound:
+                cumulative[position] += count
+                break
+
+    samples = []
+    running = 0
+    for bound, count in zip(HISTOGRAM_BOUNDS, cumulative):
+        running += count
+        samples.append(("_bucket", dict(labels, le=repr(bound)), running))
+    samples.append(("_bucket", dict(labels, le="+Inf"), histogram.count))
+    samples.append(("_count", labels, histogram.count))
+    samples.append(("_sum", labels, round(histogram.total / 1000, 6)))
+    return samples
+
+
+def generate_metrics(monitor, scheduler=None, fastapi_stats=None, loop_monitor=None):
+    """
+    Gera a exposição OpenMetrics incrementalmente, uma família por vez
+
+    O snapshot do monitor é obtido imediatamente; a formatação acontece à
+    medida que o gerador é consumido pela resposta HTTP.
+
+    Args:
+        monitor: APIMonitor com as métricas da API
+        scheduler: FairShareScheduler (opcional) para métricas das filas de OCR
+        fastapi_stats: OCRStatistics (opcional) da aplicação FastAPI
+        loop_monitor: EventLoopLagMonitor (opcional) do servidor ASGI
+
+    Returns:
+        generator: Blocos de texto no formato OpenMetrics
+    """
+    snapshot = monitor.snapshot()
+    capacity = capacity_report(scheduler, loop_monitor) if scheduler is not None else None
+    return _render(snapshot, capacity, fastapi_stats)
+
+
+def _render(snapshot, capacity, fastapi_stats):
+    """Formata as famílias de métricas a partir dos dados já copiados"""
+    yield _family("ocr_process_start_time_seconds", "gauge",
+                  "Instante de início do processo (unix)",
+                  [("", {}, round(PROCESS_START_TIME, 3))])
+
+    yield _family("ocr_api_requests", "counter", "Requisições HTTP por endpoint e status", [
+        ("_total", {"endpoint": endpoint, "status": status}, count)
+        for (endpoint, status), count in sorted(snapshot["requests_by_endpoint_status"].items(), key=str)
+    ])
+
+    samples = []
+    for endpoint, histogram in sorted(snapshot["request_latency_by_endpoint"].items()):
+        samples.extend(_histogram_samples(histogram, endpoint=endpoint))
+    yield _family("ocr_api_request_duration_seconds", "histogram",
+                  "Duração das requisições HTTP por endpoint", samples)
+
+    samples = []
+    for stage, histogram in sorted(snapshot["stage_latency"].items()):
+        samples.extend(_histogram_samples(histogram, stage=stage))
+    yield _family("ocr_stage_duration_seconds", "histogram",
+                  "Duração das etapas do pipeline de OCR", samples)
+
+    yield _family("ocr_documents_by_language", "counter", "Documentos processados por idioma", [
+        ("_total", {"language": language}, count)
+        for language, count in sorted(snapshot["ocr_by_language"].items())
+    ])
+    yield _family("ocr_documents_by_type", "counter", "Documentos processados por tipo", [
+        ("_total", {"document_type": doc_type}, count)
+        for doc_type, count in sorted(snapshot["ocr_by_document_type"].items())
+    ])
+    yield _family("ocr_success_rate", "gauge", "Taxa de sucesso do OCR (média suavizada, 0-1)",
+                  [("", {}, round(snapshot["ocr_success_rate"], 4))])
+
+    yield _family("ocr_abandoned_requests", "counter", "Requisições de OCR abandonadas por motivo", [
+        ("_total", {"reason": reason}, count)
+        for reason, count in sorted(snapshot["abandoned_by_reason"].items())
+    ])
+    yield _family("ocr_wasted_cpu_seconds", "counter", "CPU gasta em requisições abandonadas",
+                  [("_total", {}, round(snapshot["wasted_cpu_ms"] / 1000, 6))])
+
+    resources = snapshot.get("resource_by_endpoint", {})
+    yield _family("ocr_cpu_seconds", "counter", "CPU gasta no OCR por endpoint (pipeline e Tesseract)", [
+        sample
+        for endpoint, (_, cpu_ms, child_cpu_ms, _, _) in sorted(resources.items())
+        for sample in (
+            ("_total", {"endpoint": endpoint, "kind": "pipeline"}, round(cpu_ms / 1000, 6)),
+            ("_total", {"endpoint": endpoint, "kind": "tesseract"}, round(child_cpu_ms / 1000, 6))
+        )
+    ])
+    yield _family("ocr_decoded_pixels", "counter", "Pixels decodificados para OCR por endpoint", [
+        ("_total", {"endpoint": endpoint}, pixels)
+        for endpoint, (_, _, _, pixels, _) in sorted(resources.items())
+    ])
+    yield _family("ocr_compute_units", "counter", "Unidades de computação (megapixels × estratégias) por endpoint", [
+        ("_total", {"endpoint": endpoint}, round(units, 6))
+        for endpoint, (_, _, _, _, units) in sorted(resources.items())
+    ])
+
+    node = snapshot.get("node")
+    if node is not None:
+        # Totais de todos os workers do nó (região de memória compartilhada)
+        yield _family("ocr_node_workers", "gauge", "Workers ativos no nó",
+                      [("", {}, node["workers"])])
+        yield _family("ocr_node_requests", "counter", "Requisições HTTP do nó por classe de status", [
+            ("_total", {"status_class": status_class}, node[f"status_{status_class}"])
+            for status_class in ("2xx", "3xx", "4xx", "5xx")
+        ])
+        yield _family("ocr_node_request_duration_seconds", "histogram",
+                      "Duração das requisições HTTP no nó",
+                      _histogram_samples(node["request_latency"]))
+        yield _family("ocr_node_ocr_duration_seconds", "histogram",
+                      "Duração do processamento OCR no nó",
+                      _histogram_samples(node["ocr_latency"]))
+
+    if capacity is not None:
+        yield _family("ocr_scheduler_workers", "gauge", "Threads de execução de OCR",
+                      [("", {}, capacity["workers"])])
+        yield _family("ocr_scheduler_queued_jobs", "gauge", "Trabalhos de OCR aguardando na fila",
+                      [("", {}, capacity["queue_depth"])])
+        yield _family("ocr_scheduler_running_jobs", "gauge", "Trabalhos de OCR em execução",
+                      [("", {}, capacity["busy_workers"])])
+        yield _family("ocr_scheduler_oldest_queued_seconds", "gauge",
+                      "Espera do trabalho mais antigo na fila de OCR",
+                      [("", {}, round(capacity["oldest_queued_ms"] / 1000, 6))])
+        yield _family("ocr_scheduler_queue_delay_seconds", "gauge",
+                      "Espera recente na fila de OCR (média, p95 e máximo)", [
+            ("", {"stat": stat}, round(capacity["queue_delay_ms"][stat] / 1000, 6))
+            for stat in ("avg", "p95", "max")
+        ])
+        if "event_loop_lag_ms" in capacity:
+            yield _family("ocr_event_loop_lag_seconds", "gauge",
+                          "Atraso recente do event loop do ASGI (média e máximo)", [
+                ("", {"stat": stat}, round(capacity["event_loop_lag_ms"][stat] / 1000, 6))
+                for stat in ("avg", "max")
+            ])
+        yield _family("ocr_capacity_utilization", "gauge",
+                      "Utilização do worker (demanda de OCR / capacidade; >1 = fila crescendo)",
+                      [("", {}, capacity["utilization"])])
+
+    if fastapi_stats is not None:
+        yield _family("ocr_fastapi_requests", "counter", "Requisições de OCR da aplicação FastAPI", [
+            ("_total", {"result": "success"}, fastapi_stats.successful_requests),
+            ("_total", {"result": "failure"}, fastapi_stats.failed_requests)
+        ])
+        yield _family("ocr_fastapi_average_processing_seconds", "gauge",
+                      "Tempo médio de processamento OCR da aplicação FastAPI",
+                      [("", {}, round(fastapi_stats.average_processing_time_ms / 1000, 6))])
+
+    yield "# EOF\n"
@@ -0,0 +1,203 @@
+import os
+import time
+import sqlite3
+import logging
+from datetime import datetime
+from contextlib import contextmanager
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Banco SQLite com os agregados de métricas; vazio = desativado
+METRICS_DB_PATH = os.environ.get("METRICS_DB_PATH", "")
+# Intervalo entre gravações dos agregados (segundos)
+METRICS_FLUSH_INTERVAL = float(os.environ.get("METRICS_FLUSH_INTERVAL", 10))
+
+# Resoluções armazenadas e retenção de cada uma (segundos)
+RESOLUTIONS = ("minute", "hour", "day")
+RETENTION = {
+    "minute": 2 * 86400,
+    "hour": 90 * 86400,
+    "day": 5 * 365 * 86400
+}
+# Largura nominal de cada resolução (segundos), usada para escolher a resolução da consulta
+RESOLUTION_SECONDS = {"minute": 60, "hour": 3600, "day": 86400}
+
+_SCHEMA = """
+CREATE TABLE IF NOT EXISTS request_rollups (
+    resolution TEXT NOT NULL,
+    period_start INTEGER NOT NULL,
+    requests INTEGER NOT NULL DEFAULT 0,
+    errors INTEGER NOT NULL DEFAULT 0,
+    duration_ms REAL NOT NULL DEFAULT 0,
+    PRIMARY KEY (resolution, period_start)
+)
+"""
+
+# Soma os valores ao período existente: cada worker grava apenas os seus incrementos
+_UPSERT = """
+INSERT INTO request_rollups (resolution, period_start, requests, errors, duration_ms)
+VALUES (?, ?, ?, ?, ?)
+ON CONFLICT (resolution, period_start) DO UPDATE SET
+    requests = requests + excluded.requests,
+    errors = errors + excluded.errors,
+    duration_ms = duration_ms + excluded.duration_ms
+"""
+
+
+def period_start(timestamp, resolution):
+    """
+    Início do período (hora local) que contém o instante informado
+
+    Args:
+        timestamp: Instante (time.time())
+        resolution: minute, hour ou day
+
+    Returns:
+        int: Início do período em segundos desde a época
+    """
+    moment = datetime.fromtimestamp(timestamp).replace(second=0, microsecond=0)
+    if resolution in ("hour", "day"):
+        moment = moment.replace(minute=0)
+    if resolution == "day":
+        moment = moment.replace(hour=0)
+    return int(moment.timestamp())
+
+
+class MetricsStore:
+    """
+    Agregados de requisições por minuto, hora e dia em um banco SQLite local
+
+    As requisições são acumuladas em memória pelo APIMonitor e gravadas em
+    lote por uma thread em segundo plano, então o caminho da requisição não
+    faz I/O. Vários workers podem gravar no mesmo arquivo (modo WAL).
+    """
+
+    def __init__(self, path):
+        """
+        Args:
+            path: Arquivo do banco SQLite
+        """
+        self.path = path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(_SCHEMA)
+
+    @classmethod
+    def from_env(cls):
+        """Cria o armazenamento a partir de METRICS_DB_PATH (None se desativado)"""
+        if not METRICS_DB_PATH:
+            return None
+        try:
+            return cls(METRICS_DB_PATH)
+        except sqlite3.Error as e:
+            logger.error(f"Não foi possível abrir o banco de métricas {METRICS_DB_PATH}: {str(e)}")
+            return None
+
+    @contextmanager
+    def _connect(self):
+        """Conexão de curta duração (uma transação por bloco)"""
+        conn = sqlite3.connect(self.path, timeout=5)
+        try:
+            with conn:
+                yield conn
+        finally:
+            conn.close()
+
+    def write(self, minute_totals):
+        """
+        Grava incrementos por minuto e os agregados por hora e dia correspondentes
+
+        Args:
+            minute_totals: {início do minuto: [requisições, erros, soma das durações em ms]}
+        """
+        if not minute_totals:
+            return
+
+        totals = {}
+        for minute, (requests, errors, duration_ms) in minute_totals.items():
+            for resolution in RESOLUTIONS:
+                key = (resolution, period_start(minute, resolution))
+                row = totals.setdefault(key, [0, 0, 0.0])
+                row[0] += requests
+                row[1] += errors
+                row[2] += duration_ms
+
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(_UPSERT, [
+                (resolution, start, requests, errors, duration_ms)
+                for (resolution, start), (requests, errors, duration_ms) in totals.items()
+            ])
+            for resolution, retention in RETENTION.items():
+                conn.execute(
+                    "DELETE FROM request_rollups WHERE resolution = ? AND period_start < ?",
+                    (resolution, int(now - retention))
+                )
+
+    def query(self, start, end, resolution=None, max_points=200):
+        """
+        Série de requisições no intervalo, reduzida para no máximo max_points pontos
+
+        A resolução é a mais fina que cobre o intervalo com até max_points
+        pontos; se ainda houver pontos demais, eles são somados em grupos.
+
+        Args:
+            start: Início do intervalo (time.time())
+            end: Fim do intervalo (time.time())
+            resolution: minute, hour ou day (padrão: escolhida pelo intervalo)
+            max_points: Número máximo de pontos retornados
+
+        Returns:
+            list: Pontos com início do período, requisições, erros e duração média
+        """
+        if resolution is None:
+            resolution = "day"
+            for candidate in RESOLUTIONS:
+                if (end - start) / RESOLUTION_SECONDS[candidate] <= max_points:
+                    resolution = candidate
+                    break
+
+        aligned_start = period_start(start, resolution)
+        step = RESOLUTION_SECONDS[resolution]
+        points = max(1, int((end - start) // step) + 1)
+        if points > max_points:
+            step *= -(-points // max_points)
+
+        with self._connect() as conn:
+            rows = conn.execute(
+                """
+                SELECT MIN(period_start), SUM(requests), SUM(errors), SUM(duration_ms)
+                FROM request_rollups
+                WHERE resolution = ? AND period_start BETWEEN ? AND ?
+                GROUP BY (period_start - ?) / ?
+                ORDER BY 1
+                """,
+                (resolution, aligned_start, int(end), aligned_start, step)
+            ).fetchall()
+
+        return [
+            {
+                "period_start": start_ts,
+                "resolution": resolution,
+                "requests": requests,
+                "errors": errors,
+                "avg_response_time_ms": round(duration_ms / requests, 2) if requests else 0
+            }
+            for start_ts, requests, errors, duration_ms in rows
+        ]
+
+    def daily_counts(self, start, end):
+        """
+        Requisições por dia no intervalo
+
+        Returns:
+            dict: {data 'YYYY-MM-DD': requisições}
+        """
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT period_start, requests FROM request_rollups "
+                "WHERE resolution = 'day' AND period_start BETWEEN ? AND ?",
+                (period_start(start, "day"), int(end))
+            ).fetchall()
+        return {datetime.fromtimestamp(start_ts).strftime('%Y-%m-%d'): requests for start_ts, requests in rows}
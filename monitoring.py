@@ -1,36 +1,259 @@
+import os
 import time
+import heapq
+import atexit
 import logging
 import threading
-import statistics
 from collections import defaultdict, deque
 from datetime import datetime, timedelta
 
+from latency import LatencyHistogram, HistogramRing
+from shared_metrics import SharedMetrics
+from metrics_store import MetricsStore, METRICS_FLUSH_INTERVAL
+from accounting import ResourceAccounting
+
 # Configuração de logging
 logger = logging.getLogger(__name__)
 
+# Número de clientes (IPs) acompanhados pelo top-K
+TOP_CLIENTS_CAPACITY = int(os.environ.get("MONITOR_TOP_CLIENTS", 200))
+# Retenção das séries de requisições (horas, dias e meses)
+HOURLY_RETENTION = int(os.environ.get("MONITOR_HOURLY_RETENTION", 48))
+DAILY_RETENTION = int(os.environ.get("MONITOR_DAILY_RETENTION", 90))
+MONTHLY_RETENTION = int(os.environ.get("MONITOR_MONTHLY_RETENTION", 24))
+# Valores distintos de idioma e de tipo de documento contados (os demais são somados em "other")
+OCR_LABELS_MAX_KEYS = int(os.environ.get("MONITOR_OCR_LABELS_MAX_KEYS", 20))
+
+class BucketRing:
+    """
+    Janela deslizante de contadores agregados em buckets de tempo fixos
+    
+    Cada bucket guarda a época (instante / largura do bucket) a que pertence;
+    buckets de épocas antigas são reaproveitados na escrita. O registro é O(1)
+    e a consulta é O(número de buckets), independente do volume de requisições.
+    """
+    
+    def __init__(self, bucket_seconds, num_buckets):
+        """
+        Args:
+            bucket_seconds: Largura de cada bucket em segundos
+            num_buckets: Número de buckets (janela total = largura * número)
+        """
+        self.bucket_seconds = bucket_seconds
+        self.num_buckets = num_buckets
+        self.epochs = [-1] * num_buckets
+        self.counts = [0] * num_buckets
+        self.errors = [0] * num_buckets
+        self.durations = [0.0] * num_buckets
+    
+    def add(self, timestamp, duration_ms, error=False):
+        """
+        Registra uma requisição no bucket correspondente ao instante informado
+        
+        Args:
+            timestamp: Instante da requisição (time.time())
+            duration_ms: Duração da requisição em milissegundos
+            error: True se a requisição falhou
+        """
+        epoch = int(timestamp // self.bucket_seconds)
+        index = epoch % self.num_buckets
+        
+        if self.epochs[index] != epoch:
+            self.epochs[index] = epoch
+            self.counts[index] = 0
+            self.errors[index] = 0
+            self.durations[index] = 0.0
+        
+        self.counts[index] += 1
+        self.durations[index] += duration_ms
+        if error:
+            self.errors[index] += 1
+    
+    def totals(self, timestamp, window_seconds=None):
+        """
+        Soma os buckets dentro da janela que termina no instante informado
+        
+        Args:
+            timestamp: Fim da janela (time.time())
+            window_seconds: Tamanho da janela (padrão: janela inteira do anel)
+        
+        Returns:
+            tuple: (requisições, erros, soma das durações em ms)
+        """
+        current_epoch = int(timestamp // self.bucket_seconds)
+        span = self.num_buckets
+        if window_seconds is not None:
+            span = min(span, max(1, int(window_seconds // self.bucket_seconds)))
+        oldest_epoch = current_epoch - span + 1
+        
+        count = errors = 0
+        duration = 0.0
+        for index, epoch in enumerate(self.epochs):
+            if oldest_epoch <= epoch <= current_epoch:
+                count += self.counts[index]
+                errors += self.errors[index]
+                duration += self.durations[index]
+        return count, errors, duration
+
+class SpaceSaving:
+    """
+    Top-K aproximado de itens mais frequentes (algoritmo Space-Saving)
+    
+    Mantém no máximo `capacity` contadores. Um item novo com a tabela cheia
+    substitui o de menor contagem e herda essa contagem como erro máximo,
+    então todo item com frequência acima de total / capacity está garantido
+    no resultado. O menor contador é localizado por um heap com entradas
+    obsoletas descartadas sob demanda (O(log K) amortizado por registro).
+    """
+    
+    def __init__(self, capacity=TOP_CLIENTS_CAPACITY):
+        """
+        Args:
+            capacity: Número máximo de itens acompanhados
+        """
+        self.capacity = capacity
+        self.counts = {}
+        self.errors = {}
+        self.heap = []
+        self.total = 0
+    
+    def add(self, item, count=1):
+        """
+        Registra ocorrências de um item
+        
+        Args:
+            item: Item observado (ex: endereço IP)
+            count: Número de ocorrências
+        """
+        self.total += count
+        if item in self.counts:
+            self.counts[item] += count
+        elif len(self.counts) < self.capacity:
+            self.counts[item] = count
+            self.errors[item] = 0
+        else:
+            evicted, minimum = self._pop_min()
+            del self.counts[evicted]
+            del self.errors[evicted]
+            self.counts[item] = minimum + count
+            self.errors[item] = minimum
+        
+        heapq.heappush(self.heap, (self.counts[item], item))
+        if len(self.heap) > 4 * self.capacity:
+            # Descarta as entradas obsoletas para manter o heap limitado
+            self.heap = [(count, item) for item, count in self.counts.items()]
+            heapq.heapify(self.heap)
+    
+    def _pop_min(self):
+        """Remove do heap e retorna o item de menor contagem"""
+        while True:
+            count, item = heapq.heappop(self.heap)
+            if self.counts.get(item) == count:
+                return item, count
+    
+    def top(self, limit=10):
+        """
+        Itens mais frequentes
+        
+        Args:
+            limit: Número máximo de itens retornados
+        
+        Returns:
+            list: Tuplas (item, contagem estimada, erro máximo), em ordem decrescente
+        """
+        items = heapq.nlargest(limit, self.counts.items(), key=lambda x: x[1])
+        return [(item, count, self.errors[item]) for item, count in items]
+    
+    def __len__(self):
+        return len(self.counts)
+
+class RetainedSeries:
+    """
+    Contadores por período (hora, dia, mês) com retenção fixa
+    
+    Ao exceder a retenção, o período mais antigo é descartado ou, se houver
+    uma série de agregação, somado ao período correspondente dela
+    (ex: dias antigos acumulados por mês).
+    """
+    
+    def __init__(self, retention, rollup=None, rollup_key=None):
+        """
+        Args:
+            retention: Número máximo de períodos mantidos
+            rollup: RetainedSeries que recebe os períodos expirados (opcional)
+            rollup_key: Função que converte a chave expirada na chave da agregação
+        """
+        self.retention = retention
+        self.rollup = rollup
+        self.rollup_key = rollup_key
+        self.counts = {}
+    
+    def add(self, key, count=1):
+        """Soma ocorrências ao período informado (chaves ordenáveis, ex: '2024-05-01')"""
+        if key in self.counts:
+            self.counts[key] += count
+            return
+        self.counts[key] = count
+        if len(self.counts) > self.retention:
+            oldest = min(self.counts)
+            expired = self.counts.pop(oldest)
+            if self.rollup is not None:
+                self.rollup.add(self.rollup_key(oldest), expired)
+    
+    def get(self, key, default=0):
+        return self.counts.get(key, default)
+    
+    def items(self):
+        """Períodos em ordem cronológica"""
+        return sorted(self.counts.items())
+    
+    def __len__(self):
+        return len(self.counts)
+
 class APIMonitor:
     """
     Classe para monitorar o uso da API, coletando métricas e estatísticas
     """
     
-    def __init__(self, window_size=1000):
+    def __init__(self, window_size=1000, shared=None, store=None, flush_interval=METRICS_FLUSH_INTERVAL):
         """
         Inicializa o sistema de monitoramento
         
         Args:
             window_size: Número máximo de requisições para manter no histórico
+            shared: SharedMetrics (opcional) para agregar as métricas de todos
+                os workers do nó
+            store: MetricsStore (opcional) para persistir os agregados por
+                minuto, hora e dia
+            flush_interval: Intervalo entre gravações no store (segundos)
         """
+        self.shared = shared
+        self.store = store
+        self.flush_interval = flush_interval
+        # Incrementos por minuto ainda não gravados no store
+        self.pending_rollups = {}
+        self.flushing_rollups = {}
+        self._flusher_pid = None
         self.total_requests = 0
         self.successful_requests = 0
         self.failed_requests = 0
-        self.request_times = deque(maxlen=window_size)
-        self.request_times_by_endpoint = defaultdict(lambda: deque(maxlen=window_size))
+        
+        # Histogramas de latência (percentis sem guardar as amostras)
+        self.request_latency = LatencyHistogram()
+        self.request_latency_by_endpoint = defaultdict(LatencyHistogram)
+        self.request_latency_by_minute = HistogramRing(60, 60)
+        self.stage_latency = defaultdict(LatencyHistogram)
+        
         self.errors_by_type = defaultdict(int)
         self.requests_by_status = defaultdict(int)
         self.requests_by_endpoint = defaultdict(int)
-        self.requests_by_hour = defaultdict(int)
-        self.requests_by_date = defaultdict(int)
-        self.requests_by_ip = defaultdict(int)
+        self.requests_by_endpoint_status = defaultdict(int)
+        # Séries e top de clientes com memória limitada, independente do tráfego
+        # (dias além da retenção são acumulados por mês)
+        self.requests_by_month = RetainedSeries(MONTHLY_RETENTION)
+        self.requests_by_date = RetainedSeries(DAILY_RETENTION, self.requests_by_month, lambda date: date[:7])
+        self.requests_by_hour = RetainedSeries(HOURLY_RETENTION)
+        self.requests_by_ip = SpaceSaving(TOP_CLIENTS_CAPACITY)
         self.file_sizes_processed = deque(maxlen=window_size)
         self.lock = threading.RLock()  # Para thread-safety
         
@@ -40,12 +263,18 @@ class APIMonitor:
         self.ocr_by_language = defaultdict(int)
         self.ocr_by_document_type = defaultdict(int)
         
-        # Dados da última hora e último dia (para cálculos em tempo real)
-        self.last_hour_times = []
-        self.last_day_times = []
-        self.last_hour_errors = 0
-        self.last_day_errors = 0
-        self.last_reset = time.time()
+        # Requisições abandonadas (prazo expirado ou cliente desconectado)
+        self.abandoned_requests = 0
+        self.abandoned_by_reason = defaultdict(int)
+        self.wasted_cpu_ms = 0.0
+        
+        # Recursos de OCR por endpoint, tipo de documento e API key
+        self.resource_accounting = ResourceAccounting()
+        
+        # Janelas deslizantes para cálculos em tempo real:
+        # último minuto por segundo e último dia por minuto
+        self.second_ring = BucketRing(1, 60)
+        self.minute_ring = BucketRing(60, 24 * 60)
     
     def record_request(self, endpoint, status_code, duration_ms, ip=None):
         """
@@ -57,11 +286,13 @@ class APIMonitor:
             duration_ms: Duração da requisição em milissegundos
             ip: Endereço IP do cliente (opcional)
         """
+        current_time = time.time()
+        now = datetime.fromtimestamp(current_time)
+        current_hour = now.strftime('%Y-%m-%d %H:00')
+        current_date = now.strftime('%Y-%m-%d')
+        is_error = status_code >= 400
+        
         with self.lock:
-            current_time = time.time()
-            current_hour = datetime.now().strftime('%Y-%m-%d %H:00')
-            current_date = datetime.now().strftime('%Y-%m-%d')
-            
             # Contagens gerais
             self.total_requests += 1
             if 200 <= status_code < 400:
@@ -71,39 +302,37 @@ class APIMonitor:
                 self.errors_by_type[status_code] += 1
             
             # Armazenar tempo de requisição
-            self.request_times.append(duration_ms)
-            self.request_times_by_endpoint[endpoint].append(duration_ms)
+            self.request_latency.record(duration_ms)
+            self.request_latency_by_endpoint[endpoint].record(duration_ms)
+            self.request_latency_by_minute.record(current_time, duration_ms)
             
             # Atualizar contagens por status, endpoint e data
             self.requests_by_status[status_code] += 1
             self.requests_by_endpoint[endpoint] += 1
-            self.requests_by_hour[current_hour] += 1
-            self.requests_by_date[current_date] += 1
+            self.requests_by_endpoint_status[(endpoint, status_code)] += 1
+            self.requests_by_hour.add(current_hour)
+            self.requests_by_date.add(current_date)
             
             # Armazenar IP se fornecido
             if ip:
-                self.requests_by_ip[ip] += 1
-            
-            # Atualizar estatísticas de tempo real
-            self.last_hour_times.append((current_time, duration_ms))
-            self.last_day_times.append((current_time, duration_ms))
-            
-            if status_code >= 400:
-                self.last_hour_errors += 1
-                self.last_day_errors += 1
-            
-            # Limpar dados antigos (mais de 1 hora/dia)
-            one_hour_ago = current_time - 3600
-            one_day_ago = current_time - 86400
+                self.requests_by_ip.add(ip)
             
-            self.last_hour_times = [(t, d) for t, d in self.last_hour_times if t >= one_hour_ago]
-            self.last_day_times = [(t, d) for t, d in self.last_day_times if t >= one_day_ago]
+            # Atualizar estatísticas de tempo real (O(1) por requisição)
+            self.second_ring.add(current_time, duration_ms, is_error)
+            self.minute_ring.add(current_time, duration_ms, is_error)
             
-            # Verificar se precisamos resetar os contadores de erros
-            if current_time - self.last_reset > 3600:  # 1 hora
-                self.last_hour_errors = sum(1 for t, _ in self.last_hour_times if t >= one_hour_ago)
-                self.last_day_errors = sum(1 for t, _ in self.last_day_times if t >= one_day_ago)
-                self.last_reset = current_time
+            # Acumular para o store (gravado em lote pela thread de flush)
+            if self.store is not None:
+                rollup = self.pending_rollups.setdefault(int(current_time // 60) * 60, [0, 0, 0.0])
+                rollup[0] += 1
+                rollup[1] += is_error
+                rollup[2] += duration_ms
+        
+        if self.store is not None and self._flusher_pid != os.getpid():
+            self._start_flusher()
+        
+        if self.shared is not None:
+            self.shared.record_request(status_code, duration_ms)
     
     def record_ocr_processing(self, duration_ms, success, language, document_type, file_size=None):
         """
@@ -118,10 +347,16 @@ class APIMonitor:
         """
         with self.lock:
             self.ocr_processing_times.append(duration_ms)
+            if success:
+                self.stage_latency["ocr_total"].record(duration_ms)
             
-            # Atualizar contagens por idioma e tipo de documento
-            self.ocr_by_language[language] += 1
-            self.ocr_by_document_type[document_type] += 1
+            # Atualizar contagens por idioma e tipo de documento; os valores vêm
+            # do cliente e viram labels das métricas, então o número de chaves é limitado
+            for counts, key in ((self.ocr_by_language, str(language)),
+                                (self.ocr_by_document_type, str(document_type))):
+                if key not in counts and len(counts) >= OCR_LABELS_MAX_KEYS:
+                    key = "other"
+                counts[key] += 1
             
             # Armazenar tamanho do arquivo
             if file_size:
@@ -133,6 +368,176 @@ class APIMonitor:
                 success_ratio = self.successful_requests / total_ocr
                 # Suavizar a média para evitar mudanças bruscas
                 self.ocr_success_rate = 0.9 * self.ocr_success_rate + 0.1 * success_ratio
+        
+        if self.shared is not None:
+            self.shared.record_ocr(duration_ms, success)
+    
+    def record_stage_time(self, stage, duration_ms):
+        """
+        Registra a duração de uma etapa do pipeline de OCR
+        
+        Args:
+            stage: Nome da etapa (ex: preprocess, full_page)
+            duration_ms: Duração da etapa em milissegundos
+        """
+        with self.lock:
+            self.stage_latency[stage].record(duration_ms)
+    
+    def record_stage_times(self, timings):
+        """
+        Registra as durações das etapas de uma requisição de uma só vez
+        
+        Args:
+            timings: {etapa: duração em ms} (ex: Trace.stage_timings())
+        """
+        if not timings:
+            return
+        with self.lock:
+            for stage, duration_ms in timings.items():
+                self.stage_latency[stage].record(duration_ms)
+    
+    def record_resource_usage(self, usage, endpoint, document_type, api_key):
+        """
+        Registra os recursos consumidos pelo OCR de uma requisição
+        
+        Args:
+            usage: ResourceUsage preenchido por process_image_ocr
+            endpoint: Endpoint da API (ex: /ocr/upload)
+            document_type: Tipo de documento processado
+            api_key: Identificador do cliente (user_id da API key ou "anonymous")
+        """
+        with self.lock:
+            self.resource_accounting.record(
+                usage, endpoint=endpoint, document_type=document_type, api_key=api_key
+            )
+    
+    def get_resource_stats(self):
+        """
+        Custo do OCR por endpoint, tipo de documento e API key
+        
+        Returns:
+            dict: Totais e médias de CPU, pixels e memória por dimensão
+        """
+        with self.lock:
+            return self.resource_accounting.summary()
+    
+    def record_abandoned_request(self, endpoint, reason, cpu_ms=0.0):
+        """
+        Registra uma requisição cujo processamento OCR foi interrompido
+        
+        Args:
+            endpoint: Endpoint da API (ex: /ocr/upload)
+            reason: Motivo ("timeout" ou "client_disconnected")
+            cpu_ms: Tempo de CPU gasto antes da interrupção, em milissegundos
+        """
+        with self.lock:
+            self.abandoned_requests += 1
+            self.abandoned_by_reason[reason] += 1
+            self.wasted_cpu_ms += cpu_ms
+        
+        if self.shared is not None:
+            self.shared.record_abandoned(cpu_ms)
+    
+    def _start_flusher(self):
+        """Inicia a thread de gravação no store (uma por processo, após o fork)"""
+        with self.lock:
+            if self._flusher_pid == os.getpid():
+                return
+            self._flusher_pid = os.getpid()
+        
+        thread = threading.Thread(target=self._flush_loop, name="metrics-flusher", daemon=True)
+        thread.start()
+        atexit.register(self.flush_rollups)
+    
+    def _flush_loop(self):
+        while True:
+            time.sleep(self.flush_interval)
+            self.flush_rollups()
+    
+    def flush_rollups(self):
+        """Grava no store os incrementos acumulados desde a última gravação"""
+        if self.store is None:
+            return
+        with self.lock:
+            if not self.pending_rollups:
+                return
+            self.flushing_rollups = self.pending_rollups
+            self.pending_rollups = {}
+        
+        try:
+            self.store.write(self.flushing_rollups)
+        except Exception as e:
+            logger.error(f"Erro ao gravar agregados de métricas: {str(e)}")
+            # Devolve os incrementos para a próxima tentativa
+            with self.lock:
+                for minute, (requests, errors, duration_ms) in self.flushing_rollups.items():
+                    rollup = self.pending_rollups.setdefault(minute, [0, 0, 0.0])
+                    rollup[0] += requests
+                    rollup[1] += errors
+                    rollup[2] += duration_ms
+        finally:
+            with self.lock:
+                self.flushing_rollups = {}
+    
+    def _unflushed_by_date(self):
+        """Requisições por dia ainda não gravadas no store (chamar com o lock)"""
+        counts = defaultdict(int)
+        for rollups in (self.pending_rollups, self.flushing_rollups):
+            for minute, (requests, _, _) in rollups.items():
+                counts[datetime.fromtimestamp(minute).strftime('%Y-%m-%d')] += requests
+        return counts
+    
+    def get_request_timeline(self, start, end, max_points=200):
+        """
+        Série de requisições no intervalo, a partir dos agregados persistidos
+        
+        Args:
+            start: Início do intervalo (time.time())
+            end: Fim do intervalo (time.time())
+            max_points: Número máximo de pontos (intervalos longos são reduzidos)
+        
+        Returns:
+            list: Pontos da série ou lista vazia se o store estiver desativado
+        """
+        if self.store is None:
+            return []
+        return self.store.query(start, end, max_points=max_points)
+    
+    def snapshot(self):
+        """
+        Cópia dos contadores e histogramas para exportação (ex: /metrics)
+        
+        Apenas copia os dados sob o lock; toda a formatação é feita depois,
+        fora do lock, para não atrasar as requisições em andamento.
+        
+        Returns:
+            dict: Contadores e histogramas no momento da chamada
+        """
+        with self.lock:
+            snapshot = {
+                "total_requests": self.total_requests,
+                "requests_by_endpoint_status": dict(self.requests_by_endpoint_status),
+                "request_latency_by_endpoint": {
+                    endpoint: histogram.copy()
+                    for endpoint, histogram in self.request_latency_by_endpoint.items()
+                },
+                "stage_latency": {
+                    stage: histogram.copy()
+                    for stage, histogram in self.stage_latency.items() if histogram.count
+                },
+                "ocr_by_language": dict(self.ocr_by_language),
+                "ocr_by_document_type": dict(self.ocr_by_document_type),
+                "ocr_success_rate": self.ocr_success_rate,
+                "abandoned_by_reason": dict(self.abandoned_by_reason),
+                "wasted_cpu_ms": self.wasted_cpu_ms,
+                "resource_by_endpoint": {
+                    endpoint: (totals.requests, totals.cpu_ms, totals.child_cpu_ms, totals.pixels, totals.compute_units)
+                    for endpoint, totals in self.resource_accounting.totals["endpoint"].items()
+                }
+            }
+        
+        snapshot["node"] = self.shared.merged() if self.shared is not None else None
+        return snapshot
     
     def get_stats(self):
         """
@@ -141,34 +546,33 @@ class APIMonitor:
         Returns:
             dict: Estatísticas de uso
         """
+        current_time = time.time()
+        
         with self.lock:
-            # Calcular estatísticas de tempo de resposta
-            avg_response_time = 0
-            median_response_time = 0
-            p95_response_time = 0
-            
-            if self.request_times:
-                times_list = list(self.request_times)
-                avg_response_time = sum(times_list) / len(times_list)
-                median_response_time = statistics.median(times_list)
-                p95_response_time = statistics.quantiles(times_list, n=20)[-1]  # 95th percentile
+            # Calcular estatísticas de tempo de resposta (desde o início e na última hora)
+            avg_response_time = self.request_latency.mean()
+            percentiles = self.request_latency.percentiles((50, 95, 99))
+            hourly_percentiles = self.request_latency_by_minute.merged(current_time).percentiles((50, 95, 99))
             
             # Calcular taxas de erro
             error_rate = 0
             if self.total_requests > 0:
                 error_rate = self.failed_requests / self.total_requests
             
+            # Calcular requisições no último minuto
+            minute_request_count, _, _ = self.second_ring.totals(current_time)
+            
             # Calcular requisições na última hora
-            hourly_request_count = len(self.last_hour_times)
+            hourly_request_count, hourly_errors, _ = self.minute_ring.totals(current_time, 3600)
             hourly_error_rate = 0
             if hourly_request_count > 0:
-                hourly_error_rate = self.last_hour_errors / hourly_request_count
+                hourly_error_rate = hourly_errors / hourly_request_count
             
             # Calcular requisições nas últimas 24 horas
-            daily_request_count = len(self.last_day_times)
+            daily_request_count, daily_errors, _ = self.minute_ring.totals(current_time)
             daily_error_rate = 0
             if daily_request_count > 0:
-                daily_error_rate = self.last_day_errors / daily_request_count
+                daily_error_rate = daily_errors / daily_request_count
             
             # Endpoint mais requisitado
             top_endpoint = "N/A"
@@ -183,9 +587,9 @@ class APIMonitor:
                 avg_file_size = sum(self.file_sizes_processed) / len(self.file_sizes_processed)
             
             # Informações de OCR
-            avg_ocr_time = 0
-            if self.ocr_processing_times:
-                avg_ocr_time = sum(self.ocr_processing_times) / len(self.ocr_processing_times)
+            ocr_latency = self.stage_latency["ocr_total"]
+            avg_ocr_time = ocr_latency.mean()
+            ocr_percentiles = ocr_latency.percentiles((95, 99))
             
             # Estatísticas por idioma e tipo de documento
             top_language = "N/A"
@@ -197,21 +601,27 @@ class APIMonitor:
             if self.ocr_by_document_type:
                 top_document_type = max(self.ocr_by_document_type.items(), key=lambda x: x[1])[0]
             
-            return {
+            stats = {
                 "general": {
                     "total_requests": self.total_requests,
                     "successful_requests": self.successful_requests,
                     "failed_requests": self.failed_requests,
                     "error_rate": round(error_rate * 100, 2),
                     "avg_response_time_ms": round(avg_response_time, 2),
-                    "median_response_time_ms": round(median_response_time, 2),
-                    "p95_response_time_ms": round(p95_response_time, 2)
+                    "median_response_time_ms": round(percentiles[50], 2),
+                    "p95_response_time_ms": round(percentiles[95], 2),
+                    "p99_response_time_ms": round(percentiles[99], 2)
                 },
                 "realtime": {
+                    "minute_requests": minute_request_count,
+                    "requests_per_second": round(minute_request_count / 60, 2),
                     "hourly_requests": hourly_request_count,
                     "hourly_error_rate": round(hourly_error_rate * 100, 2),
                     "daily_requests": daily_request_count,
-                    "daily_error_rate": round(daily_error_rate * 100, 2)
+                    "daily_error_rate": round(daily_error_rate * 100, 2),
+                    "hourly_p50_response_time_ms": round(hourly_percentiles[50], 2),
+                    "hourly_p95_response_time_ms": round(hourly_percentiles[95], 2),
+                    "hourly_p99_response_time_ms": round(hourly_percentiles[99], 2)
                 },
                 "endpoints": {
                     "top_endpoint": top_endpoint,
@@ -221,14 +631,72 @@ class APIMonitor:
                 "ocr": {
                     "ocr_success_rate": round(self.ocr_success_rate * 100, 2),
                     "avg_ocr_processing_time_ms": round(avg_ocr_time, 2),
+                    "p95_ocr_processing_time_ms": round(ocr_percentiles[95], 2),
+                    "p99_ocr_processing_time_ms": round(ocr_percentiles[99], 2),
                     "top_language": top_language,
                     "top_document_type": top_document_type,
-                    "avg_file_size_bytes": round(avg_file_size, 2)
+                    "avg_file_size_bytes": round(avg_file_size, 2),
+                    "abandoned_requests": self.abandoned_requests,
+                    "abandoned_by_reason": dict(self.abandoned_by_reason),
+                    "wasted_cpu_ms": round(self.wasted_cpu_ms, 2)
                 },
                 "errors": {
                     "error_counts_by_type": dict(self.errors_by_type)
                 }
             }
+        
+        # Totais do nó (todos os workers), lidos fora do lock do monitor
+        if self.shared is not None:
+            stats["node"] = self.get_node_stats()
+        
+        return stats
+    
+    def get_node_stats(self):
+        """
+        Estatísticas agregadas de todos os workers do nó
+        
+        Returns:
+            dict: Totais do nó ou None se a região compartilhada estiver desativada
+        """
+        if self.shared is None:
+            return None
+        
+        merged = self.shared.merged()
+        request_latency = merged["request_latency"]
+        ocr_latency = merged["ocr_latency"]
+        total = merged["total_requests"]
+        
+        return {
+            "workers": merged["workers"],
+            "total_requests": total,
+            "successful_requests": merged["successful_requests"],
+            "failed_requests": merged["failed_requests"],
+            "error_rate": round(merged["failed_requests"] / total * 100, 2) if total else 0,
+            "requests_by_status_class": {
+                status_class: merged[f"status_{status_class}"]
+                for status_class in ("2xx", "3xx", "4xx", "5xx")
+            },
+            "response_time": request_latency.summary(),
+            "ocr_requests": merged["ocr_requests"],
+            "ocr_failures": merged["ocr_failures"],
+            "ocr_processing_time": ocr_latency.summary(),
+            "abandoned_requests": merged["abandoned_requests"],
+            "wasted_cpu_ms": round(merged["wasted_cpu_us"] / 1000, 2)
+        }
+    
+    def get_top_clients(self, limit=10):
+        """
+        Clientes (IPs) com mais requisições
+        
+        Args:
+            limit: Número máximo de clientes
+        
+        Returns:
+            list: Clientes com contagem estimada e erro máximo da estimativa
+        """
+        with self.lock:
+            top = self.requests_by_ip.top(limit)
+        return [{"ip": ip, "count": count, "max_overcount": error} for ip, count, error in top]
     
     def get_detailed_stats(self, days=7):
         """
@@ -240,10 +708,20 @@ class APIMonitor:
         Returns:
             dict: Estatísticas detalhadas
         """
+        # Histórico persistido (consultado fora do lock do monitor)
+        end_date = datetime.now()
+        start_date = end_date - timedelta(days=days)
+        stored_by_date = {}
+        request_timeline = []
+        if self.store is not None:
+            try:
+                stored_by_date = self.store.daily_counts(start_date.timestamp(), end_date.timestamp())
+                request_timeline = self.store.query(start_date.timestamp(), end_date.timestamp())
+            except Exception as e:
+                logger.error(f"Erro ao consultar agregados de métricas: {str(e)}")
+                stored_by_date = {}
+        
         with self.lock:
-            # Calcular datas para o período solicitado
-            end_date = datetime.now()
-            start_date = end_date - timedelta(days=days)
             
             # Filtrar dados para o período
             dates_in_range = []
@@ -254,54 +732,84 @@ class APIMonitor:
                 date += timedelta(days=1)
             
             # Preparar dados de requisições por dia
+            # (com o store, o histórico persistido mais o que ainda não foi gravado)
+            if self.store is not None:
+                unflushed = self._unflushed_by_date()
+                daily_count = lambda date_str: stored_by_date.get(date_str, 0) + unflushed.get(date_str, 0)
+            else:
+                daily_count = self.requests_by_date.get
+            
             requests_history = []
             for date_str in dates_in_range:
                 requests_history.append({
                     "date": date_str,
-                    "count": self.requests_by_date.get(date_str, 0)
+                    "count": daily_count(date_str)
                 })
             
             # Estatísticas por endpoint
             endpoint_stats = []
             for endpoint, count in sorted(self.requests_by_endpoint.items(), key=lambda x: x[1], reverse=True):
-                avg_time = 0
-                if endpoint in self.request_times_by_endpoint and self.request_times_by_endpoint[endpoint]:
-                    avg_time = sum(self.request_times_by_endpoint[endpoint]) / len(self.request_times_by_endpoint[endpoint])
+                latency = self.request_latency_by_endpoint.get(endpoint) or LatencyHistogram()
+                percentiles = latency.percentiles((50, 95, 99))
                 
                 endpoint_stats.append({
                     "endpoint": endpoint,
                     "count": count,
-                    "avg_response_time_ms": round(avg_time, 2)
+                    "avg_response_time_ms": round(latency.mean(), 2),
+                    "p50_response_time_ms": round(percentiles[50], 2),
+                    "p95_response_time_ms": round(percentiles[95], 2),
+                    "p99_response_time_ms": round(percentiles[99], 2)
                 })
             
+            # Latência por etapa do pipeline de OCR
+            stage_stats = []
+            for stage, latency in sorted(self.stage_latency.items()):
+                if latency.count:
+                    stage_stats.append(dict(stage=stage, **latency.summary()))
+            
             # Estatísticas por idioma
             language_stats = []
+            total_by_language = sum(self.ocr_by_language.values())
             for language, count in sorted(self.ocr_by_language.items(), key=lambda x: x[1], reverse=True):
                 language_stats.append({
                     "language": language,
                     "count": count,
-                    "percentage": round(count / sum(self.ocr_by_language.values()) * 100, 2) if self.ocr_by_language else 0
+                    "percentage": round(count / total_by_language * 100, 2) if total_by_language else 0
                 })
             
             # Estatísticas por tipo de documento
             document_stats = []
+            total_by_document_type = sum(self.ocr_by_document_type.values())
             for doc_type, count in sorted(self.ocr_by_document_type.items(), key=lambda x: x[1], reverse=True):
                 document_stats.append({
                     "document_type": doc_type,
                     "count": count,
-                    "percentage": round(count / sum(self.ocr_by_document_type.values()) * 100, 2) if self.ocr_by_document_type else 0
+                    "percentage": round(count / total_by_document_type * 100, 2) if total_by_document_type else 0
                 })
             
+            # Histórico mensal (dias além da retenção)
+            monthly_history = [
+                {"month": month, "count": count}
+                for month, count in self.requests_by_month.items()
+            ]
+            
             return {
                 "date_range": {
                     "start": start_date.strftime('%Y-%m-%d'),
                     "end": end_date.strftime('%Y-%m-%d')
                 },
                 "request_history": requests_history,
+                "monthly_history": monthly_history,
+                "request_timeline": request_timeline,
+                "top_clients": self.get_top_clients(),
                 "endpoint_stats": endpoint_stats,
+                "stage_stats": stage_stats,
                 "language_stats": language_stats,
-                "document_stats": document_stats
+                "document_stats": document_stats,
+                "resource_usage": self.resource_accounting.summary()
             }
 
 # Instância global para uso em toda a aplicação
-api_monitor = APIMonitor()
\ No newline at end of file
+# (com METRICS_SHM_PATH definido, as métricas do nó são agregadas entre workers;
+# com METRICS_DB_PATH, o histórico é persistido em SQLite)
+api_monitor = APIMonitor(shared=SharedMetrics.from_env(), store=MetricsStore.from_env())
\ No newline at end of file
@@ -0,0 +1,301 @@
+"""
+Motores de OCR usados por process_image_ocr
+
+O motor é escolhido por OCR_ENGINE:
+
+- tesseract (padrão): pré-processamento e estratégias do Tesseract do ocr_service;
+- fake: não faz OCR. Devolve texto pré-definido pelo hash da imagem, depois
+  de uma latência configurável, com falhas e timeouts injetados opcionalmente.
+  Usado para testar (e testar sob carga) a pilha de atendimento (validação,
+  autenticação, escalonador, monitoramento) sem depender da CPU do Tesseract.
+"""
+import os
+import json
+import time
+import random
+import hashlib
+import logging
+import threading
+from typing import List, Optional
+
+from deadline import Deadline, DeadlineExceeded
+from tracing import span
+from accounting import ResourceUsage
+from scheduler import DEFAULT_OCR_WORKERS
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Motor de OCR usado por process_image_ocr: tesseract ou fake
+OCR_ENGINE = os.environ.get("OCR_ENGINE", "tesseract")
+# Motor falso: arquivo JSON com as linhas devolvidas para cada hash de imagem
+OCR_FAKE_RESPONSES = os.environ.get("OCR_FAKE_RESPONSES", "")
+# Motor falso: distribuição da latência em ms (ver parse_latency)
+OCR_FAKE_LATENCY_MS = os.environ.get("OCR_FAKE_LATENCY_MS", "0")
+# Motor falso: fração das requisições que falham com erro / que esperam até o prazo
+OCR_FAKE_FAILURE_RATE = float(os.environ.get("OCR_FAKE_FAILURE_RATE", 0))
+OCR_FAKE_TIMEOUT_RATE = float(os.environ.get("OCR_FAKE_TIMEOUT_RATE", 0))
+# Motor falso: semente das latências e das falhas injetadas (vazio = aleatória)
+OCR_FAKE_SEED = os.environ.get("OCR_FAKE_SEED", "")
+
+
+def image_hash(image):
+    """
+    Hash dos pixels decodificados de uma imagem, chave de busca do motor falso
+
+    A imagem é convertida para RGB antes, como fazem os endpoints, então um
+    PNG e a imagem decodificada dele pelo servidor têm o mesmo hash.
+
+    Returns:
+        str: Hash em hexadecimal
+    """
+    if image.mode != 'RGB':
+        image = image.convert('RGB')
+    digest = hashlib.blake2b(f"{image.width}x{image.height}:".encode(), digest_size=16)
+    digest.update(image.tobytes())
+    return digest.hexdigest()
+
+
+def parse_latency(spec):
+    """
+    Interpreta uma distribuição de latência
+
+    Args:
+        spec: "50" (fixa), "uniform:20:80", "normal:50:10" (média, desvio padrão),
+            "lognormal:50:0.5" (mediana, sigma) ou "exponential:50" (média), em ms
+
+    Returns:
+        Callable[[random.Random], float]: Sorteia uma latência em segundos
+
+    Raises:
+        ValueError: Se a distribuição for inválida
+    """
+    kind, _, args = str(spec).strip().partition(":")
+    try:
+        if not args:
+            value = float(kind) / 1000
+            if value < 0:
+                raise ValueError
+            return lambda rng: value
+        params = [float(arg) for arg in args.split(":")]
+        if kind == "uniform":
+            low, high = params
+            return lambda rng: rng.uniform(low, high) / 1000
+        if kind == "normal":
+            mean, stddev = params
+            return lambda rng: max(rng.gauss(mean, stddev), 0.0) / 1000
+        if kind == "lognormal":
+            median, sigma = params
+            return lambda rng: median * rng.lognormvariate(0.0, sigma) / 1000
+        if kind == "exponential":
+            mean, = params
+            return lambda rng: rng.expovariate(1 / mean) / 1000 if mean > 0 else 0.0
+    except (ValueError, TypeError):
+        pass
+    raise ValueError(f"Distribuição de latência inválida: {spec}")
+
+
+class TesseractEngine:
+    """Pré-processamento e extração do Tesseract com várias estratégias (ocr_service)"""
+
+    name = "tesseract"
+
+    def version(self):
+        """
+        Returns:
+            str: Ex: "tesseract 5.3.0" ("tesseract unknown" se o binário não existir)
+        """
+        try:
+            # Importado no primeiro uso: o pytesseract carrega o numpy, que atrasa a inicialização
+            import pytesseract
+            return f"tesseract {pytesseract.get_tesseract_version()}"
+        except Exception:
+            return "tesseract unknown"
+
+    def extract(self, image, deadline: Optional[Deadline] = None,
+                usage: Optional[ResourceUsage] = None, document_type: Optional[str] = None) -> List[str]:
+        """
+        Extrai as linhas de texto de uma imagem
+
+        Args:
+            image: Imagem PIL
+            deadline: Prazo da requisição (opcional)
+            usage: ResourceUsage que conta as estratégias executadas (opcional)
+            document_type: Tipo de documento que escolhe as estratégias (opcional)
+
+        Returns:
+            List[str]: Linhas de texto organizadas (ver process_document_data)
+        """
+        from ocr_service import extract_text_from_image, preprocess_image
+        with span('preprocess'):
+            processed_image = preprocess_image(image)
+        return extract_text_from_image(processed_image, deadline, usage, document_type)
+
+    def warm_up(self, image, languages):
+        """
+        Carrega o modelo do Tesseract de cada idioma com uma passada sobre a imagem
+
+        Returns:
+            List[str]: Erros, um por idioma que falhou
+        """
+        from ocr_service import preprocess_image, run_tesseract
+        errors = []
+        preprocessed = preprocess_image(image)
+        for language in languages:
+            try:
+                run_tesseract(preprocessed, f"--oem 3 --psm 6 -l {language}", stage=f"warmup_{language}")
+            except Exception as e:
+                errors.append(f"{language}: {e}")
+        return errors
+
+
+class FakeEngine:
+    """
+    Motor de OCR hermético para testes (e testes de carga) da pilha de atendimento
+
+    Devolve as linhas pré-definidas do hash da imagem (ou uma resposta padrão
+    que inclui o hash), depois de dormir uma latência sorteada da distribuição
+    configurada. O sono é interrompido pelo prazo da requisição.
+
+    O sono ocupa um worker do escalonador, como o Tesseract ocuparia, sem
+    gastar CPU. Por isso a vazão de cada processo fica limitada a OCR_WORKERS
+    dividido pela latência média (ver throughput_ceiling), mesmo com a CPU
+    ociosa: para medir a pilha HTTP acima desse teto, aumente OCR_WORKERS ou
+    reduza a latência.
+    """
+
+    name = "fake"
+
+    def __init__(self, responses=None, latency="0", failure_rate=0.0, timeout_rate=0.0, seed=None):
+        """
+        Args:
+            responses: Hash da imagem (ver image_hash) -> linhas devolvidas
+            latency: Distribuição da latência (ver parse_latency)
+            failure_rate: Fração das requisições que levantam RuntimeError,
+                informada por process_image_ocr como um erro do Tesseract
+            timeout_rate: Fração das requisições que esperam até o prazo e
+                levantam DeadlineExceeded
+            seed: Semente das latências e das falhas injetadas
+        """
+        self.responses = dict(responses or {})
+        self.latency_spec = latency
+        self.latency = parse_latency(latency)
+        self.failure_rate = failure_rate
+        self.timeout_rate = timeout_rate
+        self._rng = random.Random(seed)
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_settings(cls):
+        """Motor falso configurado pelas variáveis de ambiente OCR_FAKE_*"""
+        responses = {}
+        if OCR_FAKE_RESPONSES:
+            try:
+                with open(OCR_FAKE_RESPONSES) as f:
+                    responses = json.load(f)
+            except (OSError, ValueError) as e:
+                logger.error(f"Não foi possível carregar as respostas do OCR falso {OCR_FAKE_RESPONSES}: {str(e)}")
+        seed = int(OCR_FAKE_SEED) if OCR_FAKE_SEED else None
+        return cls(responses, OCR_FAKE_LATENCY_MS, OCR_FAKE_FAILURE_RATE, OCR_FAKE_TIMEOUT_RATE, seed)
+
+    def version(self):
+        return f"fake latency={self.latency_spec}"
+
+    def mean_latency(self, samples=10000):
+        """Latência média da distribuição configurada, em segundos (estimada por amostragem)"""
+        rng = random.Random(0)
+        return sum(self.latency(rng) for _ in range(samples)) / samples
+
+    def throughput_ceiling(self, workers=DEFAULT_OCR_WORKERS):
+        """
+        Vazão máxima de um processo, limitada pelos workers ocupados durante o sono
+
+        Args:
+            workers: Workers do escalonador (padrão: OCR_WORKERS)
+
+        Returns:
+            float: Requisições por segundo (None se a latência média for zero)
+        """
+        mean = self.mean_latency()
+        return workers / mean if mean > 0 else None
+
+    def extract(self, image, deadline: Optional[Deadline] = None,
+                usage: Optional[ResourceUsage] = None, document_type: Optional[str] = None) -> List[str]:
+        """
+        Devolve as linhas pré-definidas da imagem (mesma interface de TesseractEngine.extract)
+
+        Raises:
+            RuntimeError: Falha injetada
+            DeadlineExceeded: Timeout injetado, ou a latência sorteada passa do prazo
+        """
+        with self._lock:
+            latency = self.latency(self._rng)
+            draw = self._rng.random()
+        if usage is not None:
+            usage.strategies += 1
+
+        with span('fake_ocr'):
+            timed_out = draw < self.timeout_rate
+            if deadline is not None and (timed_out or latency > deadline.remaining()):
+                latency, timed_out = deadline.remaining(), True
+            if latency > 0:
+                time.sleep(latency)
+            if timed_out:
+                reason = deadline.cancel_reason if deadline is not None else None
+                raise DeadlineExceeded(reason or "timeout", "fake_ocr")
+            if draw < self.timeout_rate + self.failure_rate:
+                raise RuntimeError("Falha de OCR injetada")
+
+        key = image_hash(image)
+        lines = self.responses.get(key)
+        if lines is None:
+            return ["TEXTO SIMULADO", f"Imagem: {key[:16]}", f"Tipo: {document_type or 'generic'}"]
+        return list(lines)
+
+    def warm_up(self, image, languages):
+        return []
+
+
+def create_engine(name=OCR_ENGINE):
+    """
+    Cria o motor indicado por OCR_ENGINE
+
+    Args:
+        name: tesseract ou fake (nomes desconhecidos usam o tesseract)
+
+    Returns:
+        TesseractEngine ou FakeEngine
+    """
+    if name == "fake":
+        engine = FakeEngine.from_settings()
+        ceiling = engine.throughput_ceiling()
+        logger.warning(
+            f"Usando o motor de OCR falso ({engine.version()}): as respostas são pré-definidas, não OCR real"
+            + (f"; vazão máxima de ~{ceiling:.0f} req/s por processo com {DEFAULT_OCR_WORKERS} workers"
+               if ceiling else "")
+        )
+        return engine
+    if name != "tesseract":
+        logger.error(f"Motor de OCR desconhecido {name}; usando o tesseract")
+    return TesseractEngine()
+
+
+def canned_responses(documents):
+    """
+    Respostas do motor falso para um corpus sintético
+
+    As linhas impressas de cada documento passam por process_document_data,
+    então o motor falso devolve o que o Tesseract devolveria numa leitura perfeita.
+
+    Args:
+        documents: Lista de SyntheticDocument (ver synthetic_ids.py)
+
+    Returns:
+        dict: Hash da imagem -> linhas, o formato de OCR_FAKE_RESPONSES
+    """
+    from ocr_service import process_document_data
+    return {image_hash(document.image): process_document_data(list(document.lines)) for document in documents}
+
+
+# Instância global para uso em toda a aplicação
+ocr_engine = create_engine()
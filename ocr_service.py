@@ -1,14 +1,28 @@
 import os
+import json
 import logging
 import re
-import pytesseract
+import shlex
+import subprocess
 from PIL import Image, ImageFilter, ImageEnhance
 from io import BytesIO
+from functools import lru_cache
 from typing import List, Optional
 
+from deadline import Deadline, DeadlineExceeded, cpu_time
+from tracing import span
+from accounting import ResourceUsage, measure_resources
+import ocr_engines
+
 # Configure logging
 logger = logging.getLogger(__name__)
 
+# Interval (seconds) at which a running Tesseract checks whether its request was cancelled
+TESSERACT_POLL_INTERVAL = float(os.environ.get("TESSERACT_POLL_INTERVAL", 0.1))
+
+# Strategy set per document type chosen by evaluate_strategies.py (empty = run every strategy)
+OCR_STRATEGY_CONFIG = os.environ.get("OCR_STRATEGY_CONFIG", "")
+
 def preprocess_image(image):
     """
     Preprocess the image to improve OCR accuracy using Pillow
@@ -55,13 +69,193 @@ def preprocess_image(image):
     
     return smoothed
 
-def extract_text_from_image(image):
+@lru_cache(maxsize=1)
+def get_engine_version():
+    """
+    Version of the OCR engine, recorded with captured requests
+    
+    Returns:
+        str: e.g. "tesseract 5.3.0" ("tesseract unknown" if the binary is missing)
+    """
+    return ocr_engines.ocr_engine.version()
+
+def run_tesseract(image, config, deadline: Optional[Deadline] = None, stage=None,
+                  usage: Optional[ResourceUsage] = None):
+    """
+    Run Tesseract on an image, bounded by the request deadline
+
+    With a deadline, the Tesseract subprocess is polled every
+    TESSERACT_POLL_INTERVAL seconds and killed as soon as the deadline
+    passes or the request is cancelled (e.g. the client disconnected), so
+    abandoned requests stop burning CPU; DeadlineExceeded is then raised.
+
+    Args:
+        image: PIL Image
+        config: Tesseract command line configuration
+        deadline: Optional request deadline
+        stage: Name of the strategy being run (for logs and metrics)
+        usage: Optional ResourceUsage counting the strategies run (compute units)
+
+    Returns:
+        str: Raw text returned by Tesseract
+    """
+    # Imported on first use: pytesseract pulls in numpy, which slows down startup
+    import pytesseract
+    if usage is not None:
+        usage.strategies += 1
+    if deadline is None:
+        with span(stage or 'tesseract'):
+            return pytesseract.image_to_string(image, config=config)
+    
+    deadline.check(stage)
+    with span(stage or 'tesseract'):
+        return _run_tesseract_process(image, config, deadline, stage)
+
+def _run_tesseract_process(image, config, deadline: Deadline, stage=None):
+    """
+    image_to_string with a handle on the subprocess, killed when the deadline expires
+    
+    pytesseract only accepts a timeout fixed at launch, which a later
+    cancellation cannot shorten; its helpers are reused for the temporary
+    files and errors.
+    """
+    from pytesseract import pytesseract as tesseract
+    with tesseract.save(image) as (output_base, input_filename):
+        args = [tesseract.tesseract_cmd, input_filename, output_base] + shlex.split(config) + ['txt']
+        try:
+            process = subprocess.Popen(args, stdin=subprocess.DEVNULL, stdout=subprocess.DEVNULL,
+                                       stderr=subprocess.PIPE)
+        except FileNotFoundError:
+            raise tesseract.TesseractNotFoundError()
+        
+        with process:
+            while True:
+                try:
+                    _, errors = process.communicate(timeout=TESSERACT_POLL_INTERVAL)
+                    break
+                except subprocess.TimeoutExpired:
+                    if deadline.expired():
+                        process.kill()
+                        process.communicate()
+                        logger.info(f"Killed Tesseract at stage {stage} ({deadline.cancel_reason or 'timeout'})")
+                        raise DeadlineExceeded(deadline.cancel_reason or "timeout", stage)
+        
+        if process.returncode:
+            raise tesseract.TesseractError(process.returncode, tesseract.get_errors(errors))
+        with open(f"{output_base}.txt", "rb") as f:
+            return f.read().decode("utf-8")
+
+# Tesseract strategies run by extract_text_from_image, in order:
+# (name, Tesseract config, enhance contrast before running)
+STRATEGIES = [
+    ('full_page', r'--oem 3 --psm 1 -l por', False),     # Analyze the page as a whole (document type, layout)
+    ('line_by_line', r'--oem 3 --psm 6 -l por', False),  # Assume a single uniform block of text (text lines)
+    ('word', r'--oem 3 --psm 8 -l por', False),          # Treat the image as a single word (isolated words, numbers)
+    ('enhanced', r'--oem 3 --psm 6 -l por', True),       # Enhance contrast, then analyze as a block
+]
+
+def load_strategy_config(path):
+    """
+    Load the strategy set per document type written by evaluate_strategies.py
+    
+    Args:
+        path: JSON file with a "strategies" mapping of document type (or
+            "default") to strategy names
+    
+    Returns:
+        dict: Document type -> list of STRATEGIES entries ({} runs every strategy)
+    """
+    if not path:
+        return {}
+    try:
+        with open(path) as f:
+            selected = json.load(f)["strategies"]
+    except (OSError, ValueError, KeyError) as e:
+        logger.error(f"Could not load OCR strategy config {path}: {str(e)}; running every strategy")
+        return {}
+    
+    by_name = {strategy[0]: strategy for strategy in STRATEGIES}
+    config = {}
+    for document_type, names in selected.items():
+        unknown = [name for name in names if name not in by_name]
+        if unknown:
+            logger.warning(f"Ignoring unknown OCR strategies for {document_type}: {unknown}")
+        # Keep the STRATEGIES order, which is also the order the lines are merged in
+        strategies = [strategy for strategy in STRATEGIES if strategy[0] in names]
+        if strategies:
+            config[document_type] = strategies
+    summary = {document_type: [strategy[0] for strategy in strategies] for document_type, strategies in config.items()}
+    logger.info(f"Loaded OCR strategy config {path}: {summary}")
+    return config
+
+strategy_config = load_strategy_config(OCR_STRATEGY_CONFIG)
+
+def strategies_for(document_type=None, config=None):
+    """
+    Strategies to run for a document type
+    
+    Args:
+        document_type: e.g. rg, cpf, cnh (None or unknown types use the "default" entry)
+        config: Strategy config (defaults to the one loaded from OCR_STRATEGY_CONFIG)
+    
+    Returns:
+        list: STRATEGIES entries to run, in order
+    """
+    config = strategy_config if config is None else config
+    return config.get(document_type) or config.get("default") or STRATEGIES
+
+def merge_lines(line_lists):
+    """
+    Merge the lines of several strategies, dropping duplicates but keeping order
+    
+    Args:
+        line_lists: Lines returned by each strategy, in the order they ran
+    
+    Returns:
+        List[str]: Unique non-empty lines
+    """
+    unique_lines = []
+    seen = set()
+    for lines in line_lists:
+        for line in lines:
+            if line and line not in seen:
+                seen.add(line)
+                unique_lines.append(line)
+    return unique_lines
+
+def run_strategy(image, name, config, enhance=False, deadline: Optional[Deadline] = None,
+                 usage: Optional[ResourceUsage] = None) -> List[str]:
+    """
+    Run a single OCR strategy
+    
+    Args:
+        image: Preprocessed PIL Image
+        name: Strategy name (trace stage)
+        config: Tesseract command line configuration
+        enhance: Enhance the contrast before running Tesseract
+        deadline: Optional request deadline
+        usage: Optional ResourceUsage counting the strategies run
+    
+    Returns:
+        List[str]: Non-empty stripped text lines
+    """
+    if enhance:
+        with span('enhance_contrast'):
+            image = ImageEnhance.Contrast(image).enhance(2.0)
+    text = run_tesseract(image, config, deadline, name, usage)
+    return [line.strip() for line in text.split('\n') if line.strip()]
+
+def extract_text_from_image(image, deadline: Optional[Deadline] = None,
+                            usage: Optional[ResourceUsage] = None, document_type: Optional[str] = None):
     """
     Extract text from image using Tesseract OCR with multiple strategies
     to optimize accurate data extraction
     
     Args:
         image: PIL Image
+        deadline: Optional request deadline; remaining strategies are skipped once it passes
+        usage: Optional ResourceUsage counting the strategies run
+        document_type: Optional document type selecting the strategy set (see strategies_for)
     
     Returns:
         List[str]: List of organized extracted text lines
@@ -72,40 +266,12 @@ def extract_text_from_image(image):
         # Try different Tesseract configurations to get best results
         logger.info("Performing multi-strategy OCR extraction")
         
-        # Strategy 1: Full page analysis (best for document type, layout)
-        psm1_config = r'--oem 3 --psm 1 -l por'  # Analyze the page as a whole
-        full_text = pytesseract.image_to_string(image, config=psm1_config)
-        text_results['full_page'] = [line.strip() for line in full_text.split('\n') if line.strip()]
-        logger.debug(f"Full page OCR results: {text_results['full_page']}")
-        
-        # Strategy 2: Line by line analysis (best for text lines)
-        psm6_config = r'--oem 3 --psm 6 -l por'  # Assume a single uniform block of text
-        line_text = pytesseract.image_to_string(image, config=psm6_config)
-        text_results['line_by_line'] = [line.strip() for line in line_text.split('\n') if line.strip()]
-        logger.debug(f"Line by line OCR results: {text_results['line_by_line']}")
-        
-        # Strategy 3: Single word analysis (best for isolated words, numbers)
-        psm8_config = r'--oem 3 --psm 8 -l por'  # Treat the image as a single word
-        word_text = pytesseract.image_to_string(image, config=psm8_config)
-        text_results['word'] = [line.strip() for line in word_text.split('\n') if line.strip()]
-        logger.debug(f"Word OCR results: {text_results['word']}")
-        
-        # Strategy 4: Enhance contrast then analyze
-        enhanced_image = ImageEnhance.Contrast(image).enhance(2.0)
-        enhanced_text = pytesseract.image_to_string(enhanced_image, config=psm6_config)
-        text_results['enhanced'] = [line.strip() for line in enhanced_text.split('\n') if line.strip()]
-        logger.debug(f"Enhanced OCR results: {text_results['enhanced']}")
+        for name, config, enhance in strategies_for(document_type):
+            text_results[name] = run_strategy(image, name, config, enhance, deadline, usage)
+            logger.debug(f"{name} OCR results: {text_results[name]}")
         
-        # Combine and preprocess all results
-        all_lines = []
-        for strategy_name, lines in text_results.items():
-            all_lines.extend(lines)
-        
-        # Remove duplicates while preserving order
-        unique_lines = []
-        for line in all_lines:
-            if line and line not in unique_lines:
-                unique_lines.append(line)
+        # Combine all results, removing duplicates while preserving order
+        unique_lines = merge_lines(text_results.values())
         
         if not unique_lines:
             logger.warning("No text detected in the image after multi-strategy OCR")
@@ -113,8 +279,11 @@ def extract_text_from_image(image):
         
         # Process the enriched data set
         logger.info(f"Combined OCR extracted {len(unique_lines)} unique text lines")
-        return process_document_data(unique_lines)
+        with span('process_document_data'):
+            return process_document_data(unique_lines)
         
+    except DeadlineExceeded:
+        raise
     except Exception as e:
         logger.error(f"Error extracting text with Tesseract: {str(e)}")
         return [f"Erro ao processar a imagem: {str(e)}"]
@@ -366,28 +535,44 @@ def process_document_data(text_lines):
     
     return formatted_results
 
-def process_image_ocr(image) -> List[str]:
+def process_image_ocr(image, deadline: Optional[Deadline] = None,
+                      usage: Optional[ResourceUsage] = None, document_type: Optional[str] = None) -> List[str]:
     """
     Process an image to extract text
     
     Args:
-        image: PIL Image object or numpy array
+        image: PIL Image object
+        deadline: Optional request deadline
+        usage: Optional ResourceUsage filled with the CPU, Tesseract CPU,
+            pixel count, strategies run and memory spent on this image
+        document_type: Optional document type selecting the strategy set (see strategies_for)
     
     Returns:
         List[str]: List of extracted text lines
+    
+    Raises:
+        DeadlineExceeded: If the deadline passes or the request is cancelled
     """
     logger.debug("Processing image with OCR")
+    cpu_start = cpu_time()
     
     try:
-        # Preprocess the image
-        processed_image = preprocess_image(image)
+        # Skip the whole pipeline if the request expired while queued
+        if deadline is not None:
+            deadline.check('preprocess')
         
-        # Extract text from the processed image
-        text_lines = extract_text_from_image(processed_image)
+        with measure_resources(usage, image):
+            # Preprocess the image and extract its text (or the fake engine's canned text, see OCR_ENGINE)
+            text_lines = ocr_engines.ocr_engine.extract(image, deadline, usage, document_type)
         
         logger.info(f"OCR processing complete, extracted {len(text_lines)} text lines")
         return text_lines
         
+    except DeadlineExceeded as e:
+        # CPU time spent on a request whose result will be thrown away
+        e.cpu_ms = (cpu_time() - cpu_start) * 1000
+        logger.warning(f"OCR abandoned ({e.reason}) at stage {e.stage} after {e.cpu_ms:.1f} ms of CPU")
+        raise
     except Exception as e:
         logger.error(f"Error during OCR processing: {str(e)}")
         return [f"Erro ao processar imagem: {str(e)}. Tente novamente com uma imagem mais clara."]
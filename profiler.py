@@ -0,0 +1,308 @@
+import os
+import re
+import sys
+import json
+import time
+import tempfile
+import logging
+import threading
+from collections import Counter
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Duração máxima de uma sessão de profiling (segundos)
+PROFILER_MAX_SECONDS = float(os.environ.get("PROFILER_MAX_SECONDS", 30))
+# Intervalo mínimo entre amostras (segundos)
+PROFILER_MIN_INTERVAL = 0.001
+# Diretório onde as sessões em segundo plano gravam o resultado (compartilhado pelos workers)
+PROFILER_DIR = os.environ.get("PROFILER_DIR", os.path.join(tempfile.gettempdir(), "ocr-profiles"))
+# Número de resultados mantidos em PROFILER_DIR (os mais antigos são apagados)
+PROFILER_KEEP = int(os.environ.get("PROFILER_KEEP", 20))
+
+# Formatos gravados: extensão de cada um
+PROFILE_FORMATS = {"collapsed": ".collapsed.txt", "speedscope": ".speedscope.json"}
+_PROFILE_ID_PATTERN = re.compile(r"^profile-\d+-\d+$")
+
+
+class ProfilerBusy(Exception):
+    """Já existe uma sessão de profiling em andamento neste processo"""
+
+
+class SamplingProfiler:
+    """
+    Profiler estatístico por amostragem de pilhas (tempo de parede)
+
+    Uma thread coleta sys._current_frames() a cada intervalo e conta as
+    pilhas de todas as threads do processo. A thread só existe durante a
+    sessão, então não há custo algum quando o profiler está inativo.
+    """
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self._session = None
+
+    def profile(self, duration, interval=0.005):
+        """
+        Amostra as pilhas do processo durante o tempo informado (bloqueante)
+
+        Args:
+            duration: Duração da sessão em segundos (limitada a PROFILER_MAX_SECONDS)
+            interval: Intervalo entre amostras em segundos
+
+        Returns:
+            Profile: Pilhas amostradas
+
+        Raises:
+            ProfilerBusy: Se outra sessão estiver em andamento
+        """
+        duration = min(max(duration, 0.0), PROFILER_MAX_SECONDS)
+        # A thread que aguarda a sessão não aparece nas amostras
+        self.start(interval, duration, exclude=(threading.get_ident(),))
+        self._session[2].join()
+        return self.stop()
+
+    def start_background(self, duration, interval=0.005, directory=None):
+        """
+        Inicia uma sessão que grava o resultado em arquivos ao terminar
+
+        Não bloqueia quem chamou: um worker síncrono continua atendendo
+        requisições (e elas aparecem nas amostras) durante o profiling. O
+        resultado pode ser lido por qualquer worker com load_profile().
+
+        Args:
+            duration: Duração da sessão em segundos (limitada a PROFILER_MAX_SECONDS)
+            interval: Intervalo entre amostras em segundos
+            directory: Diretório dos resultados (padrão: PROFILER_DIR)
+
+        Returns:
+            str: Identificador do resultado (profile-<pid>-<ms>)
+
+        Raises:
+            ProfilerBusy: Se outra sessão estiver em andamento
+        """
+        duration = min(max(duration, 0.0), PROFILER_MAX_SECONDS)
+        directory = directory or PROFILER_DIR
+        profile_id = f"profile-{os.getpid()}-{int(time.time() * 1000)}"
+        self.start(interval, duration, on_finish=lambda profile: self._finish(profile, directory, profile_id))
+        return profile_id
+
+    def _finish(self, profile, directory, profile_id):
+        """Grava o resultado de uma sessão em segundo plano e libera o profiler"""
+        try:
+            save_profile(profile, profile_id, directory)
+        except OSError as e:
+            logger.error(f"Erro ao gravar o profile {profile_id} em {directory}: {e}")
+        finally:
+            self._session = None
+            self.lock.release()
+
+    def start(self, interval=0.005, duration=PROFILER_MAX_SECONDS, exclude=(), on_finish=None):
+        """
+        Inicia uma sessão em segundo plano (encerrada com stop(), ou por
+        on_finish quando informado)
+
+        Args:
+            interval: Intervalo entre amostras em segundos
+            duration: Duração máxima da sessão em segundos
+            exclude: Identificadores de threads que não devem ser amostradas
+            on_finish: Chamado na thread do profiler com o Profile ao fim da sessão
+
+        Raises:
+            ProfilerBusy: Se outra sessão estiver em andamento
+        """
+        if not self.lock.acquire(blocking=False):
+            raise ProfilerBusy("Profiling session already running")
+        interval = max(interval, PROFILER_MIN_INTERVAL)
+        profile = Profile(interval)
+        stop_event = threading.Event()
+        sampler = threading.Thread(
+            target=self._sample,
+            args=(profile, duration, interval, stop_event, set(exclude), on_finish),
+            name="sampling-profiler",
+            daemon=True
+        )
+        logger.info(f"Iniciando profiling por até {duration:.1f}s (intervalo {interval * 1000:.1f}ms)")
+        self._session = (profile, stop_event, sampler)
+        sampler.start()
+
+    def stop(self):
+        """
+        Encerra a sessão iniciada com start()
+
+        Returns:
+            Profile: Pilhas amostradas
+        """
+        profile, stop_event, sampler = self._session
+        stop_event.set()
+        sampler.join()
+        self._session = None
+        self.lock.release()
+        return profile
+
+    def _sample(self, profile, duration, interval, stop_event, exclude, on_finish=None):
+        """Laço de amostragem executado na thread do profiler"""
+        exclude.add(threading.get_ident())
+        start = time.perf_counter()
+        deadline = start + duration
+        next_sample = start
+
+        while not stop_event.is_set():
+            now = time.perf_counter()
+            if now >= deadline:
+                break
+            if now < next_sample:
+                stop_event.wait(next_sample - now)
+                continue
+            next_sample += interval
+
+            names = {thread.ident: thread.name for thread in threading.enumerate()}
+            for thread_id, frame in sys._current_frames().items():
+                if thread_id in exclude:
+                    continue
+                profile.add(names.get(thread_id, str(thread_id)), _stack(frame))
+            profile.samples_taken += 1
+
+        profile.duration = time.perf_counter() - start
+        if on_finish is not None:
+            on_finish(profile)
+
+
+def _stack(frame):
+    """Pilha de chamadas da raiz até o frame informado"""
+    stack = []
+    while frame is not None:
+        code = frame.f_code
+        stack.append(f"{code.co_name} ({os.path.basename(code.co_filename)}:{code.co_firstlineno})")
+        frame = frame.f_back
+    stack.reverse()
+    return tuple(stack)
+
+
+class Profile:
+    """Resultado de uma sessão de profiling"""
+
+    def __init__(self, interval):
+        self.interval = interval
+        self.duration = 0.0
+        self.samples_taken = 0
+        self.stacks = Counter()
+
+    def add(self, thread_name, stack):
+        self.stacks[(thread_name,) + stack] += 1
+
+    def to_collapsed(self):
+        """
+        Formato "collapsed stacks" (flamegraph.pl, speedscope, inferno)
+
+        Returns:
+            str: Uma linha por pilha: "thread;frame;frame contagem"
+        """
+        lines = []
+        for stack, count in self.stacks.most_common():
+            lines.append(";".join(frame.replace(";", ":") for frame in stack) + f" {count}")
+        return "\n".join(lines) + "\n"
+
+    def to_speedscope(self, name="ocr-worker"):
+        """
+        Formato de arquivo do speedscope (um perfil amostrado por thread)
+
+        Args:
+            name: Nome exibido do perfil
+
+        Returns:
+            dict: Documento JSON no esquema https://www.speedscope.app/file-format-schema.json
+        """
+        frames = []
+        frame_index = {}
+        by_thread = {}
+        for stack, count in self.stacks.items():
+            thread_name, calls = stack[0], stack[1:]
+            indexes = []
+            for frame in calls:
+                if frame not in frame_index:
+                    frame_index[frame] = len(frames)
+                    frames.append({"name": frame})
+                indexes.append(frame_index[frame])
+            samples, weights = by_thread.setdefault(thread_name, ([], []))
+            samples.append(indexes)
+            weights.append(count * self.interval)
+
+        profiles = []
+        for thread_name, (samples, weights) in sorted(by_thread.items()):
+            profiles.append({
+                "type": "sampled",
+                "name": thread_name,
+                "unit": "seconds",
+                "startValue": 0,
+                "endValue": round(sum(weights), 6),
+                "samples": samples,
+                "weights": weights
+            })
+
+        return {
+            "$schema": "https://www.speedscope.app/file-format-schema.json",
+            "name": name,
+            "exporter": "ocr-sampling-profiler",
+            "shared": {"frames": frames},
+            "profiles": profiles
+        }
+
+
+def save_profile(profile, profile_id, directory=None):
+    """
+    Grava o resultado nos formatos de PROFILE_FORMATS e apaga os mais antigos
+
+    Args:
+        profile: Profile da sessão
+        profile_id: Identificador do resultado
+        directory: Diretório dos resultados (padrão: PROFILER_DIR)
+    """
+    directory = directory or PROFILER_DIR
+    os.makedirs(directory, exist_ok=True)
+    contents = {
+        "collapsed": profile.to_collapsed(),
+        "speedscope": json.dumps(profile.to_speedscope(name=f"worker {profile_id.split('-')[1]}"))
+    }
+    for output_format, extension in PROFILE_FORMATS.items():
+        path = os.path.join(directory, profile_id + extension)
+        # Escrita atômica: outro worker nunca lê um arquivo pela metade
+        with open(path + ".tmp", "w") as f:
+            f.write(contents[output_format])
+        os.replace(path + ".tmp", path)
+    logger.info(f"Profile {profile_id} gravado em {directory} ({profile.samples_taken} amostras)")
+
+    results = sorted((os.path.getmtime(os.path.join(directory, name)), name)
+                     for name in os.listdir(directory) if name.endswith(PROFILE_FORMATS["collapsed"]))
+    for _, name in results[:-PROFILER_KEEP] if PROFILER_KEEP > 0 else []:
+        for extension in PROFILE_FORMATS.values():
+            try:
+                os.remove(os.path.join(directory, name[:-len(PROFILE_FORMATS["collapsed"])] + extension))
+            except FileNotFoundError:
+                pass
+
+
+def load_profile(profile_id, output_format="collapsed", directory=None):
+    """
+    Lê o resultado de uma sessão em segundo plano
+
+    Args:
+        profile_id: Identificador devolvido por start_background
+        output_format: collapsed ou speedscope
+        directory: Diretório dos resultados (padrão: PROFILER_DIR)
+
+    Returns:
+        str: Conteúdo do arquivo, ou None se não existir (sessão em
+            andamento, apagada ou identificador inválido)
+    """
+    if not _PROFILE_ID_PATTERN.match(profile_id or "") or output_format not in PROFILE_FORMATS:
+        return None
+    try:
+        with open(os.path.join(directory or PROFILER_DIR, profile_id + PROFILE_FORMATS[output_format])) as f:
+            return f.read()
+    except FileNotFoundError:
+        return None
+
+
+# Instância global (uma sessão por processo)
+sampling_profiler = SamplingProfiler()
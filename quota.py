@@ -0,0 +1,126 @@
+import os
+import logging
+
+from accounting import compute_units
+from rate_limiter import rate_limiter
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Unidades de computação (megapixels × estratégias) equivalentes a uma requisição
+# típica: a cota de uma chave é rate_limit × COMPUTE_UNITS_PER_REQUEST por minuto
+COMPUTE_UNITS_PER_REQUEST = float(os.environ.get("COMPUTE_UNITS_PER_REQUEST", 8))
+# Estratégias de OCR assumidas na reserva feita antes do processamento
+COMPUTE_ESTIMATED_STRATEGIES = int(os.environ.get("COMPUTE_ESTIMATED_STRATEGIES", 4))
+# Janela da cota em segundos
+COMPUTE_QUOTA_WINDOW = float(os.environ.get("COMPUTE_QUOTA_WINDOW", 60))
+
+
+class ComputeQuotaExceeded(Exception):
+    """O cliente esgotou a cota de unidades de computação"""
+
+    def __init__(self, result):
+        super().__init__("Compute quota exceeded")
+        self.result = result
+
+
+class Reservation:
+    """Unidades reservadas para um OCR, acertadas com o custo real em settle()"""
+
+    __slots__ = ("key", "limit", "units", "result")
+
+    def __init__(self, key, limit, units, result):
+        self.key = key
+        self.limit = limit
+        self.units = units
+        self.result = result
+
+
+class ComputeQuota:
+    """
+    Cota por cliente em unidades de computação em vez de número de requisições
+
+    Antes do OCR é reservada uma estimativa (pixels da imagem decodificada ×
+    estratégias previstas); depois, a diferença para o custo medido é
+    debitada ou devolvida. Usa o mesmo GCRA (e o mesmo armazenamento) do
+    rate limit por requisições.
+    """
+
+    def __init__(self, limiter=None, units_per_request=COMPUTE_UNITS_PER_REQUEST,
+                 window=COMPUTE_QUOTA_WINDOW, estimated_strategies=COMPUTE_ESTIMATED_STRATEGIES):
+        """
+        Args:
+            limiter: RateLimiter usado para guardar o consumo (padrão: o global)
+            units_per_request: Unidades de uma requisição típica
+            window: Janela da cota em segundos
+            estimated_strategies: Estratégias assumidas na reserva
+        """
+        self.limiter = limiter if limiter is not None else rate_limiter
+        self.units_per_request = units_per_request
+        self.window = window
+        self.estimated_strategies = estimated_strategies
+
+    def limit_for(self, rate_limit):
+        """Cota em unidades por janela para uma chave com o rate_limit informado"""
+        return max(int(rate_limit * self.units_per_request), 1)
+
+    def estimate(self, image, strategies=None):
+        """
+        Unidades previstas para o OCR da imagem decodificada
+
+        Args:
+            image: Imagem decodificada
+            strategies: Estratégias que serão executadas (padrão: estimated_strategies)
+        """
+        width, height = image.size
+        return compute_units(width * height, strategies or self.estimated_strategies)
+
+    def job_cost(self, units):
+        """Custo do trabalho no escalonador (1.0 = uma requisição típica)"""
+        return units / self.units_per_request
+
+    def reserve(self, client, rate_limit, units):
+        """
+        Reserva unidades da cota antes do processamento
+
+        Uma imagem maior que a cota inteira reserva apenas a cota (senão nunca
+        seria aceita); o restante é debitado no acerto.
+
+        Args:
+            client: Identificador do cliente (ex: user_id da API key)
+            rate_limit: rate_limit da chave (requisições por minuto)
+            units: Unidades estimadas
+
+        Returns:
+            Reservation: Reserva a ser acertada com settle()
+
+        Raises:
+            ComputeQuotaExceeded: Se a cota do cliente estiver esgotada
+        """
+        key = f"units:{client}"
+        limit = self.limit_for(rate_limit)
+        units = min(units, limit)
+        result = self.limiter.check(key, limit, self.window, cost=units)
+        if not result.allowed:
+            raise ComputeQuotaExceeded(result)
+        return Reservation(key, limit, units, result)
+
+    def settle(self, reservation, usage):
+        """
+        Acerta a reserva com o custo medido
+
+        Args:
+            reservation: Reserva feita em reserve()
+            usage: ResourceUsage do OCR (None = mantém a estimativa)
+
+        Returns:
+            float: Unidades debitadas ao todo
+        """
+        if usage is None:
+            return reservation.units
+        self.limiter.adjust(reservation.key, reservation.limit, self.window, usage.compute_units - reservation.units)
+        return usage.compute_units
+
+
+# Instância global para uso em toda a aplicação
+compute_quota = ComputeQuota()
@@ -0,0 +1,249 @@
+import os
+import math
+import time
+import sqlite3
+import logging
+import threading
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Banco SQLite compartilhado pelos workers; vazio = limite por processo (em memória)
+RATE_LIMIT_DB_PATH = os.environ.get("RATE_LIMIT_DB_PATH", "")
+# Intervalo entre remoções das chaves ociosas (segundos)
+RATE_LIMIT_SWEEP_INTERVAL = float(os.environ.get("RATE_LIMIT_SWEEP_INTERVAL", 60))
+
+
+class RateLimitResult:
+    """
+    Resultado de uma verificação de rate limit
+
+    Attributes:
+        allowed: True se a requisição pode prosseguir
+        limit: Requisições permitidas por janela
+        remaining: Requisições ainda disponíveis imediatamente
+        reset_at: Instante (unix) em que o limite estará totalmente recomposto
+        retry_after: Segundos até a próxima requisição ser aceita (0 se permitida)
+    """
+
+    __slots__ = ("allowed", "limit", "remaining", "reset_at", "retry_after")
+
+    def __init__(self, allowed, limit, remaining, reset_at, retry_after):
+        self.allowed = allowed
+        self.limit = limit
+        self.remaining = remaining
+        self.reset_at = reset_at
+        self.retry_after = retry_after
+
+    def headers(self, prefix="X-RateLimit"):
+        """
+        Headers X-RateLimit-* (e Retry-After quando a requisição é recusada)
+
+        Args:
+            prefix: Prefixo dos headers (ex: X-ComputeQuota para a cota em unidades)
+        """
+        headers = {
+            f"{prefix}-Limit": str(self.limit),
+            f"{prefix}-Remaining": str(self.remaining),
+            f"{prefix}-Reset": str(math.ceil(self.reset_at))
+        }
+        if not self.allowed:
+            headers["Retry-After"] = str(max(1, math.ceil(self.retry_after)))
+        return headers
+
+
+def gcra(tat, now, limit, window, cost=1):
+    """
+    Generic Cell Rate Algorithm: decide uma requisição a partir do TAT da chave
+
+    O estado de cada chave é um único número, o TAT (theoretical arrival
+    time): o instante em que a chave teria consumido todas as requisições
+    já aceitas ao ritmo de limit/window. Até `limit` requisições podem
+    chegar de uma vez (rajada); depois, uma a cada window/limit segundos.
+    Uma requisição de custo N consome N unidades do limite de uma vez.
+
+    Args:
+        tat: TAT armazenado (None para uma chave nova ou ociosa)
+        now: Instante atual (unix)
+        limit: Requisições permitidas por janela
+        window: Janela em segundos
+        cost: Unidades consumidas pela requisição
+
+    Returns:
+        tuple: (novo TAT a armazenar ou None se recusada, RateLimitResult)
+    """
+    interval = window / limit
+    tat = max(tat or now, now)
+    new_tat = tat + interval * cost
+    allow_at = new_tat - window
+
+    if now < allow_at:
+        remaining = 0
+        return None, RateLimitResult(False, limit, remaining, tat, allow_at - now)
+
+    remaining = int((window - (new_tat - now)) / interval + 1e-9)
+    return new_tat, RateLimitResult(True, limit, remaining, new_tat, 0.0)
+
+
+def gcra_adjust(tat, now, limit, window, delta):
+    """
+    Debita (ou devolve, se negativo) unidades sem recusar a requisição
+
+    Usado para acertar o custo real depois que o trabalho já foi feito.
+
+    Returns:
+        float: Novo TAT (no passado equivale a uma chave sem consumo)
+    """
+    return max(tat or now, now) + (window / limit) * delta
+
+
+class MemoryRateLimitStore:
+    """TATs em memória (limite por processo)"""
+
+    def __init__(self, sweep_interval=RATE_LIMIT_SWEEP_INTERVAL):
+        self.tats = {}
+        self.lock = threading.Lock()
+        self.sweep_interval = sweep_interval
+        self.next_sweep = 0.0
+
+    def check(self, key, limit, window, now, cost=1):
+        with self.lock:
+            new_tat, result = gcra(self.tats.get(key), now, limit, window, cost)
+            if new_tat is not None:
+                self.tats[key] = new_tat
+            if now >= self.next_sweep:
+                self._sweep(now)
+        return result
+
+    def adjust(self, key, limit, window, now, delta):
+        with self.lock:
+            self.tats[key] = gcra_adjust(self.tats.get(key), now, limit, window, delta)
+
+    def _sweep(self, now):
+        """Remove chaves ociosas: TAT no passado equivale a uma chave nova"""
+        self.tats = {key: tat for key, tat in self.tats.items() if tat > now}
+        self.next_sweep = now + self.sweep_interval
+
+    def __len__(self):
+        return len(self.tats)
+
+
+class SQLiteRateLimitStore:
+    """
+    TATs em um banco SQLite compartilhado por todos os workers do nó
+
+    Cada verificação é uma transação curta (BEGIN IMMEDIATE) que lê e
+    atualiza uma única linha, então o limite vale para o nó inteiro.
+    """
+
+    def __init__(self, path, sweep_interval=RATE_LIMIT_SWEEP_INTERVAL):
+        self.path = path
+        self.sweep_interval = sweep_interval
+        self.next_sweep = 0.0
+        self.local = threading.local()
+        conn = self._connection()
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("CREATE TABLE IF NOT EXISTS rate_limits (key TEXT PRIMARY KEY, tat REAL NOT NULL)")
+
+    def _connection(self):
+        """Conexão da thread atual (reaberta após o fork do worker)"""
+        conn = getattr(self.local, "conn", None)
+        if conn is None or self.local.pid != os.getpid():
+            conn = sqlite3.connect(self.path, timeout=5, isolation_level=None)
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self.local.conn = conn
+            self.local.pid = os.getpid()
+        return conn
+
+    def check(self, key, limit, window, now, cost=1):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            new_tat, result = gcra(row[0] if row else None, now, limit, window, cost)
+            if new_tat is not None:
+                conn.execute(
+                    "INSERT INTO rate_limits (key, tat) VALUES (?, ?) "
+                    "ON CONFLICT (key) DO UPDATE SET tat = excluded.tat",
+                    (key, new_tat)
+                )
+            if now >= self.next_sweep:
+                # Chaves ociosas (TAT no passado) equivalem a chaves novas
+                conn.execute("DELETE FROM rate_limits WHERE tat <= ?", (now,))
+                self.next_sweep = now + self.sweep_interval
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return result
+
+    def adjust(self, key, limit, window, now, delta):
+        conn = self._connection()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tat FROM rate_limits WHERE key = ?", (key,)).fetchone()
+            conn.execute(
+                "INSERT INTO rate_limits (key, tat) VALUES (?, ?) "
+                "ON CONFLICT (key) DO UPDATE SET tat = excluded.tat",
+                (key, gcra_adjust(row[0] if row else None, now, limit, window, delta))
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+
+    def __len__(self):
+        return self._connection().execute("SELECT COUNT(*) FROM rate_limits").fetchone()[0]
+
+
+class RateLimiter:
+    """Rate limiter GCRA com estado O(1) por chave"""
+
+    def __init__(self, store=None):
+        """
+        Args:
+            store: MemoryRateLimitStore (padrão) ou SQLiteRateLimitStore
+        """
+        self.store = store if store is not None else MemoryRateLimitStore()
+
+    @classmethod
+    def from_env(cls):
+        """Usa o banco RATE_LIMIT_DB_PATH se definido (limite compartilhado entre workers)"""
+        if RATE_LIMIT_DB_PATH:
+            try:
+                return cls(SQLiteRateLimitStore(RATE_LIMIT_DB_PATH))
+            except sqlite3.Error as e:
+                logger.error(f"Não foi possível abrir {RATE_LIMIT_DB_PATH}; usando limite por processo: {str(e)}")
+        return cls()
+
+    def check(self, key, limit, window=60, cost=1):
+        """
+        Verifica e consome uma requisição do limite da chave
+
+        Args:
+            key: Identificador limitado (ex: hash da API key)
+            limit: Requisições (ou unidades) permitidas por janela
+            window: Janela em segundos
+            cost: Unidades consumidas pela requisição
+
+        Returns:
+            RateLimitResult: Decisão e valores para os headers
+        """
+        return self.store.check(key, max(int(limit), 1), window, time.time(), cost)
+
+    def adjust(self, key, limit, window=60, delta=0):
+        """
+        Acerta o consumo da chave sem recusar (delta > 0 debita, delta < 0 devolve)
+
+        Args:
+            key: Identificador limitado
+            limit: Unidades permitidas por janela (o mesmo usado em check)
+            window: Janela em segundos
+            delta: Unidades a debitar
+        """
+        if delta:
+            self.store.adjust(key, max(int(limit), 1), window, time.time(), delta)
+
+
+# Instância global para uso em toda a aplicação
+rate_limiter = RateLimiter.from_env()
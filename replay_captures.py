@@ -0,0 +1,179 @@
+"""
+Reexecuta requisições lentas capturadas pelo flight recorder
+
+Cada captura é processada novamente por process_image_ocr sob o profiler
+por amostragem, e os tempos por etapa são comparados com os gravados em
+produção.
+
+Uso:
+    python replay_captures.py /var/lib/ocr/captures --key "$FLIGHT_RECORDER_KEY" --profile-dir profiles/
+    python replay_captures.py captura.json --image-dir imagens/ --repeat 3
+"""
+import os
+import sys
+import json
+import time
+import base64
+import hashlib
+import argparse
+from io import BytesIO
+
+from PIL import Image
+
+from flight_recorder import load_capture, decrypt_image, FLIGHT_RECORDER_KEY
+from ocr_service import process_image_ocr, get_engine_version
+from camera_service import process_camera_image
+from security import compress_image
+from profiler import SamplingProfiler
+from tracing import start_trace, end_trace, span
+
+
+def find_captures(paths):
+    """Arquivos de captura informados diretamente ou dentro de diretórios"""
+    for path in paths:
+        if os.path.isdir(path):
+            for name in sorted(os.listdir(path)):
+                if name.endswith(".json"):
+                    yield os.path.join(path, name)
+        else:
+            yield path
+
+
+def index_images(directory):
+    """{sha256: caminho} dos arquivos de um diretório (para capturas só com hash)"""
+    index = {}
+    if not directory:
+        return index
+    for name in os.listdir(directory):
+        path = os.path.join(directory, name)
+        if os.path.isfile(path):
+            with open(path, "rb") as f:
+                index[hashlib.sha256(f.read()).hexdigest()] = path
+    return index
+
+
+def load_input(capture, key, images):
+    """Bytes da imagem da captura (cópia criptografada ou arquivo com o mesmo hash)"""
+    data = decrypt_image(capture, key) if key else None
+    if data is None:
+        path = images.get(capture["image"]["sha256"])
+        if path is None:
+            return None
+        with open(path, "rb") as f:
+            data = f.read()
+    return data
+
+
+def prepare_image(data, settings):
+    """Reproduz a decodificação feita pelo endpoint que recebeu a requisição"""
+    if settings.get("source") == "camera":
+        return process_camera_image(base64.b64encode(data).decode("ascii"))
+    image = Image.open(BytesIO(data))
+    if image.mode != "RGB":
+        image = image.convert("RGB")
+    if settings.get("compress"):
+        image = compress_image(image, max_size=1800, quality=85)
+    return image
+
+
+def replay(capture, data, repeat, profiler):
+    """
+    Executa o OCR da captura e mede os tempos por etapa
+
+    Returns:
+        tuple: (melhor tempo total em ms, tempos por etapa da melhor execução, Profile)
+    """
+    best_total = None
+    best_timings = {}
+    profiler.start(duration=float("inf"))
+    try:
+        for _ in range(repeat):
+            trace, token = start_trace(f"replay-{capture['id']}", "replay")
+            start = time.perf_counter()
+            try:
+                with span("decode"):
+                    image = prepare_image(data, capture["settings"])
+                process_image_ocr(image, document_type=capture["settings"].get("document_type"))
+            finally:
+                end_trace(token)
+            total = (time.perf_counter() - start) * 1000
+            if best_total is None or total < best_total:
+                best_total = total
+                best_timings = trace.stage_timings()
+    finally:
+        profile = profiler.stop()
+    return best_total, best_timings, profile
+
+
+def print_comparison(capture, total_ms, timings):
+    """Tabela com os tempos gravados e os da reexecução"""
+    recorded = capture.get("stage_timings", {})
+    print(f"\n{capture['id']}  {capture['endpoint']}  {capture['settings']}")
+    print(f"  {'etapa':<24}{'produção (ms)':>16}{'replay (ms)':>14}{'razão':>9}")
+    for stage in list(recorded) + [s for s in timings if s not in recorded]:
+        before = recorded.get(stage)
+        after = timings.get(stage)
+        ratio = f"{after / before:.2f}" if before and after is not None else "-"
+        print(f"  {stage:<24}{_fmt(before):>16}{_fmt(after):>14}{ratio:>9}")
+    print(f"  {'total':<24}{_fmt(capture['duration_ms']):>16}{_fmt(total_ms):>14}"
+          f"{total_ms / capture['duration_ms']:>9.2f}")
+
+
+def _fmt(value):
+    return "-" if value is None else f"{value:.1f}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Reexecuta capturas do flight recorder")
+    parser.add_argument("paths", nargs="+", help="Arquivos de captura (.json) ou diretórios")
+    parser.add_argument("--key", default=FLIGHT_RECORDER_KEY, help="Chave Fernet das imagens (padrão: FLIGHT_RECORDER_KEY)")
+    parser.add_argument("--image-dir", help="Diretório com as imagens originais (para capturas só com hash)")
+    parser.add_argument("--repeat", type=int, default=1, help="Execuções por captura (usa a mais rápida)")
+    parser.add_argument("--profile-dir", help="Grava as pilhas amostradas (formato collapsed) de cada captura")
+    parser.add_argument("--json", action="store_true", help="Imprime o resultado em JSON")
+    args = parser.parse_args()
+
+    images = index_images(args.image_dir)
+    profiler = SamplingProfiler()
+    engine_version = get_engine_version()
+    if args.profile_dir:
+        os.makedirs(args.profile_dir, exist_ok=True)
+
+    results = []
+    for path in find_captures(args.paths):
+        capture = load_capture(path)
+        try:
+            data = load_input(capture, args.key, images)
+        except ValueError as e:
+            print(f"{capture['id']}: {e}", file=sys.stderr)
+            continue
+        if data is None:
+            print(f"{capture['id']}: imagem indisponível (captura só com hash; use --key ou --image-dir)",
+                  file=sys.stderr)
+            continue
+        if capture.get("engine_version") != engine_version:
+            print(f"{capture['id']}: aviso: capturada com {capture.get('engine_version')}, "
+                  f"reexecutada com {engine_version}", file=sys.stderr)
+
+        total_ms, timings, profile = replay(capture, data, args.repeat, profiler)
+        if args.profile_dir:
+            with open(os.path.join(args.profile_dir, f"{capture['id']}.collapsed.txt"), "w") as f:
+                f.write(profile.to_collapsed())
+
+        results.append({
+            "id": capture["id"],
+            "recorded_ms": capture["duration_ms"],
+            "replay_ms": round(total_ms, 2),
+            "recorded_stage_timings": capture.get("stage_timings", {}),
+            "replay_stage_timings": {stage: round(ms, 2) for stage, ms in timings.items()}
+        })
+        if not args.json:
+            print_comparison(capture, total_ms, timings)
+
+    if args.json:
+        print(json.dumps(results, indent=2))
+    return 0 if results else 1
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -1,4 +1,4 @@
 import uvicorn
 
 if __name__ == "__main__":
-    uvicorn.run("main:fastapi_app", host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
+    uvicorn.run("fastapi_server:create_app", factory=True, host="0.0.0.0", port=8000, reload=True)
\ No newline at end of file
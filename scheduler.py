@@ -0,0 +1,247 @@
+import os
+import time
+import asyncio
+import logging
+import threading
+import contextvars
+from collections import deque, defaultdict
+from concurrent.futures import Future
+
+from tracing import current_trace
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Número padrão de workers de OCR por processo
+DEFAULT_OCR_WORKERS = int(os.environ.get("OCR_WORKERS", os.cpu_count() or 2))
+# Janela (segundos) do tempo de espera recente na fila informado em get_stats()
+QUEUE_DELAY_WINDOW = float(os.environ.get("OCR_QUEUE_DELAY_WINDOW", 60))
+
+
+class _Job:
+    """Trabalho de OCR aguardando execução em uma fila por cliente"""
+
+    __slots__ = ("fn", "args", "kwargs", "future", "cost", "weight", "max_concurrency",
+                 "context", "submitted_at")
+
+    def __init__(self, fn, args, kwargs, future, cost, weight, max_concurrency):
+        self.fn = fn
+        self.args = args
+        self.kwargs = kwargs
+        self.future = future
+        self.cost = cost
+        self.weight = weight
+        self.max_concurrency = max_concurrency
+        # Contexto de quem enviou o trabalho (trace da requisição, etc.)
+        self.context = contextvars.copy_context()
+        self.submitted_at = time.perf_counter()
+
+    def execute(self):
+        """Executa o trabalho no contexto de quem o enviou"""
+        return self.context.run(self._run)
+
+    def _run(self):
+        trace = current_trace()
+        if trace is not None:
+            # Tempo de espera na fila como etapa do trace da requisição
+            trace.add_span("queue", self.submitted_at, time.perf_counter())
+        return self.fn(*self.args, **self.kwargs)
+
+
+class FairShareScheduler:
+    """
+    Escalonador de trabalhos de OCR com filas por cliente (API key)
+
+    As filas são atendidas com Deficit Round Robin: a cada rodada, cada cliente
+    com trabalhos pendentes recebe um crédito proporcional ao seu peso e só
+    executa trabalhos enquanto tiver crédito. Um cliente enviando um lote grande
+    não impede que clientes interativos sejam atendidos na rodada seguinte.
+    """
+
+    def __init__(self, workers=None, quantum=1.0):
+        """
+        Inicializa o escalonador
+
+        Args:
+            workers: Número de threads executando OCR (padrão: OCR_WORKERS)
+            quantum: Crédito base concedido a cada cliente por rodada
+        """
+        self.workers = workers or DEFAULT_OCR_WORKERS
+        self.quantum = quantum
+        self.lock = threading.Condition()
+
+        # Filas por cliente e ordem de atendimento (round robin)
+        self.queues = {}
+        self.active = deque()
+        self.deficits = {}
+        self.running = defaultdict(int)
+        self._head_credited = False
+
+        # Tempos de espera na fila dos últimos trabalhos: (instante, espera em segundos)
+        self.queue_delays = deque(maxlen=1024)
+
+        # Threads são criadas sob demanda (após o fork dos workers do gunicorn)
+        self._threads = []
+        self._pid = None
+
+    def submit(self, key, fn, *args, weight=1.0, max_concurrency=None, cost=1.0, **kwargs):
+        """
+        Enfileira um trabalho para o cliente informado
+
+        Args:
+            key: Identificador do cliente (ex: user_id da API key)
+            fn: Função a ser executada
+            weight: Peso do cliente na divisão da capacidade
+            max_concurrency: Máximo de trabalhos simultâneos do cliente (None = sem limite)
+            cost: Custo do trabalho em unidades de crédito
+
+        Returns:
+            Future: Resultado do trabalho
+        """
+        future = Future()
+        job = _Job(fn, args, kwargs, future, max(cost, 0.0), max(weight or 1.0, 0.01), max_concurrency)
+
+        with self.lock:
+            self._ensure_workers()
+            if key not in self.queues:
+                self.queues[key] = deque()
+                self.deficits[key] = 0.0
+                self.active.append(key)
+            self.queues[key].append(job)
+            self.lock.notify()
+
+        return future
+
+    def run(self, key, fn, *args, **kwargs):
+        """Enfileira um trabalho e aguarda o seu resultado"""
+        return self.submit(key, fn, *args, **kwargs).result()
+
+    async def run_async(self, key, fn, *args, **kwargs):
+        """Versão assíncrona de run, para uso no FastAPI sem bloquear o event loop"""
+        return await asyncio.wrap_future(self.submit(key, fn, *args, **kwargs))
+
+    def get_stats(self):
+        """
+        Retorna o estado atual das filas e a ocupação dos workers
+
+        A utilização é a demanda em relação à capacidade: (em execução + na
+        fila) / workers. Acima de 1 os trabalhos esperam na fila.
+
+        Returns:
+            dict: Trabalhos na fila e em execução (total e por cliente),
+                workers ociosos, espera do trabalho mais antigo na fila,
+                espera recente (QUEUE_DELAY_WINDOW) e utilização
+        """
+        now = time.perf_counter()
+        with self.lock:
+            queued = sum(len(q) for q in self.queues.values())
+            running = sum(self.running.values())
+            oldest = min((q[0].submitted_at for q in self.queues.values()), default=None)
+            delays = sorted(delay for at, delay in self.queue_delays if now - at <= QUEUE_DELAY_WINDOW)
+            return {
+                "workers": self.workers,
+                "queued": queued,
+                "running": running,
+                "idle": max(self.workers - running, 0),
+                "utilization": round((running + queued) / self.workers, 4),
+                "oldest_queued_ms": round((now - oldest) * 1000, 1) if oldest is not None else 0.0,
+                "queue_delay_ms": {
+                    "samples": len(delays),
+                    "avg": round(sum(delays) / len(delays) * 1000, 1) if delays else 0.0,
+                    "p95": round(delays[int(0.95 * (len(delays) - 1))] * 1000, 1) if delays else 0.0,
+                    "max": round(delays[-1] * 1000, 1) if delays else 0.0
+                },
+                "queued_by_key": {key: len(q) for key, q in self.queues.items()},
+                "running_by_key": {key: n for key, n in self.running.items() if n}
+            }
+
+    def _ensure_workers(self):
+        """Cria as threads de execução no processo atual, se necessário"""
+        if self._pid == os.getpid():
+            return
+        self._pid = os.getpid()
+        self.running.clear()
+        self._threads = []
+        for i in range(self.workers):
+            thread = threading.Thread(target=self._worker_loop, name=f"ocr-worker-{i}", daemon=True)
+            thread.start()
+            self._threads.append(thread)
+
+    def _next_job(self):
+        """
+        Seleciona o próximo trabalho segundo o Deficit Round Robin
+
+        Deve ser chamado com o lock adquirido.
+
+        Returns:
+            tuple: (cliente, trabalho) ou None se nenhum cliente puder ser atendido
+        """
+        blocked = 0
+        while self.active:
+            key = self.active[0]
+            job = self.queues[key][0]
+
+            # Cliente no limite de concorrência: passa a vez sem acumular crédito
+            if job.max_concurrency is not None and self.running.get(key, 0) >= job.max_concurrency:
+                self._rotate()
+                blocked += 1
+                if blocked >= len(self.active):
+                    return None
+                continue
+            blocked = 0
+
+            if not self._head_credited:
+                self.deficits[key] += self.quantum * job.weight
+                self._head_credited = True
+
+            if self.deficits[key] < job.cost:
+                self._rotate()
+                continue
+
+            self.deficits[key] -= job.cost
+            self.queues[key].popleft()
+            if not self.queues[key]:
+                # Sem trabalhos pendentes o crédito não é acumulado
+                self.active.popleft()
+                del self.queues[key]
+                del self.deficits[key]
+                self._head_credited = False
+            return key, job
+
+        return None
+
+    def _rotate(self):
+        """Move o cliente atual para o fim da rodada"""
+        self.active.rotate(-1)
+        self._head_credited = False
+
+    def _worker_loop(self):
+        """Laço principal de uma thread de execução"""
+        while True:
+            with self.lock:
+                selected = self._next_job()
+                while selected is None:
+                    self.lock.wait()
+                    selected = self._next_job()
+                key, job = selected
+                self.running[key] += 1
+                started = time.perf_counter()
+                self.queue_delays.append((started, started - job.submitted_at))
+
+            try:
+                if job.future.set_running_or_notify_cancel():
+                    try:
+                        job.future.set_result(job.execute())
+                    except BaseException as e:
+                        job.future.set_exception(e)
+            finally:
+                with self.lock:
+                    self.running[key] -= 1
+                    if not self.running[key]:
+                        del self.running[key]
+                    # Um cliente limitado por concorrência pode voltar a ser atendido
+                    self.lock.notify_all()
+
+
+# Instância global para uso em toda a aplicação
+ocr_scheduler = FairShareScheduler()
@@ -7,8 +7,6 @@ import mimetypes
 from io import BytesIO
 from PIL import Image
 from functools import wraps
-from flask import request, jsonify
-from werkzeug.utils import secure_filename
 
 # Configuração de logging
 logger = logging.getLogger(__name__)
@@ -17,6 +15,24 @@ logger = logging.getLogger(__name__)
 ALLOWED_EXTENSIONS = {'png', 'jpg', 'jpeg', 'gif', 'bmp', 'tiff', 'pdf'}
 MAX_CONTENT_LENGTH = 10 * 1024 * 1024  # 10MB
 
+# Cabeçalhos de segurança de todas as respostas (Flask e ASGI)
+SECURITY_HEADERS = {
+    # Previne MIME sniffing
+    'X-Content-Type-Options': 'nosniff',
+    # Controla como o navegador pode incorporar a página em frames
+    'X-Frame-Options': 'SAMEORIGIN',
+    # Habilita proteção XSS em navegadores antigos
+    'X-XSS-Protection': '1; mode=block',
+    # Content Security Policy básica
+    'Content-Security-Policy': "default-src 'self'; img-src 'self' data:; style-src 'self' 'unsafe-inline'; script-src 'self' 'unsafe-inline'",
+    # Strict Transport Security - força HTTPS
+    'Strict-Transport-Security': 'max-age=31536000; includeSubDomains',
+    # Configurar CORS para permitir apenas origem especificada
+    'Access-Control-Allow-Origin': '*',  # Em produção, substituir por domínio específico
+    'Access-Control-Allow-Methods': 'GET, POST, OPTIONS',
+    'Access-Control-Allow-Headers': 'Content-Type, X-API-Key'
+}
+
 def is_allowed_file(filename):
     """
     Verifica se o arquivo tem uma extensão permitida
@@ -61,6 +77,8 @@ def check_file_content(file_storage):
     Returns:
         dict: Informações sobre o arquivo
     """
+    from werkzeug.utils import secure_filename
+    
     try:
         file_storage.seek(0)
         content = file_storage.read()
@@ -107,6 +125,8 @@ def validate_file_upload(f):
     """
     @wraps(f)
     def decorated_function(*args, **kwargs):
+        from flask import request, jsonify, g
+        
         # Verificar se o arquivo foi enviado
         if 'file' not in request.files:
             return jsonify({
@@ -158,7 +178,6 @@ def validate_file_upload(f):
         file_info = check_file_content(file)
         if file_info:
             # Armazenar em g ao invés de diretamente no request
-            from flask import g
             g.file_info = file_info
             
         return f(*args, **kwargs)
@@ -175,25 +194,8 @@ def add_security_headers(response):
     Returns:
         response: Objeto de resposta com cabeçalhos adicionados
     """
-    # Previne MIME sniffing
-    response.headers['X-Content-Type-Options'] = 'nosniff'
-    
-    # Controla como o navegador pode incorporar a página em frames
-    response.headers['X-Frame-Options'] = 'SAMEORIGIN'
-    
-    # Habilita proteção XSS em navegadores antigos
-    response.headers['X-XSS-Protection'] = '1; mode=block'
-    
-    # Content Security Policy básica
-    response.headers['Content-Security-Policy'] = "default-src 'self'; img-src 'self' data:; style-src 'self' 'unsafe-inline'; script-src 'self' 'unsafe-inline'"
-    
-    # Strict Transport Security - força HTTPS
-    response.headers['Strict-Transport-Security'] = 'max-age=31536000; includeSubDomains'
-    
-    # Configurar CORS para permitir apenas origem especificada
-    response.headers['Access-Control-Allow-Origin'] = '*'  # Em produção, substituir por domínio específico
-    response.headers['Access-Control-Allow-Methods'] = 'GET, POST, OPTIONS'
-    response.headers['Access-Control-Allow-Headers'] = 'Content-Type, X-API-Key'
+    for header, value in SECURITY_HEADERS.items():
+        response.headers[header] = value
     
     return response
 
@@ -255,6 +257,8 @@ def log_request_info():
     """
     Registra informações sobre a requisição atual
     """
+    from flask import request
+    
     endpoint = request.endpoint
     method = request.method
     ip = request.remote_addr
@@ -0,0 +1,138 @@
+import os
+import json
+import time
+import logging
+
+from fastapi import File, HTTPException, UploadFile
+from starlette.concurrency import run_in_threadpool
+from starlette.datastructures import Headers, MutableHeaders
+
+from security import ALLOWED_EXTENSIONS, MAX_CONTENT_LENGTH, SECURITY_HEADERS, is_allowed_file, is_valid_image
+from monitoring import api_monitor
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Extensões cujo conteúdo é verificado com o PIL
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.gif', '.bmp')
+
+
+class SecurityHeadersMiddleware:
+    """
+    Middleware ASGI equivalente a add_security_headers e MAX_CONTENT_LENGTH do Flask
+
+    Recusa com 413 corpos declarados acima do limite antes de lê-los e
+    adiciona os cabeçalhos de segurança às respostas (sem sobrescrever os
+    definidos pela aplicação, como os do CORSMiddleware).
+    """
+
+    def __init__(self, app, max_content_length=MAX_CONTENT_LENGTH):
+        self.app = app
+        self.max_content_length = max_content_length
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        content_length = Headers(scope=scope).get("content-length")
+        if content_length and content_length.isdigit() and int(content_length) > self.max_content_length:
+            await self._reject_too_large(send)
+            return
+
+        async def send_with_headers(message):
+            if message["type"] == "http.response.start":
+                headers = MutableHeaders(scope=message)
+                for header, value in SECURITY_HEADERS.items():
+                    if header not in headers:
+                        headers[header] = value
+            await send(message)
+
+        await self.app(scope, receive, send_with_headers)
+
+    async def _reject_too_large(self, send):
+        body = json.dumps({
+            "status": "error",
+            "message": f"Tamanho máximo de arquivo excedido. Limite: {self.max_content_length/(1024*1024)}MB",
+            "error_code": 413
+        }).encode()
+        headers = [(b"content-type", b"application/json"), (b"content-length", str(len(body)).encode())]
+        headers.extend((header.lower().encode(), value.encode()) for header, value in SECURITY_HEADERS.items())
+        await send({"type": "http.response.start", "status": 413, "headers": headers})
+        await send({"type": "http.response.body", "body": body})
+
+
+class RequestMonitoringMiddleware:
+    """
+    Middleware ASGI equivalente a log_request_info e after_request_monitoring do Flask
+
+    Registra cada requisição no log e no api_monitor (endpoint, status,
+    duração e IP). O endpoint é o caminho da rota (ex: /ocr/upload), ou
+    'unknown' quando nenhuma rota corresponde, para não criar uma série por URL.
+    """
+
+    def __init__(self, app):
+        self.app = app
+
+    async def __call__(self, scope, receive, send):
+        if scope["type"] != "http":
+            await self.app(scope, receive, send)
+            return
+
+        start_time = time.time()
+        client = scope.get("client")
+        ip = client[0] if client else None
+        api_key = Headers(scope=scope).get("x-api-key")
+        logger.info(f"Request: {scope['method']} {scope['path']} - IP: {ip} - "
+                    f"API Key: {api_key[:8] + '...' if api_key else 'None'}")
+
+        status = {"code": 500}
+
+        async def send_with_status(message):
+            if message["type"] == "http.response.start":
+                status["code"] = message["status"]
+            await send(message)
+
+        try:
+            await self.app(scope, receive, send_with_status)
+        finally:
+            duration_ms = (time.time() - start_time) * 1000
+            route = scope.get("route")
+            endpoint = getattr(route, "path", None) or "unknown"
+            api_monitor.record_request(endpoint, status["code"], duration_ms, ip)
+
+
+async def validate_file_upload(file: UploadFile = File(...)) -> UploadFile:
+    """
+    Dependência equivalente ao decorator validate_file_upload do Flask
+
+    Verifica nome, extensão, tamanho e, para imagens, se o PIL consegue
+    abrir o arquivo (no threadpool, para não bloquear o event loop).
+
+    Returns:
+        UploadFile: O arquivo validado
+
+    Raises:
+        HTTPException: 400 para arquivo ausente ou inválido, 413 acima do limite
+    """
+    if not file.filename:
+        raise HTTPException(status_code=400, detail="Nenhum arquivo selecionado")
+
+    if not is_allowed_file(file.filename):
+        raise HTTPException(status_code=400,
+                            detail=f"Extensão de arquivo não permitida. Permitidas: {', '.join(ALLOWED_EXTENSIONS)}")
+
+    file_size = file.size
+    if file_size is None:
+        file.file.seek(0, os.SEEK_END)
+        file_size = file.file.tell()
+        file.file.seek(0)
+    if file_size > MAX_CONTENT_LENGTH:
+        raise HTTPException(status_code=413,
+                            detail=f"Tamanho máximo de arquivo excedido. Limite: {MAX_CONTENT_LENGTH/(1024*1024)}MB")
+
+    if file.filename.lower().endswith(IMAGE_EXTENSIONS):
+        if not await run_in_threadpool(is_valid_image, file.file):
+            raise HTTPException(status_code=400, detail="Arquivo enviado não é uma imagem válida")
+
+    return file
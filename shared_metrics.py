@@ -0,0 +1,219 @@
+import os
+import mmap
+import struct
+import logging
+import threading
+
+try:
+    import fcntl
+except ImportError:  # Plataformas sem fcntl (ex: Windows)
+    fcntl = None
+
+from latency import LatencyHistogram, NUM_BUCKETS, bucket_index, bucket_upper_bound, GAMMA
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Caminho da região compartilhada (ex: /dev/shm/ocr_metrics); vazio = desativado
+SHARED_METRICS_PATH = os.environ.get("METRICS_SHM_PATH", "")
+# Número de slots (um por worker do gunicorn)
+SHARED_METRICS_SLOTS = int(os.environ.get("METRICS_SHM_SLOTS", 32))
+
+# Contadores mantidos por worker, na ordem em que aparecem no slot
+COUNTERS = (
+    "total_requests",
+    "successful_requests",
+    "failed_requests",
+    "status_2xx",
+    "status_3xx",
+    "status_4xx",
+    "status_5xx",
+    "ocr_requests",
+    "ocr_failures",
+    "abandoned_requests",
+    "wasted_cpu_us",
+)
+# Histogramas mantidos por worker (buckets de latency.LatencyHistogram)
+HISTOGRAMS = ("request_latency", "ocr_latency")
+
+_MAGIC = b"OCRMETR1"
+_HEADER = struct.Struct("<8sqq")  # magic, número de slots, inteiros por slot
+# Slot: pid + contadores + (buckets, soma em µs, máximo em µs) por histograma
+_SLOT_INTS = 1 + len(COUNTERS) + len(HISTOGRAMS) * (NUM_BUCKETS + 2)
+_COUNTER_OFFSET = {name: 1 + i for i, name in enumerate(COUNTERS)}
+_HISTOGRAM_OFFSET = {
+    name: 1 + len(COUNTERS) + i * (NUM_BUCKETS + 2) for i, name in enumerate(HISTOGRAMS)
+}
+
+
+def _pid_alive(pid):
+    """Verifica se um processo ainda existe"""
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    except PermissionError:
+        return True
+    return True
+
+
+class SharedMetrics:
+    """
+    Região de memória compartilhada (mmap) com métricas de todos os workers
+
+    Cada worker escreve apenas no seu próprio slot, com inteiros de 64 bits
+    alinhados, então não há lock entre processos no caminho da requisição.
+    A leitura soma os slots de todos os workers do nó. Slots de workers
+    encerrados são reaproveitados sem zerar, mantendo os totais cumulativos.
+    """
+
+    def __init__(self, path, slots=SHARED_METRICS_SLOTS):
+        """
+        Args:
+            path: Arquivo da região compartilhada (de preferência em /dev/shm)
+            slots: Número máximo de workers simultâneos
+        """
+        self.path = path
+        self.slots = slots
+        self.lock = threading.Lock()
+        self._pid = None
+        self._mmap = None
+        self._ints = None
+        self._base = None
+
+    @classmethod
+    def from_env(cls):
+        """Cria a região a partir de METRICS_SHM_PATH (None se desativada)"""
+        if not SHARED_METRICS_PATH or fcntl is None:
+            return None
+        return cls(SHARED_METRICS_PATH)
+
+    def _attach(self):
+        """
+        Mapeia o arquivo e reserva um slot para o processo atual
+
+        Chamado sob demanda, para que cada worker (após o fork) tenha o seu slot.
+        """
+        if self._pid == os.getpid():
+            return
+        size = _HEADER.size + self.slots * _SLOT_INTS * 8
+        fd = os.open(self.path, os.O_RDWR | os.O_CREAT, 0o600)
+        try:
+            fcntl.flock(fd, fcntl.LOCK_EX)
+            try:
+                if os.fstat(fd).st_size < size:
+                    os.ftruncate(fd, size)
+                mapped = mmap.mmap(fd, size)
+                magic, slots, slot_ints = _HEADER.unpack_from(mapped, 0)
+                if magic != _MAGIC or slots != self.slots or slot_ints != _SLOT_INTS:
+                    # Arquivo novo ou de um layout diferente: reinicia a região
+                    mapped[:] = bytes(size)
+                    _HEADER.pack_into(mapped, 0, _MAGIC, self.slots, _SLOT_INTS)
+                ints = memoryview(mapped)[_HEADER.size:].cast("q")
+                base = self._claim_slot(ints)
+            finally:
+                fcntl.flock(fd, fcntl.LOCK_UN)
+        finally:
+            os.close(fd)
+
+        self._mmap = mapped
+        self._ints = ints
+        self._base = base
+        self._pid = os.getpid()
+
+    def _claim_slot(self, ints):
+        """Reserva um slot livre ou de um worker encerrado"""
+        pid = os.getpid()
+        fallback = None
+        for slot in range(self.slots):
+            base = slot * _SLOT_INTS
+            owner = ints[base]
+            if owner == pid or owner == 0:
+                ints[base] = pid
+                return base
+            if fallback is None and not _pid_alive(owner):
+                fallback = base
+        if fallback is None:
+            # Sem slots livres: compartilha o último (contagens continuam corretas
+            # no total, mas com escritas concorrentes entre processos)
+            logger.warning("Sem slots livres na região de métricas compartilhada")
+            fallback = (self.slots - 1) * _SLOT_INTS
+        ints[fallback] = pid
+        return fallback
+
+    def _add(self, name, value=1):
+        """Incrementa um contador do slot do processo atual"""
+        self._ints[self._base + _COUNTER_OFFSET[name]] += value
+
+    def _record_latency(self, name, duration_ms):
+        """Registra uma amostra em um histograma do slot do processo atual"""
+        offset = self._base + _HISTOGRAM_OFFSET[name]
+        self._ints[offset + bucket_index(duration_ms)] += 1
+        duration_us = int(duration_ms * 1000)
+        self._ints[offset + NUM_BUCKETS] += duration_us
+        if duration_us > self._ints[offset + NUM_BUCKETS + 1]:
+            self._ints[offset + NUM_BUCKETS + 1] = duration_us
+
+    def record_request(self, status_code, duration_ms):
+        """Registra uma requisição HTTP no slot do worker"""
+        with self.lock:
+            self._attach()
+            self._add("total_requests")
+            if 200 <= status_code < 400:
+                self._add("successful_requests")
+            else:
+                self._add("failed_requests")
+            status_class = f"status_{status_code // 100}xx"
+            if status_class in _COUNTER_OFFSET:
+                self._add(status_class)
+            self._record_latency("request_latency", duration_ms)
+
+    def record_ocr(self, duration_ms, success):
+        """Registra um processamento de OCR no slot do worker"""
+        with self.lock:
+            self._attach()
+            self._add("ocr_requests")
+            if success:
+                self._record_latency("ocr_latency", duration_ms)
+            else:
+                self._add("ocr_failures")
+
+    def record_abandoned(self, cpu_ms):
+        """Registra uma requisição abandonada no slot do worker"""
+        with self.lock:
+            self._attach()
+            self._add("abandoned_requests")
+            self._add("wasted_cpu_us", int(cpu_ms * 1000))
+
+    def merged(self):
+        """
+        Soma os slots de todos os workers
+
+        Returns:
+            dict: Contadores do nó, histogramas combinados e número de workers ativos
+        """
+        with self.lock:
+            self._attach()
+            rows = [
+                self._ints[slot * _SLOT_INTS:(slot + 1) * _SLOT_INTS].tolist()
+                for slot in range(self.slots)
+            ]
+
+        used = [row for row in rows if row[0]]
+        totals = [sum(values) for values in zip(*used)] if used else [0] * _SLOT_INTS
+
+        result = {name: totals[offset] for name, offset in _COUNTER_OFFSET.items()}
+        result["workers"] = sum(1 for row in used if _pid_alive(row[0]))
+        for name, offset in _HISTOGRAM_OFFSET.items():
+            histogram = LatencyHistogram()
+            for index in range(NUM_BUCKETS):
+                count = totals[offset + index]
+                if count:
+                    histogram.counts[index] = count
+                    histogram.count += count
+                    if histogram.min is None:
+                        histogram.min = bucket_upper_bound(index) / GAMMA if index else 0.0
+            histogram.total = totals[offset + NUM_BUCKETS] / 1000
+            histogram.max = max((row[offset + NUM_BUCKETS + 1] for row in used), default=0) / 1000
+            result[name] = histogram
+        return result
@@ -0,0 +1,316 @@
+import os
+import random
+import logging
+from io import BytesIO
+
+from PIL import Image, ImageDraw, ImageFilter, ImageFont
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Fontes TrueType usadas nos documentos (separadas por vírgula); as ausentes são ignoradas
+SYNTHETIC_FONTS = [path for path in os.environ.get(
+    "SYNTHETIC_FONTS",
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans.ttf,"
+    "/usr/share/fonts/truetype/dejavu/DejaVuSans-Bold.ttf,"
+    "/usr/share/fonts/truetype/dejavu/DejaVuSerif.ttf,"
+    "/usr/share/fonts/truetype/dejavu/DejaVuSansMono.ttf"
+).split(",") if path]
+
+DOC_TYPES = ("rg", "cpf", "cnh")
+# Larguras (px) em que os documentos são renderizados
+DEFAULT_WIDTHS = (640, 1000, 1600)
+# Largura de referência das coordenadas do layout
+BASE_WIDTH = 1000
+
+FIRST_NAMES = ["MARIA", "JOSÉ", "ANA", "JOÃO", "ANTÔNIO", "FRANCISCA", "CARLOS", "PAULO",
+               "LUCAS", "JULIANA", "MÁRCIA", "PEDRO", "FERNANDA", "RAFAEL", "CONCEIÇÃO", "LUIZ"]
+SURNAMES = ["SILVA", "SANTOS", "OLIVEIRA", "SOUZA", "RODRIGUES", "FERREIRA", "ALVES", "PEREIRA",
+            "LIMA", "GOMES", "RIBEIRO", "CARVALHO", "ARAÚJO", "MARTINS", "ROCHA", "BARBOSA"]
+# Rótulos dos campos, impressos em fonte menor que os valores
+LABELS = {"NOME", "FILIAÇÃO", "NATURALIDADE", "DATA DE NASCIMENTO", "CPF", "NÚMERO DE INSCRIÇÃO",
+          "DOC. IDENTIDADE / ÓRG. EMISSOR / UF"}
+CITIES = [("SÃO PAULO", "SP"), ("CURITIBA", "PR"), ("RIO DE JANEIRO", "RJ"), ("BELO HORIZONTE", "MG"),
+          ("SALVADOR", "BA"), ("RECIFE", "PE"), ("PORTO ALEGRE", "RS"), ("FORTALEZA", "CE")]
+
+
+class SyntheticDocument:
+    """Documento sintético com os valores dos campos conhecidos"""
+
+    __slots__ = ("doc_id", "doc_type", "image", "fields", "lines", "params")
+
+    def __init__(self, doc_id, doc_type, image, fields, lines, params):
+        self.doc_id = doc_id
+        self.doc_type = doc_type
+        self.image = image
+        # Campos impressos no documento (nome, data_nascimento, cpf, ...)
+        self.fields = fields
+        # Linhas de texto impressas, na ordem de leitura (texto "perfeito" do OCR)
+        self.lines = lines
+        # Parâmetros de renderização e degradação (fonte, largura, ruído, ...)
+        self.params = params
+
+
+def cpf_check_digits(digits):
+    """Dígitos verificadores de um CPF a partir dos 9 primeiros dígitos"""
+    digits = list(digits)
+    for length in (9, 10):
+        total = sum(d * (length + 1 - i) for i, d in enumerate(digits[:length]))
+        remainder = total * 10 % 11
+        digits.append(remainder if remainder < 10 else 0)
+    return digits[9:]
+
+
+def random_cpf(rng):
+    """CPF válido formatado (000.000.000-00)"""
+    digits = [rng.randrange(10) for _ in range(9)]
+    digits += cpf_check_digits(digits)
+    s = "".join(map(str, digits))
+    return f"{s[:3]}.{s[3:6]}.{s[6:9]}-{s[9:]}"
+
+
+def random_name(rng, surnames=2):
+    return " ".join([rng.choice(FIRST_NAMES)] + [rng.choice(SURNAMES) for _ in range(surnames)])
+
+
+def generate_fields(rng):
+    """
+    Sorteia os valores dos campos de uma pessoa
+
+    Returns:
+        dict: nome, data_nascimento, cpf, rg, naturalidade e filiacao
+    """
+    city, state = rng.choice(CITIES)
+    surname = rng.choice(SURNAMES)
+    return {
+        "nome": f"{rng.choice(FIRST_NAMES)} {rng.choice(SURNAMES)} {surname}",
+        "data_nascimento": f"{rng.randint(1, 28):02d}/{rng.randint(1, 12):02d}/{rng.randint(1950, 2010)}",
+        "cpf": random_cpf(rng),
+        "rg": f"{rng.randint(10, 99)}.{rng.randint(100, 999)}.{rng.randint(100, 999)}-{rng.randint(0, 9)}",
+        "naturalidade": f"{city} - {state}",
+        "filiacao": [random_name(rng, 1) + f" {surname}", random_name(rng, 1) + f" {surname}"],
+    }
+
+
+def document_lines(doc_type, fields):
+    """
+    Layout do documento: linhas de texto e os campos impressos
+
+    Returns:
+        tuple: (linhas na ordem de leitura, campos presentes no documento)
+    """
+    if doc_type == "rg":
+        lines = ["REPÚBLICA FEDERATIVA DO BRASIL", "SECRETARIA DA SEGURANÇA PÚBLICA",
+                 "CARTEIRA DE IDENTIDADE", f"REGISTRO GERAL: {fields['rg']}",
+                 "NOME", fields["nome"], "FILIAÇÃO", *fields["filiacao"],
+                 "NATURALIDADE", fields["naturalidade"],
+                 "DATA DE NASCIMENTO", fields["data_nascimento"], "CPF", fields["cpf"]]
+        keys = ("nome", "data_nascimento", "cpf", "naturalidade", "filiacao")
+    elif doc_type == "cpf":
+        lines = ["MINISTÉRIO DA FAZENDA", "CADASTRO DE PESSOAS FÍSICAS",
+                 "NÚMERO DE INSCRIÇÃO", fields["cpf"], "NOME", fields["nome"],
+                 "DATA DE NASCIMENTO", fields["data_nascimento"]]
+        keys = ("nome", "data_nascimento", "cpf")
+    elif doc_type == "cnh":
+        lines = ["REPÚBLICA FEDERATIVA DO BRASIL", "CARTEIRA NACIONAL DE HABILITAÇÃO",
+                 "NOME", fields["nome"], "DOC. IDENTIDADE / ÓRG. EMISSOR / UF", f"{fields['rg']} SSP SP",
+                 "CPF", fields["cpf"], "DATA DE NASCIMENTO", fields["data_nascimento"],
+                 "FILIAÇÃO", *fields["filiacao"]]
+        keys = ("nome", "data_nascimento", "cpf", "filiacao")
+    else:
+        raise ValueError(f"Tipo de documento desconhecido: {doc_type}")
+    return lines, {key: fields[key] for key in keys}
+
+
+def load_font(path, size):
+    """Fonte TrueType do caminho informado, ou a fonte padrão do Pillow se path for None"""
+    if path is None:
+        return ImageFont.load_default(size=size)
+    return ImageFont.truetype(path, size)
+
+
+def render_document(lines, width=BASE_WIDTH, font_path=None):
+    """
+    Renderiza as linhas do documento sobre um cartão claro
+
+    Rótulos (LABELS) usam uma fonte menor que os valores, como nos
+    documentos reais.
+
+    Args:
+        lines: Linhas de texto na ordem de leitura
+        width: Largura da imagem em pixels
+        font_path: Fonte TrueType (None = fonte padrão do Pillow)
+
+    Returns:
+        PIL.Image: Documento RGB
+    """
+    scale = width / BASE_WIDTH
+    line_height = int(44 * scale)
+    height = int(60 * scale) + line_height * len(lines)
+    image = Image.new("RGB", (width, height), (246, 244, 236))
+    draw = ImageDraw.Draw(image)
+    draw.rectangle([int(10 * scale), int(10 * scale), width - int(10 * scale), height - int(10 * scale)],
+                   outline=(90, 110, 90), width=max(int(3 * scale), 1))
+
+    value_font = load_font(font_path, max(int(30 * scale), 8))
+    label_font = load_font(font_path, max(int(22 * scale), 6))
+    y = int(30 * scale)
+    for line in lines:
+        draw.text((int(40 * scale), y), line, fill=(20, 20, 20), font=label_font if line in LABELS else value_font)
+        y += line_height
+    return image
+
+
+def degrade(image, rng, noise=0.0, blur=0.0, rotation=0.0, jpeg_quality=None):
+    """
+    Aplica degradações de captura ao documento
+
+    Args:
+        image: Documento RGB
+        rng: random.Random usado no ruído (determinístico)
+        noise: Intensidade do ruído (0 a 1, mistura com ruído uniforme)
+        blur: Raio do desfoque gaussiano em pixels
+        rotation: Rotação em graus
+        jpeg_quality: Qualidade da recompressão JPEG (None = sem recompressão)
+
+    Returns:
+        PIL.Image: Documento degradado
+    """
+    if rotation:
+        image = image.rotate(rotation, resample=Image.BICUBIC, expand=True, fillcolor=(255, 255, 255))
+    if blur:
+        image = image.filter(ImageFilter.GaussianBlur(blur))
+    if noise:
+        grain = Image.frombytes("L", image.size, rng.randbytes(image.width * image.height)).convert("RGB")
+        image = Image.blend(image, grain, noise)
+    if jpeg_quality is not None:
+        buffer = BytesIO()
+        image.save(buffer, format="JPEG", quality=jpeg_quality)
+        buffer.seek(0)
+        image = Image.open(buffer)
+        image.load()
+    return image
+
+
+def available_fonts():
+    """Fontes de SYNTHETIC_FONTS presentes no sistema (None = fonte padrão do Pillow)"""
+    fonts = [path for path in SYNTHETIC_FONTS if os.path.exists(path)]
+    return fonts or [None]
+
+
+def generate_document(rng, doc_id, doc_type, width, degraded=True, fonts=None):
+    """
+    Gera um documento sintético
+
+    Args:
+        rng: random.Random com o estado do corpus
+        doc_id: Identificador do documento
+        doc_type: rg, cpf ou cnh
+        width: Largura em pixels
+        degraded: Aplicar ruído, desfoque, rotação e JPEG sorteados
+        fonts: Fontes disponíveis (padrão: available_fonts())
+
+    Returns:
+        SyntheticDocument: Imagem, campos e parâmetros do documento
+    """
+    fonts = fonts or available_fonts()
+    font_path = rng.choice(fonts)
+    lines, fields = document_lines(doc_type, generate_fields(rng))
+    params = {"width": width, "font": os.path.basename(font_path) if font_path else "default",
+              "noise": 0.0, "blur": 0.0, "rotation": 0.0, "jpeg_quality": None}
+    if degraded:
+        params.update(noise=round(rng.uniform(0.0, 0.15), 3), blur=round(rng.uniform(0.0, 1.2), 2),
+                      rotation=round(rng.uniform(-3.0, 3.0), 2), jpeg_quality=rng.choice([35, 50, 70, 90]))
+
+    image = render_document(lines, width, font_path)
+    image = degrade(image, rng, params["noise"], params["blur"], params["rotation"], params["jpeg_quality"])
+    return SyntheticDocument(doc_id, doc_type, image, fields, lines, params)
+
+
+def generate_corpus(count, seed=0, doc_types=DOC_TYPES, widths=DEFAULT_WIDTHS, degraded=True):
+    """
+    Gera um corpus determinístico de documentos de identidade sintéticos
+
+    A mesma semente (com as mesmas fontes disponíveis) gera as mesmas
+    imagens e campos. Tipos e larguras se alternam para que qualquer prefixo
+    do corpus cubra todas as combinações possíveis.
+
+    Args:
+        count: Número de documentos
+        seed: Semente do gerador
+        doc_types: Tipos de documento (rg, cpf, cnh)
+        widths: Larguras em pixels
+        degraded: Aplicar degradações de captura
+
+    Returns:
+        List[SyntheticDocument]: Documentos gerados
+    """
+    rng = random.Random(seed)
+    fonts = available_fonts()
+    return [
+        generate_document(rng, f"{seed}-{i}", doc_types[i % len(doc_types)],
+                          widths[(i // len(doc_types)) % len(widths)], degraded, fonts)
+        for i in range(count)
+    ]
+
+
+def _normalize(value):
+    return " ".join(str(value).upper().split())
+
+
+def extracted_fields(result_lines):
+    """
+    Campos do resultado formatado de process_document_data
+
+    Args:
+        result_lines: Linhas retornadas pelo OCR ("NOME: ...", "FILIAÇÃO:", "   1. ...")
+
+    Returns:
+        dict: nome, data_nascimento, cpf, naturalidade e filiacao encontrados
+    """
+    labels = {"NOME": "nome", "DATA DE NASCIMENTO": "data_nascimento", "CPF": "cpf",
+              "NATURALIDADE": "naturalidade"}
+    fields = {}
+    in_filiation = False
+    for line in result_lines:
+        label, _, value = line.partition(":")
+        if label.strip() in labels and value.strip():
+            fields[labels[label.strip()]] = value.strip()
+            in_filiation = False
+        elif label.strip() == "FILIAÇÃO":
+            fields["filiacao"] = []
+            in_filiation = True
+        elif in_filiation and line.startswith("   ") and ". " in line:
+            fields["filiacao"].append(line.split(". ", 1)[1])
+        else:
+            in_filiation = False
+    return fields
+
+
+def score_fields(document, result_lines):
+    """
+    Acertos por campo do OCR de um documento sintético
+
+    Nomes são comparados sem diferença de maiúsculas e espaços; o CPF, só
+    pelos dígitos.
+
+    Args:
+        document: SyntheticDocument com os valores esperados
+        result_lines: Linhas retornadas pelo OCR
+
+    Returns:
+        dict: campo -> True se o valor extraído é igual ao impresso
+    """
+    found = extracted_fields(result_lines)
+    scores = {}
+    for field, expected in document.fields.items():
+        value = found.get(field)
+        if value is None:
+            scores[field] = False
+        elif field == "cpf":
+            scores[field] = "".join(filter(str.isdigit, value)) == "".join(filter(str.isdigit, expected))
+        elif field == "filiacao":
+            scores[field] = [_normalize(v) for v in value] == [_normalize(v) for v in expected]
+        else:
+            scores[field] = _normalize(value) == _normalize(expected)
+    return scores
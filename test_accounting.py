@@ -0,0 +1,36 @@
+import subprocess
+import sys
+
+from PIL import Image
+
+from accounting import ResourceAccounting, ResourceUsage, measure_resources
+
+
+def test_measure_resources_counts_cpu_children_and_pixels():
+    usage = ResourceUsage()
+    image = Image.new("L", (400, 300))
+
+    with measure_resources(usage, image):
+        sum(i * i for i in range(200_000))
+        subprocess.run([sys.executable, "-c", "sum(range(3_000_000))"], check=True)
+
+    assert usage.pixels == 120_000
+    assert usage.cpu_ms > 0
+    assert usage.child_cpu_ms > 0
+    assert usage.peak_rss_kb > 0
+
+
+def test_accounting_groups_by_dimension_with_bounded_keys():
+    accounting = ResourceAccounting(max_keys=2)
+    for document_type in ("rg", "cnh", "cpf", "passport"):
+        usage = ResourceUsage()
+        usage.cpu_ms = 10.0
+        usage.child_cpu_ms = 30.0
+        usage.pixels = 2_000_000
+        accounting.record(usage, endpoint="ocr_upload", document_type=document_type, api_key="tenant-a")
+
+    summary = accounting.summary()
+    assert summary["total"]["requests"] == 4
+    assert summary["by_endpoint"][0]["cpu_ms_per_megapixel"] == 20.0
+    assert {row["document_type"] for row in summary["by_document_type"]} == {"rg", "cnh", "other"}
+    assert summary["by_api_key"] == [dict(api_key="tenant-a", **summary["total"])]
@@ -0,0 +1,81 @@
+import os
+import subprocess
+import sys
+
+from fastapi import Depends, FastAPI
+from fastapi.responses import PlainTextResponse
+from fastapi.testclient import TestClient
+
+from auth import create_api_key
+from auth_fastapi import optional_api_key, rate_limit_headers, require_admin, require_api_key
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+app = FastAPI()
+app.middleware("http")(rate_limit_headers)
+
+
+@app.get("/private")
+async def private(user: dict = Depends(require_api_key)):
+    return {"user_id": user["user_id"]}
+
+
+@app.get("/raw")
+async def raw(user: dict = Depends(require_api_key)):
+    return PlainTextResponse(user["user_id"])
+
+
+@app.get("/optional")
+async def optional(user=Depends(optional_api_key)):
+    return {"user_id": user["user_id"] if user else None}
+
+
+@app.get("/admin", dependencies=[Depends(require_admin)])
+async def admin():
+    return {"ok": True}
+
+
+client = TestClient(app)
+
+
+def test_missing_and_invalid_keys_are_rejected():
+    assert client.get("/private").status_code == 401
+    response = client.get("/private", headers={"X-API-Key": "0" * 40})
+    assert response.status_code == 401
+    assert response.json()["detail"] == "API key inválida"
+
+
+def test_valid_key_gets_rate_limit_headers_then_429():
+    key = create_api_key("fastapi-user", "FastAPI", rate_limit=2)["api_key"]
+
+    responses = [client.get("/private", params={"api_key": key}) for _ in range(3)]
+    assert [r.status_code for r in responses] == [200, 200, 429]
+    assert responses[0].json() == {"user_id": "fastapi-user"}
+    assert responses[0].headers["X-RateLimit-Remaining"] == "1"
+    assert "Retry-After" in responses[2].headers
+
+
+def test_rate_limit_headers_reach_routes_returning_a_response():
+    key = create_api_key("raw-user", "Raw", rate_limit=5)["api_key"]
+    response = client.get("/raw", headers={"X-API-Key": key})
+    assert response.text == "raw-user"
+    assert response.headers["X-RateLimit-Limit"] == "5"
+    assert response.headers["X-RateLimit-Remaining"] == "4"
+
+
+def test_api_key_required_applies_to_both_apps():
+    env = dict(os.environ, API_KEY_REQUIRED="true")
+    code = "import auth_fastapi, main; print(auth_fastapi.API_KEY_REQUIRED, main.create_app().config['API_KEY_REQUIRED'])"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.split()[-2:] == ["True", "True"]
+
+
+def test_optional_key_and_admin_permission():
+    assert client.get("/optional").json() == {"user_id": None}
+    key = create_api_key("reader", "Reader", permissions=["read"])["api_key"]
+    assert client.get("/optional", headers={"X-API-Key": key}).json() == {"user_id": "reader"}
+    assert client.get("/admin", headers={"X-API-Key": key}).status_code == 403
+
+    admin_key = create_api_key("root", "Admin", permissions=["read", "admin"])["api_key"]
+    assert client.get("/admin", headers={"X-API-Key": admin_key}).status_code == 200
@@ -0,0 +1,39 @@
+import asyncio
+import time
+
+from capacity import EventLoopLagMonitor, capacity_report, health_status
+from scheduler import FairShareScheduler
+
+
+def test_event_loop_lag_detects_blocking_code():
+    monitor = EventLoopLagMonitor(interval=0.01)
+
+    async def scenario():
+        monitor.start()
+        await asyncio.sleep(0.05)
+        time.sleep(0.2)  # Código bloqueante no event loop
+        await asyncio.sleep(0.05)
+        await monitor.stop()
+
+    asyncio.run(scenario())
+    stats = monitor.get_stats()
+    assert stats["samples"] > 0
+    assert stats["max"] >= 150
+
+
+def test_capacity_report_uses_worst_signal():
+    scheduler = FairShareScheduler(workers=4)
+    monitor = EventLoopLagMonitor()
+
+    report = capacity_report(scheduler, monitor)
+    assert report["idle_workers"] == 4
+    assert report["utilization"] == 0
+    assert health_status(report) == "healthy"
+    assert health_status(report, ready=False) == "warming_up"
+
+    # Event loop atrasado satura o worker mesmo com as threads de OCR ociosas
+    monitor.samples.extend([0.5, 0.5])
+    report = capacity_report(scheduler, monitor)
+    assert report["event_loop_lag_ms"]["avg"] == 500
+    assert report["saturated"]
+    assert health_status(report) == "saturated"
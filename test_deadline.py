@@ -0,0 +1,164 @@
+import asyncio
+import io
+import os
+import sys
+import threading
+import time
+
+import pytest
+from PIL import Image
+
+import ocr_engines
+import ocr_service
+from deadline import Deadline, DeadlineExceeded, MAX_REQUEST_TIMEOUT, watch_disconnect
+from ocr_service import extract_text_from_image, process_image_ocr, run_tesseract
+
+FAKE_TESSERACT = """#!{python}
+import os, sys, time
+with open(os.environ["FAKE_TESSERACT_PID"], "w") as f:
+    f.write(str(os.getpid()))
+time.sleep(float(os.environ.get("FAKE_TESSERACT_SLEEP", "0")))
+with open(sys.argv[2] + ".txt", "w") as f:
+    f.write("NOME\\nFULANO DE TAL\\n")
+"""
+
+
+@pytest.fixture
+def fake_tesseract(tmp_path, monkeypatch):
+    """Troca o binário do Tesseract por um script que dorme FAKE_TESSERACT_SLEEP segundos"""
+    from pytesseract import pytesseract
+    script = tmp_path / "tesseract"
+    script.write_text(FAKE_TESSERACT.format(python=sys.executable))
+    script.chmod(0o755)
+    pid_file = tmp_path / "pid"
+    monkeypatch.setattr(pytesseract, "tesseract_cmd", str(script))
+    monkeypatch.setenv("FAKE_TESSERACT_PID", str(pid_file))
+    monkeypatch.setattr(ocr_service, "TESSERACT_POLL_INTERVAL", 0.02)
+    return pid_file
+
+
+def _alive(pid):
+    try:
+        os.kill(pid, 0)
+    except ProcessLookupError:
+        return False
+    return True
+
+
+def test_deadline_from_headers():
+    assert Deadline.from_headers({"X-Request-Timeout": "2.5"}).timeout == 2.5
+    assert Deadline.from_headers({"X-Request-Timeout": "abc"}, default=7).timeout == 7
+    assert Deadline.from_headers({}, default=3).timeout == 3
+    assert Deadline.from_headers({"X-Request-Timeout": "99999"}).timeout == MAX_REQUEST_TIMEOUT
+    assert Deadline.from_headers({"X-Request-Timeout": "-1"}).expired()
+
+
+def test_cancel_expires_and_keeps_the_first_reason():
+    deadline = Deadline(60)
+    deadline.cancel()
+    deadline.cancel("timeout")
+    assert deadline.expired() and deadline.remaining() == 0.0
+    with pytest.raises(DeadlineExceeded) as info:
+        deadline.check("word")
+    assert (info.value.reason, info.value.stage) == ("client_disconnected", "word")
+
+
+def test_watch_disconnect_cancels_the_deadline():
+    class Request:
+        checks = 0
+
+        async def is_disconnected(self):
+            self.checks += 1
+            return self.checks >= 2
+
+    deadline = Deadline(60)
+    asyncio.run(watch_disconnect(Request(), deadline, interval=0.01))
+    assert deadline.cancel_reason == "client_disconnected"
+
+
+def test_run_tesseract_reads_the_output(fake_tesseract):
+    text = run_tesseract(Image.new("RGB", (20, 20), "white"), "--psm 6", Deadline(30), "line_by_line")
+    assert text.splitlines() == ["NOME", "FULANO DE TAL"]
+
+
+def test_cancel_kills_the_running_tesseract(fake_tesseract, monkeypatch):
+    monkeypatch.setenv("FAKE_TESSERACT_SLEEP", "30")
+    deadline = Deadline(60)
+    threading.Timer(0.5, deadline.cancel).start()
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded) as info:
+        run_tesseract(Image.new("RGB", (20, 20), "white"), "--psm 6", deadline, "full_page")
+    assert time.perf_counter() - start < 5
+    assert (info.value.reason, info.value.stage) == ("client_disconnected", "full_page")
+    assert not _alive(int(fake_tesseract.read_text()))
+
+
+def test_timeout_kills_the_running_tesseract(fake_tesseract, monkeypatch):
+    monkeypatch.setenv("FAKE_TESSERACT_SLEEP", "30")
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded) as info:
+        run_tesseract(Image.new("RGB", (20, 20), "white"), "--psm 6", Deadline(0.5), "word")
+    assert time.perf_counter() - start < 5
+    assert info.value.reason == "timeout"
+    assert not _alive(int(fake_tesseract.read_text()))
+
+
+def test_later_strategies_are_skipped_after_cancel(fake_tesseract, monkeypatch):
+    calls = []
+    original = ocr_service._run_tesseract_process
+
+    def run_then_cancel(image, config, deadline, stage=None):
+        calls.append(stage)
+        text = original(image, config, deadline, stage)
+        deadline.cancel()
+        return text
+
+    monkeypatch.setattr(ocr_service, "_run_tesseract_process", run_then_cancel)
+    with pytest.raises(DeadlineExceeded) as info:
+        extract_text_from_image(Image.new("RGB", (20, 20), "white"), Deadline(60))
+    assert calls == ["full_page"]
+    assert info.value.stage == "line_by_line"
+
+
+def test_abandoned_request_reports_cpu_spent(monkeypatch):
+    class SlowEngine:
+        def extract(self, image, deadline=None, usage=None, document_type=None):
+            end = time.thread_time() + 0.05
+            while time.thread_time() < end:
+                pass
+            raise DeadlineExceeded("client_disconnected", "full_page")
+
+    with pytest.raises(DeadlineExceeded) as info:
+        process_image_ocr(Image.new("RGB", (20, 20)), Deadline(0))
+    assert info.value.stage == "preprocess"
+
+    monkeypatch.setattr(ocr_engines, "ocr_engine", SlowEngine())
+    with pytest.raises(DeadlineExceeded) as info:
+        process_image_ocr(Image.new("RGB", (20, 20)), Deadline(60))
+    assert info.value.cpu_ms >= 40
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 20), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_flask_expired_deadline_returns_504_and_records_abandoned():
+    from main import create_app
+    from monitoring import api_monitor
+    before = api_monitor.abandoned_by_reason["timeout"]
+    response = create_app().test_client().post(
+        "/ocr/upload", data={"file": (io.BytesIO(_png()), "doc.png")}, headers={"X-Request-Timeout": "0"})
+    assert response.status_code == 504
+    assert api_monitor.abandoned_by_reason["timeout"] == before + 1
+
+
+def test_fastapi_expired_deadline_returns_504_and_disconnect_499():
+    from fastapi.testclient import TestClient
+    from fastapi_server import create_app, deadline_exceeded_error
+    response = TestClient(create_app()).post(
+        "/ocr/upload", files={"file": ("doc.png", _png(), "image/png")}, headers={"X-Request-Timeout": "0"})
+    assert response.status_code == 504
+    assert deadline_exceeded_error(DeadlineExceeded("client_disconnected", "word"), "/ocr/upload").status_code == 499
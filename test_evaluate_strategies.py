@@ -0,0 +1,75 @@
+import json
+import subprocess
+import sys
+
+import evaluate_strategies
+from evaluate_strategies import build_config, choose_strategies, measure_strategies, pareto_frontier
+from ocr_service import STRATEGIES, load_strategy_config, strategies_for
+from synthetic_ids import generate_corpus
+
+
+def _fake_runs(documents):
+    """Saídas simuladas: full_page lê tudo, line_by_line metade, word nada"""
+    return [{
+        "full_page": (document.lines, 50.0),
+        "line_by_line": (document.lines[:len(document.lines) // 2], 10.0),
+        "word": ([], 5.0),
+        "enhanced": (document.lines, 60.0),
+    } for document in documents]
+
+
+def test_measure_strategies_counts_tesseract_cpu_once(monkeypatch):
+    def run_strategy(image, name, config, enhance):
+        # Processo filho que gasta ~0,3 s de CPU, como um Tesseract
+        subprocess.run([sys.executable, "-c",
+                        "import time\nend = time.process_time() + 0.3\nwhile time.process_time() < end: pass"],
+                       check=True)
+        return ["NOME"]
+
+    monkeypatch.setattr(evaluate_strategies, "run_strategy", run_strategy)
+    documents = generate_corpus(1, seed=1, widths=(400,), degraded=False)
+    runs = measure_strategies(documents, STRATEGIES[:1])
+    lines, cpu_ms = runs[0]["full_page"]
+    assert lines == ["NOME"]
+    # Contada duas vezes, a CPU do filho passaria de 600 ms
+    assert 250 <= cpu_ms < 550
+
+
+def test_pareto_frontier_drops_dominated_sets():
+    results = [
+        {"strategies": ["a"], "accuracy": 0.5, "cpu_ms": 10},
+        {"strategies": ["b"], "accuracy": 0.4, "cpu_ms": 20},
+        {"strategies": ["c"], "accuracy": 0.9, "cpu_ms": 30},
+        {"strategies": ["a", "c"], "accuracy": 0.9, "cpu_ms": 40},
+    ]
+    frontier = pareto_frontier(results)
+    assert [r["strategies"] for r in frontier] == [["a"], ["c"]]
+    assert choose_strategies(frontier, 0.8)["strategies"] == ["c"]
+    assert choose_strategies(frontier, 0.3)["strategies"] == ["a"]
+    assert choose_strategies(frontier, 0.99)["strategies"] == ["c"]
+
+
+def test_build_config_picks_cheapest_set_meeting_target():
+    documents = generate_corpus(3, seed=2, widths=(400,), degraded=False)
+    config = build_config(documents, _fake_runs(documents), target_accuracy=0.0)
+    # Acerto 0 é atingido pela estratégia mais barata
+    assert config["strategies"]["default"] == ["word"]
+
+    best = max(r["accuracy"] for r in config["frontier"]["default"])
+    config = build_config(documents, _fake_runs(documents), target_accuracy=best)
+    assert config["strategies"]["default"] == ["full_page"]
+    assert set(config["strategies"]) == {"default", "rg", "cpf", "cnh"}
+    costs = [r["cpu_ms"] for r in config["frontier"]["rg"]]
+    assert costs == sorted(costs)
+
+
+def test_service_loads_strategy_config(tmp_path):
+    path = tmp_path / "strategy_config.json"
+    path.write_text(json.dumps({"strategies": {"rg": ["enhanced", "full_page", "bogus"], "default": ["word"]}}))
+    config = load_strategy_config(str(path))
+
+    # A ordem de execução é sempre a de STRATEGIES
+    assert [s[0] for s in strategies_for("rg", config)] == ["full_page", "enhanced"]
+    assert [s[0] for s in strategies_for("cnh", config)] == ["word"]
+    assert strategies_for("rg", {}) == STRATEGIES
+    assert load_strategy_config(str(tmp_path / "missing.json")) == {}
@@ -0,0 +1,74 @@
+import asyncio
+import base64
+import io
+
+from fastapi.testclient import TestClient
+from PIL import Image
+
+import fastapi_server
+import ocr_engines
+from auth import create_api_key
+from fastapi_server import create_app
+
+
+def _png(mode="RGB"):
+    buffer = io.BytesIO()
+    Image.new(mode, (40, 20), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def test_decode_image_returns_decoded_rgb():
+    image = fastapi_server.decode_image(_png("L"))
+    assert image.mode == "RGB" and image.size == (40, 20)
+    image = fastapi_server.decode_image(_png())
+    # Pixels já decodificados: o escalonador não decodifica nada
+    assert image.im is not None
+
+
+def _running_on_loop():
+    try:
+        asyncio.get_running_loop()
+    except RuntimeError:
+        return False
+    return True
+
+
+def test_images_are_decoded_off_the_event_loop(monkeypatch):
+    on_loop = []
+
+    def decode_image(file_bytes):
+        on_loop.append(_running_on_loop())
+        return Image.open(io.BytesIO(file_bytes)).convert("RGB")
+
+    def process_camera_image(image_data):
+        on_loop.append(_running_on_loop())
+        return Image.open(io.BytesIO(base64.b64decode(image_data))).convert("RGB")
+
+    monkeypatch.setattr(fastapi_server, "decode_image", decode_image)
+    monkeypatch.setattr(fastapi_server, "process_camera_image", process_camera_image)
+    monkeypatch.setattr(ocr_engines, "ocr_engine", ocr_engines.FakeEngine())
+    client = TestClient(create_app())
+
+    response = client.post("/ocr/upload", files={"file": ("doc.png", _png(), "image/png")})
+    assert response.status_code == 200
+    response = client.post("/ocr/camera", json={"image_data": base64.b64encode(_png()).decode()})
+    assert response.status_code == 200
+    assert on_loop == [False, False]
+
+
+def test_metrics_response_carries_rate_limit_headers():
+    key = create_api_key("metrics-reader", "Metrics", rate_limit=7)["api_key"]
+    response = TestClient(create_app()).get("/metrics", headers={"X-API-Key": key})
+    assert response.status_code == 200
+    assert response.headers["X-RateLimit-Limit"] == "7"
+
+
+def test_flight_recorder_runs_off_the_event_loop(monkeypatch):
+    from flight_recorder import flight_recorder
+    on_loop = []
+    monkeypatch.setattr(flight_recorder, "observe", lambda *args, **kwargs: on_loop.append(_running_on_loop()))
+    monkeypatch.setattr(ocr_engines, "ocr_engine", ocr_engines.FakeEngine())
+
+    response = TestClient(create_app()).post("/ocr/upload", files={"file": ("doc.png", _png(), "image/png")})
+    assert response.status_code == 200
+    assert on_loop == [False]
@@ -0,0 +1,48 @@
+from io import BytesIO
+
+from PIL import Image
+
+import replay_captures
+from flight_recorder import FlightRecorder, load_capture
+from profiler import SamplingProfiler
+from tracing import Trace
+
+
+def png_bytes(size=(120, 40)):
+    buffer = BytesIO()
+    Image.new("RGB", size, "white").save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_only_slow_requests_are_captured(tmp_path):
+    recorder = FlightRecorder(threshold_ms=1000, capacity=2, directory=str(tmp_path))
+    settings = {"source": "upload", "document_type": "rg", "compress": False}
+
+    assert recorder.observe(20, "ocr_upload", png_bytes(), settings) is None
+
+    for i in range(3):
+        trace = Trace(f"slow-{i}")
+        trace.add_span("full_page", 0.0, 1.5)
+        recorder.observe(1500 + i, "ocr_upload", png_bytes(), settings, trace=trace, status=200)
+
+    captures = recorder.list_captures()
+    assert [capture["id"] for capture in captures] == ["slow-2", "slow-1"]
+    assert captures[0]["image"]["encrypted"] is False
+    assert captures[0]["stage_timings"]["full_page"] > 0
+    assert sorted(path.name for path in tmp_path.iterdir()) == ["slow-1.json", "slow-2.json"]
+
+
+def test_replay_uses_original_image_matched_by_hash(tmp_path):
+    data = png_bytes()
+    recorder = FlightRecorder(threshold_ms=0, directory=str(tmp_path / "captures"))
+    recorder.observe(3000, "ocr_upload", data, {"source": "upload", "compress": False}, trace=Trace("req-9"))
+    (tmp_path / "images").mkdir()
+    (tmp_path / "images" / "original.png").write_bytes(data)
+
+    capture = load_capture(str(tmp_path / "captures" / "req-9.json"))
+    images = replay_captures.index_images(str(tmp_path / "images"))
+    assert replay_captures.load_input(capture, None, images) == data
+
+    total_ms, timings, profile = replay_captures.replay(capture, data, 2, SamplingProfiler())
+    assert total_ms > 0
+    assert "preprocess" in timings
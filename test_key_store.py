@@ -0,0 +1,88 @@
+import sqlite3
+
+import pytest
+
+from key_store import APIKeyStore, create_key_store
+
+
+def test_stores_only_salted_hashes(tmp_path):
+    path = str(tmp_path / "keys.db")
+    store = APIKeyStore(path)
+    store.create("u1", "User", api_key="a" * 40)
+    store.create("u2", "Other", api_key="b" * 40)
+
+    rows = sqlite3.connect(path).execute("SELECT key_id, salt, key_hash FROM api_keys").fetchall()
+    assert "a" * 40 not in repr(rows) and "b" * 40 not in repr(rows)
+    assert rows[0][1] != rows[1][1]
+    assert store.lookup("b" * 40)["user_id"] == "u2"
+    # Mesmo prefixo (key_id), chave diferente
+    assert store.lookup("a" * 39 + "c") is None
+
+
+def test_keys_survive_restart(tmp_path):
+    path = str(tmp_path / "keys.db")
+    created = APIKeyStore(path).create("u1", "User", permissions=["read", "admin"], weight=2.0)
+
+    key_data = APIKeyStore(path).lookup(created["api_key"])
+    assert key_data["permissions"] == ["read", "admin"]
+    assert key_data["weight"] == 2.0
+    assert key_data["active"]
+
+
+def test_invalid_keys_are_cached(tmp_path):
+    path = str(tmp_path / "keys.db")
+    store = APIKeyStore(path, generation_check=3600)
+    assert store.lookup("c" * 40) is None
+
+    # Criada por outro worker: a entrada negativa vale até a próxima verificação da geração
+    APIKeyStore(path).create("u1", "User", api_key="c" * 40)
+    assert store.lookup("c" * 40) is None
+    store.invalidate()
+    assert store.lookup("c" * 40)["user_id"] == "u1"
+
+
+def test_revoke_reaches_other_workers(tmp_path):
+    path = str(tmp_path / "keys.db")
+    worker_a = APIKeyStore(path, generation_check=0)
+    worker_b = APIKeyStore(path, generation_check=0)
+    created = worker_a.create("u1", "User")
+    assert worker_b.lookup(created["api_key"])["active"]
+
+    assert worker_a.revoke(created["api_key"])
+    assert not worker_b.lookup(created["api_key"])["active"]
+    assert not worker_a.revoke("d" * 40)
+
+
+def test_in_memory_store_has_dev_key():
+    assert create_key_store("").lookup("test_key")["user_id"] == "test_user"
+
+
+def test_generated_keys_retry_on_key_id_conflict(tmp_path, monkeypatch):
+    import key_store
+    store = APIKeyStore(str(tmp_path / "keys.db"))
+    taken = store.create("u1", "User")["api_key"]
+    assert len(taken[:key_store.KEY_ID_LENGTH]) == 32
+
+    # O primeiro valor gerado repete o identificador de uma chave existente
+    values = iter([taken[:key_store.KEY_ID_LENGTH] + "0" * 32, "e" * 64])
+    monkeypatch.setattr(key_store, "new_api_key", lambda: next(values))
+    assert store.create("u2", "Other")["api_key"] == "e" * 64
+    assert store.lookup(taken)["user_id"] == "u1"
+    assert store.lookup("e" * 64)["user_id"] == "u2"
+
+    with pytest.raises(ValueError):
+        store.create("u3", "Explicit", api_key=taken[:key_store.KEY_ID_LENGTH] + "1" * 32)
+
+
+def test_flask_create_api_key_requires_admin():
+    from auth import create_api_key
+    from main import create_app
+    client = create_app().test_client()
+    body = {"user_id": "new-user", "name": "New"}
+
+    reader = create_api_key("keys-reader", "Reader", permissions=["read"])["api_key"]
+    assert client.post("/admin/api-keys", json=body, headers={"X-API-Key": reader}).status_code == 403
+    admin = create_api_key("keys-admin", "Admin", permissions=["read", "admin"])["api_key"]
+    response = client.post("/admin/api-keys", json=body, headers={"X-API-Key": admin})
+    assert response.status_code == 200
+    assert len(response.get_json()["data"]["api_key"]) == 64
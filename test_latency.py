@@ -0,0 +1,72 @@
+import random
+
+from latency import LatencyHistogram, HistogramRing
+
+
+def _exact_percentile(values, q):
+    ordered = sorted(values)
+    rank = max(1, -(-q * len(ordered) // 100))
+    return ordered[int(rank) - 1]
+
+
+def test_percentiles_within_relative_error():
+    rng = random.Random(42)
+    values = [rng.lognormvariate(4, 1) for _ in range(20000)]
+
+    histogram = LatencyHistogram()
+    for value in values:
+        histogram.record(value)
+
+    for q in (50, 95, 99):
+        exact = _exact_percentile(values, q)
+        assert abs(histogram.percentile(q) - exact) / exact < 0.03
+
+
+def test_merge_matches_single_histogram():
+    rng = random.Random(7)
+    values = [rng.uniform(1, 5000) for _ in range(5000)]
+
+    combined = LatencyHistogram()
+    parts = [LatencyHistogram(), LatencyHistogram()]
+    for i, value in enumerate(values):
+        combined.record(value)
+        parts[i % 2].record(value)
+
+    merged = parts[0].copy().merge(parts[1])
+    assert merged.counts == combined.counts
+    assert merged.count == combined.count
+    assert merged.percentiles() == combined.percentiles()
+
+
+def test_serialization_round_trip():
+    histogram = LatencyHistogram()
+    for value in (0.05, 3.0, 250.0, 10_000_000.0):
+        histogram.record(value)
+
+    restored = LatencyHistogram.from_dict(histogram.to_dict())
+    assert restored.counts == histogram.counts
+    assert restored.summary() == histogram.summary()
+
+
+def test_histogram_ring_window():
+    ring = HistogramRing(60, 60)
+    start = 1_700_000_000
+    ring.record(start, 10.0)
+    ring.record(start + 3 * 60, 1000.0)
+
+    assert ring.merged(start + 3 * 60, 60).count == 1
+    assert ring.merged(start + 3 * 60).count == 2
+    assert ring.merged(start + 2 * 3600).count == 0
+
+
+def test_record_corrected_backfills_missing_samples():
+    histogram = LatencyHistogram()
+    histogram.record_corrected(100.0, 10.0)
+    assert histogram.count == 10
+    assert histogram.max == 100.0
+    assert histogram.min >= 10.0 * 0.99
+
+    histogram = LatencyHistogram()
+    histogram.record_corrected(5.0, 10.0)
+    histogram.record_corrected(50.0, 0)
+    assert histogram.count == 2
@@ -0,0 +1,74 @@
+import os
+import sys
+import json
+import time
+import threading
+import subprocess
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"
+    paths = []
+
+    def do_POST(self):
+        body = self.rfile.read(int(self.headers["Content-Length"]))
+        self.paths.append((self.path, self.headers["Content-Type"], body[:20]))
+        time.sleep(0.01)
+        status = 503 if self.path.startswith("/ocr/camera") else 200
+        payload = json.dumps({"text": ["ok"]}).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(payload)))
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def log_message(self, *args):
+        pass
+
+
+def run_generator(tmp_path, *args):
+    server = ThreadingHTTPServer(("127.0.0.1", 0), StubHandler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    output = tmp_path / "load.json"
+    try:
+        result = subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "load_generator.py"),
+                                 "--url", f"http://127.0.0.1:{server.server_port}", "--count", "2",
+                                 "--duration", "1", "--output", str(output), *args],
+                                cwd=ROOT, capture_output=True, text=True, timeout=120)
+    finally:
+        server.shutdown()
+        server.server_close()
+    assert result.returncode == 0, result.stderr[-2000:]
+    return json.loads(output.read_text())
+
+
+def test_open_loop_reports_throughput_and_errors(tmp_path):
+    StubHandler.paths = []
+    report = run_generator(tmp_path, "--rate", "20")
+    assert report["meta"]["mode"] == "open"
+    assert report["requests"] == 20
+    assert report["endpoints"]["upload"]["requests"] == 10
+    assert report["endpoints"]["camera"]["errors"] == {"http_503": 10}
+    assert report["error_rate"] == 0.5
+    assert report["latency_ms"]["p50"] >= 10
+    assert report["corrected_latency_ms"]["count"] == 20
+
+    uploads = [entry for entry in StubHandler.paths if entry[0].startswith("/ocr/upload")]
+    assert uploads[0][0] in ("/ocr/upload?document_type=rg", "/ocr/upload?document_type=cpf")
+    assert uploads[0][1].startswith("multipart/form-data; boundary=")
+    cameras = [entry for entry in StubHandler.paths if entry[0] == "/ocr/camera"]
+    assert cameras[0][2].startswith(b'{"image_data": "dat')
+
+
+def test_closed_loop_corrects_for_coordinated_omission(tmp_path):
+    report = run_generator(tmp_path, "--concurrency", "2", "--endpoint", "upload",
+                           "--expected-interval-ms", "2")
+    assert report["meta"]["mode"] == "closed"
+    assert report["requests"] > 2
+    assert report["errors"] == 0
+    assert report["expected_interval_ms"] == 2
+    # Cada resposta de ~10ms com intervalo esperado de 2ms gera amostras extras
+    assert report["corrected_latency_ms"]["count"] > report["latency_ms"]["count"]
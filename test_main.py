@@ -0,0 +1,36 @@
+import io
+
+from PIL import Image
+
+import ocr_engines
+from auth import create_api_key
+from main import create_app
+
+
+def _png():
+    buffer = io.BytesIO()
+    Image.new("RGB", (40, 20), "white").save(buffer, format="PNG")
+    return buffer.getvalue()
+
+
+def _upload(client, headers=None):
+    return client.post("/ocr/upload", data={"file": (io.BytesIO(_png()), "doc.png")}, headers=headers or {})
+
+
+def test_supplied_api_key_is_verified_when_optional(monkeypatch):
+    monkeypatch.setattr(ocr_engines, "ocr_engine", ocr_engines.FakeEngine())
+    client = create_app().test_client()
+    key = create_api_key("flask-tenant", "Tenant", rate_limit=30)["api_key"]
+
+    # Chave informada: autenticada, com rate limit e cota de unidades da chave
+    response = _upload(client, {"X-API-Key": key})
+    assert response.status_code == 200
+    assert response.headers["X-RateLimit-Limit"] == "30"
+    assert "X-ComputeQuota-Remaining" in response.headers
+
+    assert _upload(client, {"X-API-Key": "bogus"}).status_code == 401
+
+    # Sem chave: requisição anônima
+    response = _upload(client)
+    assert response.status_code == 200
+    assert "X-ComputeQuota-Remaining" not in response.headers
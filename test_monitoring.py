@@ -0,0 +1,135 @@
+import time
+
+from metrics_store import MetricsStore
+from monitoring import APIMonitor, BucketRing, RetainedSeries, SpaceSaving
+from metrics_exporter import generate_metrics
+
+
+def test_bucket_ring_window_totals():
+    ring = BucketRing(60, 24 * 60)
+    start = 1_700_000_000
+
+    ring.add(start, 10.0)
+    ring.add(start + 30, 20.0, error=True)
+    ring.add(start + 2 * 3600, 30.0)
+
+    now = start + 2 * 3600 + 1
+    assert ring.totals(now, 3600) == (1, 0, 30.0)
+    assert ring.totals(now) == (3, 1, 60.0)
+
+
+def test_bucket_ring_reuses_expired_buckets():
+    ring = BucketRing(1, 60)
+    start = 1_700_000_000
+
+    ring.add(start, 5.0)
+    ring.add(start + 60, 7.0)  # Mesmo índice, época seguinte
+
+    assert ring.totals(start + 60) == (1, 0, 7.0)
+
+
+def test_space_saving_keeps_heavy_hitters_bounded():
+    top = SpaceSaving(capacity=10)
+    for i in range(10_000):
+        top.add(f"10.0.{i // 256}.{i % 256}")  # Varredura: cada IP aparece uma vez
+        if i % 4 == 0:
+            top.add("203.0.113.7")
+
+    assert len(top) == 10
+    assert len(top.heap) <= 40
+    ip, count, error = top.top(1)[0]
+    assert ip == "203.0.113.7"
+    assert count - error <= 2500 <= count
+
+
+def test_retained_series_rolls_up_old_days():
+    months = RetainedSeries(12)
+    days = RetainedSeries(3, months, lambda date: date[:7])
+    for date in ("2024-01-30", "2024-01-31", "2024-02-01", "2024-02-02", "2024-02-03"):
+        days.add(date, 2)
+
+    assert [date for date, _ in days.items()] == ["2024-02-01", "2024-02-02", "2024-02-03"]
+    assert months.items() == [("2024-01", 4)]
+
+
+def test_realtime_stats_use_rings():
+    monitor = APIMonitor()
+    for status in (200, 200, 500):
+        monitor.record_request("ocr_upload", status, 12.0, "127.0.0.1")
+
+    realtime = monitor.get_stats()["realtime"]
+    assert realtime["minute_requests"] == 3
+    assert realtime["hourly_requests"] == 3
+    assert realtime["daily_requests"] == 3
+    assert realtime["hourly_error_rate"] == 33.33
+
+
+def test_endpoint_percentiles():
+    monitor = APIMonitor()
+    for duration in range(1, 101):
+        monitor.record_request("ocr_upload", 200, float(duration))
+
+    stats = monitor.get_stats()["general"]
+    assert abs(stats["median_response_time_ms"] - 50) <= 2
+    assert abs(stats["p99_response_time_ms"] - 99) <= 3
+
+    endpoint = monitor.get_detailed_stats()["endpoint_stats"][0]
+    assert endpoint["endpoint"] == "ocr_upload"
+    assert abs(endpoint["p95_response_time_ms"] - 95) <= 3
+
+
+def test_openmetrics_exposition():
+    monitor = APIMonitor()
+    monitor.record_request("ocr_upload", 200, 120.0)
+    monitor.record_request("ocr_upload", 500, 3000.0)
+    monitor.record_abandoned_request("ocr_upload", "timeout", 1500.0)
+
+    text = "".join(generate_metrics(monitor))
+    assert 'ocr_api_requests_total{endpoint="ocr_upload",status="500"} 1' in text
+    assert 'ocr_api_request_duration_seconds_bucket{endpoint="ocr_upload",le="0.25"} 1' in text
+    assert 'ocr_api_request_duration_seconds_bucket{endpoint="ocr_upload",le="+Inf"} 2' in text
+    assert 'ocr_abandoned_requests_total{reason="timeout"} 1' in text
+    assert "ocr_wasted_cpu_seconds_total 1.5" in text
+    assert text.endswith("# EOF\n")
+
+
+def test_rollups_survive_restart(tmp_path):
+    path = str(tmp_path / "metrics.db")
+    monitor = APIMonitor(store=MetricsStore(path), flush_interval=3600)
+    for status in (200, 200, 500):
+        monitor.record_request("ocr_upload", status, 10.0, "127.0.0.1")
+    monitor.flush_rollups()
+    monitor.record_request("ocr_upload", 200, 10.0, "127.0.0.1")  # Ainda não gravada
+
+    # Novo processo: o histórico vem do banco
+    restarted = APIMonitor(store=MetricsStore(path), flush_interval=3600)
+    today = restarted.get_detailed_stats(days=1)["request_history"][-1]
+    assert today["count"] == 3
+    assert monitor.get_detailed_stats(days=1)["request_history"][-1]["count"] == 4
+
+    timeline = restarted.get_request_timeline(time.time() - 3600, time.time())
+    assert timeline[0]["resolution"] == "minute"
+    assert sum(point["requests"] for point in timeline) == 3
+    assert sum(point["errors"] for point in timeline) == 1
+
+
+def test_store_downsamples_long_ranges(tmp_path):
+    store = MetricsStore(str(tmp_path / "metrics.db"))
+    now = time.time()
+    store.write({int(now // 60) * 60 - day * 86400: [1, 0, 5.0] for day in range(60)})
+
+    timeline = store.query(now - 60 * 86400, now, max_points=20)
+    assert timeline[0]["resolution"] == "day"
+    assert len(timeline) <= 20
+    assert sum(point["requests"] for point in timeline) == 60
+
+
+def test_ocr_label_counts_are_bounded(monkeypatch):
+    import monitoring
+    monkeypatch.setattr(monitoring, "OCR_LABELS_MAX_KEYS", 3)
+    monitor = APIMonitor()
+    for i in range(50):
+        monitor.record_ocr_processing(10.0, True, f"lang-{i}", f"type-{i % 2}")
+    assert len(monitor.ocr_by_language) == 4
+    assert monitor.ocr_by_language["other"] == 47
+    assert dict(monitor.ocr_by_document_type) == {"type-0": 25, "type-1": 25}
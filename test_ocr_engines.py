@@ -0,0 +1,81 @@
+import json
+import os
+import random
+import subprocess
+import sys
+import time
+
+import pytest
+from PIL import Image
+
+import ocr_engines
+from deadline import Deadline, DeadlineExceeded
+from ocr_engines import FakeEngine, canned_responses, image_hash, parse_latency
+from ocr_service import process_image_ocr
+from synthetic_ids import generate_corpus
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_parse_latency():
+    rng = random.Random(0)
+    assert parse_latency("25")(rng) == 0.025
+    assert 0.02 <= parse_latency("uniform:20:80")(rng) <= 0.08
+    assert parse_latency("normal:50:10")(rng) >= 0
+    assert parse_latency("lognormal:40:0.5")(rng) > 0
+    assert parse_latency("exponential:0")(rng) == 0
+    for spec in ("fast", "-5", "uniform:20", "gamma:1:2"):
+        with pytest.raises(ValueError):
+            parse_latency(spec)
+
+
+def test_image_hash_ignores_mode_conversion():
+    image = Image.new("L", (40, 20), 200)
+    assert image_hash(image) == image_hash(image.convert("RGB"))
+    assert image_hash(image) != image_hash(Image.new("L", (40, 20), 100))
+
+
+def test_fake_engine_returns_canned_lines_by_hash():
+    document = generate_corpus(1, seed=3)[0]
+    engine = FakeEngine(canned_responses([document]))
+    assert engine.extract(document.image.convert("RGB")) == canned_responses([document])[image_hash(document.image)]
+    default = engine.extract(Image.new("RGB", (10, 10)), document_type="cpf")
+    assert default[0] == "TEXTO SIMULADO" and default[-1] == "Tipo: cpf"
+
+
+def test_fake_engine_injects_failures_and_honours_deadline():
+    assert pytest.raises(RuntimeError, FakeEngine(failure_rate=1.0).extract, Image.new("RGB", (4, 4)))
+
+    start = time.perf_counter()
+    with pytest.raises(DeadlineExceeded) as info:
+        FakeEngine(timeout_rate=1.0).extract(Image.new("RGB", (4, 4)), Deadline(0.05))
+    assert info.value.stage == "fake_ocr"
+    assert 0.04 <= time.perf_counter() - start < 1
+
+    with pytest.raises(DeadlineExceeded):
+        FakeEngine(latency="5000").extract(Image.new("RGB", (4, 4)), Deadline(0.01))
+
+
+def test_fake_engine_throughput_ceiling():
+    # Cada requisição ocupa um worker durante a latência: 4 workers / 50 ms = 80 req/s
+    assert FakeEngine(latency="50").throughput_ceiling(workers=4) == pytest.approx(80)
+    assert FakeEngine(latency="uniform:20:80").throughput_ceiling(workers=2) == pytest.approx(40, rel=0.05)
+    assert FakeEngine().throughput_ceiling() is None
+
+
+def test_process_image_ocr_uses_the_configured_engine(monkeypatch):
+    monkeypatch.setattr(ocr_engines, "ocr_engine", FakeEngine(latency="1"))
+    assert process_image_ocr(Image.new("RGB", (20, 20)))[0] == "TEXTO SIMULADO"
+
+    monkeypatch.setattr(ocr_engines, "ocr_engine", FakeEngine(failure_rate=1.0))
+    assert process_image_ocr(Image.new("RGB", (20, 20)))[0].startswith("Erro ao processar imagem")
+
+
+def test_fake_engine_selected_by_environment(tmp_path):
+    responses = tmp_path / "fake.json"
+    responses.write_text(json.dumps({"abc": ["CPF: 000.000.000-00"]}))
+    env = dict(os.environ, OCR_ENGINE="fake", OCR_FAKE_RESPONSES=str(responses), OCR_FAKE_LATENCY_MS="uniform:1:2")
+    code = "import ocr_engines; e = ocr_engines.ocr_engine; print(e.name, e.responses['abc'][0], e.version())"
+    result = subprocess.run([sys.executable, "-c", code], cwd=ROOT, env=env, capture_output=True, text=True, timeout=60)
+    assert result.returncode == 0, result.stderr
+    assert result.stdout.strip() == "fake CPF: 000.000.000-00 fake latency=uniform:1:2"
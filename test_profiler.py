@@ -0,0 +1,98 @@
+import json
+import threading
+import time
+
+import pytest
+
+from profiler import SamplingProfiler, ProfilerBusy, load_profile
+
+
+def busy_loop(stop):
+    while not stop.is_set():
+        sum(range(1000))
+
+
+def test_profile_captures_running_threads():
+    stop = threading.Event()
+    worker = threading.Thread(target=busy_loop, args=(stop,), name="busy-worker")
+    worker.start()
+    try:
+        profile = SamplingProfiler().profile(0.2, interval=0.005)
+    finally:
+        stop.set()
+        worker.join()
+
+    assert profile.samples_taken > 10
+    collapsed = profile.to_collapsed()
+    busy = [line for line in collapsed.splitlines() if line.startswith("busy-worker;")]
+    assert busy and any("busy_loop (test_profiler.py" in line for line in busy)
+    assert "sampling-profiler" not in collapsed
+
+    document = profile.to_speedscope()
+    names = [frame["name"] for frame in document["shared"]["frames"]]
+    worker_profile = next(p for p in document["profiles"] if p["name"] == "busy-worker")
+    assert len(worker_profile["samples"]) == len(worker_profile["weights"])
+    assert all(index < len(names) for sample in worker_profile["samples"] for index in sample)
+
+
+def test_only_one_session_per_process():
+    profiler = SamplingProfiler()
+    started = threading.Event()
+
+    def run():
+        started.set()
+        profiler.profile(0.3)
+
+    thread = threading.Thread(target=run)
+    thread.start()
+    started.wait()
+    time.sleep(0.05)
+    with pytest.raises(ProfilerBusy):
+        profiler.profile(0.1)
+    thread.join()
+
+
+def test_background_session_writes_results(tmp_path):
+    profiler = SamplingProfiler()
+    profile_id = profiler.start_background(0.2, interval=0.005, directory=str(tmp_path))
+    with pytest.raises(ProfilerBusy):
+        profiler.start_background(0.1, directory=str(tmp_path))
+    assert load_profile(profile_id, directory=str(tmp_path)) is None
+
+    deadline = time.time() + 5
+    while load_profile(profile_id, "speedscope", str(tmp_path)) is None and time.time() < deadline:
+        time.sleep(0.05)
+    assert json.loads(load_profile(profile_id, "speedscope", str(tmp_path)))["profiles"]
+    assert load_profile(profile_id, "collapsed", str(tmp_path))
+    assert load_profile("../etc/passwd", directory=str(tmp_path)) is None
+    # Ao fim da sessão (logo após gravar os arquivos) o profiler fica livre para a próxima
+    while profiler.lock.locked() and time.time() < deadline:
+        time.sleep(0.01)
+    profiler.start_background(0.05, directory=str(tmp_path))
+
+
+def test_flask_profile_endpoint_returns_immediately(tmp_path, monkeypatch):
+    import profiler as profiler_module
+    from auth import create_api_key
+    from main import create_app
+    monkeypatch.setattr(profiler_module, "PROFILER_DIR", str(tmp_path))
+    key = create_api_key("profiler-admin", "Admin", permissions=["read", "admin"])["api_key"]
+    client = create_app().test_client()
+
+    start = time.perf_counter()
+    response = client.post("/admin/profile?seconds=0.3", headers={"X-API-Key": key})
+    assert response.status_code == 202
+    assert time.perf_counter() - start < 0.3
+    result = response.get_json()["result"]
+    # O worker continua atendendo durante a sessão
+    assert client.get("/api/health/live").status_code == 200
+
+    deadline = time.time() + 5
+    while client.get(result, headers={"X-API-Key": key}).status_code == 404 and time.time() < deadline:
+        time.sleep(0.05)
+    response = client.get(result + "?format=speedscope", headers={"X-API-Key": key})
+    assert response.status_code == 200
+    assert response.get_json()["profiles"]
+
+    reader = create_api_key("profiler-reader", "Reader", permissions=["read"])["api_key"]
+    assert client.post("/admin/profile", headers={"X-API-Key": reader}).status_code == 403
@@ -0,0 +1,28 @@
+import pytest
+from PIL import Image
+
+from accounting import ResourceUsage
+from quota import ComputeQuota, ComputeQuotaExceeded
+from rate_limiter import RateLimiter
+
+
+def test_compute_quota_reserves_estimate_and_settles_actual_cost():
+    quota = ComputeQuota(RateLimiter(), units_per_request=8)
+    scan = Image.new("L", (2000, 2500))  # 5 MP × 4 estratégias = 20 unidades
+    assert quota.estimate(scan) == 20.0
+    assert quota.job_cost(quota.estimate(scan)) == 2.5
+
+    # rate_limit 10 => 80 unidades por minuto: 4 digitalizações grandes cabem
+    for _ in range(4):
+        reservation = quota.reserve("tenant", 10, quota.estimate(scan))
+    assert reservation.result.remaining == 0
+    with pytest.raises(ComputeQuotaExceeded) as excinfo:
+        quota.reserve("tenant", 10, quota.estimate(scan))
+    assert excinfo.value.result.headers(prefix="X-ComputeQuota")["X-ComputeQuota-Limit"] == "80"
+
+    # O OCR só rodou 1 das 4 estratégias: as unidades não usadas voltam para a cota
+    usage = ResourceUsage()
+    usage.pixels = 5_000_000
+    usage.strategies = 1
+    assert quota.settle(reservation, usage) == 5.0
+    assert quota.reserve("tenant", 10, 15.0).result.remaining == 0
@@ -0,0 +1,41 @@
+from rate_limiter import MemoryRateLimitStore, RateLimiter, SQLiteRateLimitStore, gcra
+
+
+def test_gcra_allows_burst_then_paces_requests():
+    tat = None
+    results = []
+    for _ in range(4):
+        new_tat, result = gcra(tat, 1000.0, limit=3, window=60)
+        tat = new_tat if new_tat is not None else tat
+        results.append(result)
+
+    assert [r.allowed for r in results] == [True, True, True, False]
+    assert [r.remaining for r in results] == [2, 1, 0, 0]
+    denied = results[-1]
+    assert denied.retry_after == 20.0
+    assert denied.reset_at == 1060.0
+    assert denied.headers()["Retry-After"] == "20"
+
+    # Uma requisição volta a ser aceita depois do intervalo de emissão
+    _, result = gcra(tat, 1020.0, limit=3, window=60)
+    assert result.allowed and result.remaining == 0
+
+
+def test_sqlite_store_is_shared_between_limiters(tmp_path):
+    path = str(tmp_path / "limits.db")
+    worker_a = RateLimiter(SQLiteRateLimitStore(path))
+    worker_b = RateLimiter(SQLiteRateLimitStore(path))
+
+    decisions = [limiter.check("key", limit=4).allowed for limiter in (worker_a, worker_b) * 3]
+    assert decisions.count(True) == 4
+
+
+def test_idle_keys_are_evicted():
+    store = MemoryRateLimitStore(sweep_interval=10)
+    for i in range(100):
+        store.check(f"scanner-{i}", 5, 60, now=1000.0)
+    assert len(store) == 100
+
+    store.check("active", 5, 60, now=1100.0)
+    assert len(store) == 1
+
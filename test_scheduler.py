@@ -0,0 +1,103 @@
+import time
+import threading
+
+from scheduler import FairShareScheduler
+
+
+def _blocked_scheduler(workers=1):
+    """Cria um escalonador com os workers ocupados até a liberação do evento"""
+    scheduler = FairShareScheduler(workers=workers)
+    gate = threading.Event()
+    blockers = [scheduler.submit("blocker", gate.wait) for _ in range(workers)]
+    return scheduler, gate, blockers
+
+
+def test_interactive_key_is_not_starved_by_bulk_key():
+    scheduler, gate, blockers = _blocked_scheduler()
+    order = []
+
+    bulk = [scheduler.submit("bulk", order.append, "bulk") for _ in range(20)]
+    interactive = scheduler.submit("interactive", order.append, "interactive")
+
+    gate.set()
+    for future in blockers + bulk + [interactive]:
+        future.result(timeout=5)
+
+    assert order.index("interactive") <= 1
+
+
+def test_weights_split_capacity():
+    scheduler, gate, blockers = _blocked_scheduler()
+    order = []
+
+    futures = []
+    for _ in range(30):
+        futures.append(scheduler.submit("heavy", order.append, "heavy", weight=2))
+        futures.append(scheduler.submit("light", order.append, "light", weight=1))
+
+    gate.set()
+    for future in blockers + futures:
+        future.result(timeout=5)
+
+    first = order[:30]
+    assert first.count("heavy") == 20
+    assert first.count("light") == 10
+
+
+def test_max_concurrency_per_key():
+    scheduler = FairShareScheduler(workers=4)
+    lock = threading.Lock()
+    state = {"running": 0, "peak": 0}
+    release = threading.Event()
+
+    def job():
+        with lock:
+            state["running"] += 1
+            state["peak"] = max(state["peak"], state["running"])
+        release.wait(timeout=0.05)
+        with lock:
+            state["running"] -= 1
+
+    futures = [scheduler.submit("capped", job, max_concurrency=2) for _ in range(8)]
+    for future in futures:
+        future.result(timeout=5)
+
+    assert state["peak"] <= 2
+
+
+def test_exceptions_are_propagated():
+    scheduler = FairShareScheduler(workers=1)
+
+    def fail():
+        raise ValueError("falha")
+
+    future = scheduler.submit("key", fail)
+    try:
+        future.result(timeout=5)
+    except ValueError as e:
+        assert str(e) == "falha"
+    else:
+        raise AssertionError("exceção não propagada")
+
+
+def test_stats_report_capacity():
+    scheduler, gate, blockers = _blocked_scheduler(workers=2)
+    deadline = time.time() + 5
+    while scheduler.get_stats()["running"] < 2 and time.time() < deadline:
+        time.sleep(0.001)
+    queued = [scheduler.submit("client", lambda: None) for _ in range(2)]
+    time.sleep(0.02)
+
+    stats = scheduler.get_stats()
+    assert stats["running"] == 2
+    assert stats["idle"] == 0
+    assert stats["queued"] == 2
+    assert stats["utilization"] == 2.0
+    assert stats["oldest_queued_ms"] >= 10
+
+    gate.set()
+    for future in blockers + queued:
+        future.result(timeout=5)
+    stats = scheduler.get_stats()
+    assert stats["queue_delay_ms"]["samples"] == 4
+    assert stats["queue_delay_ms"]["max"] >= 10
@@ -0,0 +1,53 @@
+from io import BytesIO
+
+from fastapi import Depends, FastAPI, UploadFile
+from fastapi.testclient import TestClient
+from PIL import Image
+
+from monitoring import APIMonitor
+import security_fastapi
+from security_fastapi import RequestMonitoringMiddleware, SecurityHeadersMiddleware, validate_file_upload
+
+app = FastAPI()
+app.add_middleware(SecurityHeadersMiddleware, max_content_length=1024)
+app.add_middleware(RequestMonitoringMiddleware)
+
+
+@app.post("/upload/{kind}")
+async def upload(kind: str, file: UploadFile = Depends(validate_file_upload)):
+    return {"filename": file.filename}
+
+
+client = TestClient(app)
+
+
+def png_bytes():
+    buffer = BytesIO()
+    Image.new("RGB", (10, 10)).save(buffer, "PNG")
+    return buffer.getvalue()
+
+
+def test_upload_validation_and_security_headers():
+    response = client.post("/upload/doc", files={"file": ("doc.png", png_bytes(), "image/png")})
+    assert response.status_code == 200
+    assert response.headers["X-Content-Type-Options"] == "nosniff"
+
+    response = client.post("/upload/doc", files={"file": ("doc.exe", b"MZ", "application/octet-stream")})
+    assert response.status_code == 400
+    response = client.post("/upload/doc", files={"file": ("doc.png", b"not an image", "image/png")})
+    assert response.status_code == 400
+    assert response.json()["detail"] == "Arquivo enviado não é uma imagem válida"
+
+
+def test_oversized_body_is_rejected_before_reading(monkeypatch):
+    monitor = APIMonitor()
+    monkeypatch.setattr(security_fastapi, "api_monitor", monitor)
+
+    response = client.post("/upload/doc", content=b"x" * 2048, headers={"content-type": "application/octet-stream"})
+    assert response.status_code == 413
+    assert response.headers["Strict-Transport-Security"].startswith("max-age")
+
+    # Requisições são agregadas pelo caminho da rota, não pela URL
+    client.post("/upload/a", files={"file": ("doc.png", png_bytes(), "image/png")})
+    client.post("/upload/b", files={"file": ("doc.png", png_bytes(), "image/png")})
+    assert monitor.get_stats()["endpoints"]["endpoint_counts"] == {"unknown": 1, "/upload/{kind}": 2}
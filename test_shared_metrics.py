@@ -0,0 +1,31 @@
+import multiprocessing
+
+from shared_metrics import SharedMetrics
+
+
+def _worker(path, requests):
+    shared = SharedMetrics(path, slots=8)
+    for i in range(requests):
+        shared.record_request(200 if i % 5 else 503, float(i + 1))
+    shared.record_ocr(250.0, True)
+    shared.record_abandoned(12.5)
+
+
+def test_slots_are_merged_across_processes(tmp_path):
+    path = str(tmp_path / "metrics")
+    context = multiprocessing.get_context("fork")
+    processes = [context.Process(target=_worker, args=(path, 50)) for _ in range(3)]
+    for process in processes:
+        process.start()
+    for process in processes:
+        process.join()
+        assert process.exitcode == 0
+
+    merged = SharedMetrics(path, slots=8).merged()
+    assert merged["total_requests"] == 150
+    assert merged["status_5xx"] == 30
+    assert merged["ocr_requests"] == 3
+    assert merged["wasted_cpu_us"] == 3 * 12500
+    assert merged["request_latency"].count == 150
+    assert abs(merged["request_latency"].percentile(50) - 25) <= 1
+    assert merged["request_latency"].max == 50.0
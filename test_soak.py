@@ -0,0 +1,58 @@
+import os
+import sys
+import json
+import subprocess
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.join(ROOT, "benchmarks"))
+
+from soak_test import ClientIPApp, check_growth, growth_per_request
+
+
+def test_growth_per_request_is_the_least_squares_slope():
+    samples = [{"requests": n, "traced_kb": 100 + n // 1024} for n in (0, 1024, 2048, 4096)]
+    assert abs(growth_per_request(samples, "traced_kb") - 1.0) < 1e-9
+    assert growth_per_request(samples[:1], "traced_kb") == 0.0
+    assert growth_per_request(samples, "rss_kb") == 0.0
+
+
+def test_check_growth_reports_exceeded_limits():
+    report = {"traced_growth_bytes_per_request": 80.0, "rss_growth_bytes_per_request": 100.0}
+    failures = check_growth(report, max_traced_growth=64, max_rss_growth=512)
+    assert len(failures) == 1 and "rastreada" in failures[0]
+    report["traced_growth_bytes_per_request"] = None
+    assert check_growth(report, 64, 50) == ["RSS cresce 100.0 bytes/requisição (limite 50)"]
+
+
+def test_soak_run_with_fake_engine(tmp_path):
+    output = tmp_path / "soak.json"
+    env = dict(os.environ, WARMUP_ENABLED="false")
+    result = subprocess.run([sys.executable, os.path.join(ROOT, "benchmarks", "soak_test.py"),
+                             "--requests", "120", "--warmup", "40", "--sample-every", "40", "--count", "2",
+                             "--clean", "--bad-key-fraction", "0.2", "--max-rss-growth", "1e9",
+                             "--max-traced-growth", "1e9", "--output", str(output)],
+                            cwd=ROOT, env=env, capture_output=True, text=True, timeout=300)
+    assert result.returncode == 0, result.stderr[-2000:]
+    report = json.loads(output.read_text())
+    assert report["requests"] == 120
+    assert sum(report["statuses"].values()) == 160
+    assert [sample["requests"] for sample in report["samples"]] == [0, 40, 80, 120]
+    assert all("traced_kb" in sample for sample in report["samples"])
+    assert report["meta"]["engine"].startswith("fake")
+    assert report["failures"] == []
+    # API keys inválidas chegam ao caminho de erro da autenticação
+    assert report["statuses"].get("401", 0) > 0
+
+
+def test_fastapi_client_ip_is_set_per_request():
+    from fastapi.testclient import TestClient
+    from fastapi_server import create_app
+    from monitoring import api_monitor
+
+    app = ClientIPApp(create_app())
+    client = TestClient(app)
+    for ip in ("10.9.8.1", "10.9.8.2", "10.9.8.2"):
+        app.client_ip = ip
+        client.get("/api/health/live")
+    counts = {entry["ip"]: entry["count"] for entry in api_monitor.get_top_clients(100)}
+    assert counts.get("10.9.8.1", 0) >= 1 and counts.get("10.9.8.2", 0) >= 2
@@ -0,0 +1,38 @@
+import os
+import re
+import subprocess
+import sys
+
+# Orçamento de tempo de importação (ms) para criar cada app em um processo novo
+STARTUP_IMPORT_BUDGET_MS = float(os.environ.get("STARTUP_IMPORT_BUDGET_MS", 2500))
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def import_times(code):
+    """Tempo cumulativo (ms) por módulo importado ao executar code com -X importtime"""
+    # O aquecimento do worker roda depois, em segundo plano, e não entra na medida
+    env = dict(os.environ, WARMUP_ENABLED="false")
+    result = subprocess.run([sys.executable, "-X", "importtime", "-c", code],
+                            cwd=ROOT, env=env, capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr[-2000:]
+    times = {}
+    for line in result.stderr.splitlines():
+        match = re.match(r"import time:\s+\d+ \|\s+(\d+) \|( *)(\S+)$", line)
+        if match:
+            times[match.group(3)] = int(match.group(1)) / 1000
+    return times
+
+
+def test_flask_app_does_not_import_fastapi_or_tesseract():
+    times = import_times("import main; main.create_app()")
+    for module in ("fastapi", "fastapi_server", "pytesseract", "numpy"):
+        assert module not in times
+    assert times["main"] < STARTUP_IMPORT_BUDGET_MS
+
+
+def test_fastapi_app_does_not_import_flask_or_tesseract():
+    times = import_times("import asgi")
+    for module in ("flask", "werkzeug", "main", "pytesseract", "numpy"):
+        assert module not in times
+    assert times["asgi"] < STARTUP_IMPORT_BUDGET_MS
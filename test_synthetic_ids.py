@@ -0,0 +1,91 @@
+import json
+import os
+import subprocess
+import sys
+
+from synthetic_ids import cpf_check_digits, extracted_fields, generate_corpus, score_fields
+
+ROOT = os.path.dirname(os.path.abspath(__file__))
+
+
+def test_corpus_is_deterministic():
+    first = generate_corpus(3, seed=7, widths=(400,))
+    second = generate_corpus(3, seed=7, widths=(400,))
+    assert [d.fields for d in first] == [d.fields for d in second]
+    assert [d.params for d in first] == [d.params for d in second]
+    assert all(a.image.tobytes() == b.image.tobytes() for a, b in zip(first, second))
+    assert [d.doc_type for d in first] == ["rg", "cpf", "cnh"]
+    assert generate_corpus(1, seed=8, widths=(400,))[0].fields != first[0].fields
+
+
+def test_generated_cpf_is_valid():
+    for document in generate_corpus(3, seed=1, widths=(400,), degraded=False):
+        digits = [int(c) for c in document.fields["cpf"] if c.isdigit()]
+        assert cpf_check_digits(digits[:9]) == digits[9:]
+        assert document.fields["cpf"] in document.lines
+
+
+def test_score_fields():
+    document = generate_corpus(1, seed=3, widths=(400,), degraded=False)[0]
+    fields = document.fields
+    output = [
+        "TIPO DE DOCUMENTO: Carteira de Identidade (RG)",
+        f"NOME: {fields['nome'].title()}",
+        f"DATA DE NASCIMENTO: {fields['data_nascimento']}",
+        "FILIAÇÃO:",
+        *[f"   {i + 1}. {parent.title()}" for i, parent in enumerate(fields["filiacao"])],
+        f"CPF: {fields['cpf'].replace('.', '').replace('-', '')}",
+    ]
+    assert extracted_fields(output)["filiacao"] == [p.title() for p in fields["filiacao"]]
+    assert score_fields(document, output) == {
+        "nome": True, "data_nascimento": True, "cpf": True, "naturalidade": False, "filiacao": True
+    }
+
+
+def test_benchmark_compares_with_baseline(tmp_path):
+    output = tmp_path / "bench.json"
+    command = [sys.executable, os.path.join(ROOT, "benchmarks", "ocr_benchmark.py"), "--count", "3",
+               "--widths", "400", "--stages", "preprocess,process_document_data"]
+    result = subprocess.run(command + ["--output", str(output)], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stderr
+
+    data = json.loads(output.read_text())
+    assert data["stages"]["preprocess"]["count"] == 3
+    assert 0 <= data["stages"]["process_document_data"]["accuracy"]["overall"] <= 1
+
+    # Um baseline com acerto maior é uma regressão
+    data["stages"]["process_document_data"]["accuracy"]["overall"] = 1.1
+    data["stages"]["preprocess"]["latency_ms"]["p50"] = 1e6
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(data))
+    result = subprocess.run(command + ["--baseline", str(baseline)], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 1
+    assert "REGRESSÃO: process_document_data" in result.stdout
+    assert "REGRESSÃO: preprocess" not in result.stdout
+
+
+def test_benchmark_reports_stages_that_now_fail_or_are_missing(tmp_path):
+    output = tmp_path / "bench.json"
+    command = [sys.executable, os.path.join(ROOT, "benchmarks", "ocr_benchmark.py"), "--count", "2",
+               "--widths", "400", "--stages", "preprocess,broken", "--latency-tolerance", "100"]
+    result = subprocess.run(command + ["--output", str(output)], capture_output=True, text=True, timeout=120)
+    # Etapa desconhecida: erro no resultado, sem baseline não é regressão
+    assert result.returncode == 0, result.stderr
+    data = json.loads(output.read_text())
+    assert data["stages"]["broken"]["errors"] == 1
+
+    # Já falhava no baseline: não é comparada
+    baseline = tmp_path / "baseline.json"
+    baseline.write_text(json.dumps(data))
+    result = subprocess.run(command + ["--baseline", str(baseline)], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 0, result.stdout
+
+    # Funcionava no baseline e agora falha; process_document_data não foi executada
+    data["stages"]["broken"] = dict(data["stages"]["preprocess"])
+    data["stages"]["process_document_data"] = dict(data["stages"]["preprocess"])
+    baseline.write_text(json.dumps(data))
+    result = subprocess.run(command + ["--baseline", str(baseline)], capture_output=True, text=True, timeout=120)
+    assert result.returncode == 1
+    assert "REGRESSÃO: broken" in result.stdout
+    assert "REGRESSÃO: process_document_data" in result.stdout
+    assert "REGRESSÃO: preprocess" not in result.stdout
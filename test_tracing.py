@@ -0,0 +1,89 @@
+import time
+
+from scheduler import FairShareScheduler
+from tracing import Trace, TraceStore, start_trace, end_trace, current_trace, span, sanitize_request_id
+
+
+def test_span_records_into_current_trace():
+    trace, token = start_trace("req-1", "ocr_upload")
+    try:
+        with span("decode"):
+            time.sleep(0.002)
+        with span("full_page"):
+            pass
+        with span("full_page"):
+            pass
+    finally:
+        end_trace(token)
+
+    assert current_trace() is None
+    timings = trace.stage_timings()
+    assert list(timings) == ["decode", "full_page"]
+    assert timings["decode"] >= 1.0
+
+    header = trace.server_timing_header(12.5)
+    assert header.startswith("decode;dur=")
+    assert header.endswith("total;dur=12.5")
+
+
+def test_chrome_trace_export():
+    trace = Trace("req-2", "ocr_camera")
+    now = time.perf_counter()
+    trace.add_span("preprocess", now, now + 0.01, strategy="full_page")
+
+    document = trace.to_chrome_trace()
+    event = document["traceEvents"][0]
+    assert event["ph"] == "X"
+    assert event["name"] == "preprocess"
+    assert abs(event["dur"] - 10000) < 1
+    assert event["args"] == {"strategy": "full_page"}
+    assert document["otherData"]["request_id"] == "req-2"
+
+
+def test_trace_propagates_to_scheduler_threads():
+    scheduler = FairShareScheduler(workers=2)
+
+    def job():
+        with span("tesseract"):
+            pass
+        return current_trace()
+
+    trace, token = start_trace()
+    try:
+        assert scheduler.run("client", job) is trace
+    finally:
+        end_trace(token)
+
+    assert set(trace.stage_timings()) == {"queue", "tesseract"}
+
+
+def test_trace_store_is_bounded():
+    store = TraceStore(capacity=2)
+    traces = [Trace(f"req-{i}") for i in range(3)]
+    for trace in traces:
+        store.add(trace)
+
+    assert store.get("req-0") is None
+    assert store.get("req-2") is traces[2]
+
+
+def test_sanitize_request_id():
+    assert sanitize_request_id("abc-123_x.y") == "abc-123_x.y"
+    assert sanitize_request_id("bad id\r\n") is None
+    assert sanitize_request_id("x" * 65) is None
+    assert sanitize_request_id(None) is None
+
+
+def test_client_request_id_is_echoed_but_never_used_as_the_trace_key():
+    from main import create_app
+    from tracing import recent_traces
+    client = create_app().test_client()
+    first = client.get("/api/health/live", headers={"X-Request-ID": "client-1"})
+    second = client.get("/api/health/live", headers={"X-Request-ID": "client-1"})
+
+    ids = {first.headers["X-Request-ID"], second.headers["X-Request-ID"]}
+    assert len(ids) == 2 and "client-1" not in ids
+    assert first.headers["X-Client-Request-ID"] == "client-1"
+    trace = recent_traces.get(first.headers["X-Request-ID"])
+    assert trace.client_request_id == "client-1"
+    assert trace.to_chrome_trace()["otherData"]["client_request_id"] == "client-1"
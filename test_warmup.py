@@ -0,0 +1,28 @@
+from warmup import Warmup, synthetic_document
+
+
+def test_synthetic_document_has_text():
+    image = synthetic_document()
+    assert image.mode == "RGB"
+    # Há pixels escuros (texto) sobre o fundo branco
+    assert image.convert("L").getextrema()[0] < 128
+
+
+def test_warmup_becomes_ready_after_run():
+    warmup = Warmup(languages=["por"])
+    assert not warmup.ready
+    assert warmup.status()["ready"] is False
+
+    warmup.start()
+    assert warmup.wait(60)
+    state = warmup.status()
+    assert state["ready"] is True
+    assert state["duration_ms"] is not None
+    # Um segundo start no mesmo processo não aquece de novo
+    assert warmup.start() is warmup._thread
+
+
+def test_disabled_warmup_is_ready_immediately():
+    warmup = Warmup(enabled=False)
+    assert warmup.ready
+    assert warmup.start() is None
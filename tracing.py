@@ -0,0 +1,204 @@
+import os
+import re
+import time
+import uuid
+import logging
+import threading
+import contextvars
+from collections import OrderedDict
+from contextlib import contextmanager
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Número de traces recentes mantidos para exportação
+TRACE_BUFFER_SIZE = int(os.environ.get("TRACE_BUFFER_SIZE", 200))
+
+# Formato aceito para o header X-Request-ID enviado pelo cliente
+_REQUEST_ID_PATTERN = re.compile(r"^[A-Za-z0-9._-]{1,64}$")
+
+# Trace da requisição em andamento (propagado para as threads do escalonador)
+_current_trace = contextvars.ContextVar("ocr_trace", default=None)
+
+
+class Trace:
+    """
+    Spans (etapas cronometradas) de uma requisição
+
+    Os spans são registrados por span() e podem ser exportados como header
+    Server-Timing ou como JSON no formato Chrome Trace (chrome://tracing,
+    Perfetto, speedscope).
+    """
+
+    def __init__(self, request_id=None, name=None, client_request_id=None):
+        """
+        Args:
+            request_id: Identificador da requisição (gerado se omitido); é a
+                chave do trace e das capturas, então nunca vem do cliente
+            name: Nome da requisição (ex: endpoint)
+            client_request_id: X-Request-ID enviado pelo cliente, apenas registrado e devolvido
+        """
+        self.request_id = request_id or uuid.uuid4().hex
+        self.name = name
+        self.client_request_id = client_request_id
+        self.started_at = time.time()
+        self._origin = time.perf_counter()
+        self.spans = []
+        self.lock = threading.Lock()
+
+    def add_span(self, name, start, end, **args):
+        """
+        Registra um span
+
+        Args:
+            name: Nome da etapa
+            start: Início (time.perf_counter())
+            end: Fim (time.perf_counter())
+            args: Atributos adicionais exportados no Chrome Trace
+        """
+        with self.lock:
+            self.spans.append((name, start - self._origin, end - start, threading.get_ident(), args))
+
+    def stage_timings(self):
+        """
+        Duração total de cada etapa, em milissegundos
+
+        Returns:
+            dict: {etapa: duração em ms}, na ordem de primeira ocorrência
+        """
+        timings = {}
+        with self.lock:
+            for name, _, duration, _, _ in self.spans:
+                timings[name] = timings.get(name, 0.0) + duration * 1000
+        return timings
+
+    def server_timing_header(self, total_ms=None):
+        """
+        Formata as etapas como valor do header Server-Timing
+
+        Args:
+            total_ms: Duração total da requisição (opcional)
+
+        Returns:
+            str: Ex: "preprocess;dur=12.3, full_page;dur=840.1, total;dur=900.0"
+        """
+        entries = [f"{name};dur={duration:.1f}" for name, duration in self.stage_timings().items()]
+        if total_ms is not None:
+            entries.append(f"total;dur={total_ms:.1f}")
+        return ", ".join(entries)
+
+    def to_chrome_trace(self):
+        """
+        Exporta os spans no formato Chrome Trace (eventos completos, ph=X)
+
+        Returns:
+            dict: Documento JSON do trace
+        """
+        pid = os.getpid()
+        with self.lock:
+            events = [
+                {
+                    "name": name,
+                    "ph": "X",
+                    "ts": round(offset * 1e6, 1),
+                    "dur": round(duration * 1e6, 1),
+                    "pid": pid,
+                    "tid": thread_id,
+                    "args": args
+                }
+                for name, offset, duration, thread_id, args in self.spans
+            ]
+        return {
+            "traceEvents": events,
+            "displayTimeUnit": "ms",
+            "otherData": {
+                "request_id": self.request_id,
+                "client_request_id": self.client_request_id,
+                "name": self.name,
+                "started_at": self.started_at
+            }
+        }
+
+
+class TraceStore:
+    """Buffer circular com os traces das requisições mais recentes"""
+
+    def __init__(self, capacity=TRACE_BUFFER_SIZE):
+        self.capacity = capacity
+        self.traces = OrderedDict()
+        self.lock = threading.Lock()
+
+    def add(self, trace):
+        """Armazena um trace, descartando o mais antigo se necessário"""
+        with self.lock:
+            self.traces[trace.request_id] = trace
+            while len(self.traces) > self.capacity:
+                self.traces.popitem(last=False)
+
+    def get(self, request_id):
+        """Retorna o trace da requisição ou None"""
+        with self.lock:
+            return self.traces.get(request_id)
+
+
+def sanitize_request_id(value):
+    """Retorna o X-Request-ID do cliente se for válido, senão None"""
+    if value and _REQUEST_ID_PATTERN.match(value):
+        return value
+    return None
+
+
+def start_trace(request_id=None, name=None, client_request_id=None):
+    """
+    Inicia o trace da requisição atual
+
+    Args:
+        request_id: Identificador interno (gerado se omitido)
+        name: Nome da requisição (ex: endpoint)
+        client_request_id: X-Request-ID do cliente (ver sanitize_request_id)
+
+    Returns:
+        tuple: (Trace, token para end_trace)
+    """
+    trace = Trace(request_id, name, client_request_id)
+    return trace, _current_trace.set(trace)
+
+
+def end_trace(token):
+    """Encerra o trace iniciado com start_trace"""
+    try:
+        _current_trace.reset(token)
+    except ValueError:
+        # Token criado em outro contexto: apenas remove o trace atual
+        _current_trace.set(None)
+
+
+def current_trace():
+    """Trace da requisição atual ou None"""
+    return _current_trace.get()
+
+
+@contextmanager
+def span(name, **args):
+    """
+    Cronometra um bloco como uma etapa do trace atual
+
+    Sem trace ativo (ex: scripts, testes) não faz nada.
+
+    Args:
+        name: Nome da etapa
+        args: Atributos adicionais do span
+    """
+    trace = _current_trace.get()
+    if trace is None:
+        yield
+        return
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        trace.add_span(name, start, time.perf_counter(), **args)
+
+
+# Traces recentes, consultáveis por request_id
+recent_traces = TraceStore()
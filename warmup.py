@@ -0,0 +1,145 @@
+import os
+import time
+import logging
+import threading
+
+from PIL import Image, ImageDraw, ImageFont
+
+import ocr_engines
+from ocr_service import process_image_ocr
+
+# Configuração de logging
+logger = logging.getLogger(__name__)
+
+# Executar o aquecimento ao iniciar cada worker (false = worker pronto imediatamente)
+WARMUP_ENABLED = os.environ.get("WARMUP_ENABLED", "true").lower() == "true"
+# Idiomas do Tesseract carregados no aquecimento (separados por vírgula)
+WARMUP_LANGUAGES = [lang.strip() for lang in os.environ.get("WARMUP_LANGUAGES", "por").split(",") if lang.strip()]
+
+# Linhas do documento sintético (layout parecido com um RG)
+SYNTHETIC_DOCUMENT_LINES = [
+    "REPUBLICA FEDERATIVA DO BRASIL",
+    "CARTEIRA DE IDENTIDADE",
+    "NOME: MARIA DA SILVA",
+    "DATA DE NASCIMENTO: 01/01/1990",
+    "CPF: 123.456.789-09",
+]
+
+
+def synthetic_document(width=1000, height=600):
+    """
+    Gera a imagem de um documento sintético para o aquecimento
+
+    Returns:
+        PIL.Image: Documento RGB com texto preto sobre fundo branco
+    """
+    image = Image.new("RGB", (width, height), "white")
+    draw = ImageDraw.Draw(image)
+    try:
+        font = ImageFont.load_default(size=36)
+    except TypeError:
+        # Pillow < 10.1 só tem a fonte bitmap sem tamanho
+        font = ImageFont.load_default()
+    y = 40
+    for line in SYNTHETIC_DOCUMENT_LINES:
+        draw.text((40, y), line, fill="black", font=font)
+        y += height // (len(SYNTHETIC_DOCUMENT_LINES) + 1)
+    return image
+
+
+class Warmup:
+    """
+    Aquecimento do worker antes de receber tráfego
+
+    Executa o documento sintético pelo pipeline completo de OCR
+    (process_image_ocr) e uma passada do Tesseract para cada idioma
+    configurado, carregando os modelos, os codecs do PIL e o cache de
+    páginas. O worker fica pronto (readiness) quando o aquecimento termina,
+    mesmo com erro: o erro é informado no estado, e um worker sem Tesseract
+    continua atendendo as demais rotas.
+    """
+
+    def __init__(self, languages=None, enabled=WARMUP_ENABLED):
+        """
+        Args:
+            languages: Idiomas do Tesseract (padrão: WARMUP_LANGUAGES)
+            enabled: False marca o worker como pronto sem aquecer
+        """
+        self.languages = list(languages) if languages is not None else list(WARMUP_LANGUAGES)
+        self.enabled = enabled
+        self._lock = threading.Lock()
+        self._done = threading.Event()
+        self._pid = None
+        self._thread = None
+        self.started_at = None
+        self.duration_ms = None
+        self.errors = []
+
+    @property
+    def ready(self):
+        """True quando o worker pode receber tráfego"""
+        return not self.enabled or self._done.is_set()
+
+    def start(self):
+        """
+        Inicia o aquecimento em uma thread (uma vez por processo)
+
+        Returns:
+            threading.Thread: Thread do aquecimento, ou None se desabilitado
+        """
+        if not self.enabled:
+            return None
+        with self._lock:
+            # Após um fork o estado do processo pai não vale para o worker
+            if self._pid != os.getpid():
+                self._pid = os.getpid()
+                self._done.clear()
+                self._thread = threading.Thread(target=self.run, name="ocr-warmup", daemon=True)
+                self._thread.start()
+            return self._thread
+
+    def wait(self, timeout=None):
+        """Aguarda o fim do aquecimento; retorna True se o worker está pronto"""
+        return self._done.wait(timeout) if self.enabled else True
+
+    def run(self):
+        """Executa o aquecimento na thread atual"""
+        self.started_at = time.time()
+        self.errors = []
+        start = time.perf_counter()
+        try:
+            image = synthetic_document()
+            process_image_ocr(image)
+
+            # O pipeline usa o modelo 'por'; os demais idiomas são carregados com uma passada
+            self.errors.extend(ocr_engines.ocr_engine.warm_up(image, self.languages))
+        except Exception as e:
+            self.errors.append(str(e))
+        finally:
+            self.duration_ms = (time.perf_counter() - start) * 1000
+            self._done.set()
+
+        if self.errors:
+            logger.warning(f"Aquecimento concluído com erros em {self.duration_ms:.0f}ms: {'; '.join(self.errors)}")
+        else:
+            logger.info(f"Aquecimento concluído em {self.duration_ms:.0f}ms (idiomas: {', '.join(self.languages)})")
+
+    def status(self):
+        """
+        Estado do aquecimento para o endpoint de readiness
+
+        Returns:
+            dict: ready, idiomas, duração e erros
+        """
+        return {
+            "ready": self.ready,
+            "enabled": self.enabled,
+            "languages": self.languages,
+            "started_at": self.started_at,
+            "duration_ms": round(self.duration_ms, 1) if self.duration_ms is not None else None,
+            "errors": list(self.errors),
+        }
+
+
+# Instância global para uso em toda a aplicação
+warmup = Warmup()
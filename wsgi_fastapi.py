@@ -1,6 +1,8 @@
-from main import fastapi_app
+from fastapi_server import create_app
 import uvicorn
 
+fastapi_app = create_app()
+
 # Ponto de entrada para gunicorn usando o Uvicorn worker
 # Para executar: gunicorn -k uvicorn.workers.UvicornWorker wsgi_fastapi:fastapi_app
 